@@ -1,15 +1,15 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Sum
-from decimal import Decimal
 from django import forms
 
+from insurance.claims import enqueue_finalization
 from insurance.models import (
     Occupation, MortalityRate, Company, Branch, InsurancePolicy, GSVRate, SSVConfig,
     AgentApplication, SalesAgent, DurationFactor, Customer, KYC, PolicyHolder,
     BonusRate, Bonus, ClaimRequest, ClaimProcessing, PaymentProcessing, Underwriting,
-    PremiumPayment, AgentReport, Loan, LoanRepayment, User
+    PremiumPayment, AgentReport, Loan, LoanRepayment, User, BatchCheckpoint,
+    PolicyFinancialSummary, LoanTransaction, ClaimFinalizationJob, CommissionLedgerEntry, AgentPerformance
 )
 
 @admin.register(User)
@@ -215,10 +215,14 @@ class AgentReportInline(admin.TabularInline):
 
 @admin.register(SalesAgent)
 class SalesAgentAdmin(admin.ModelAdmin):
-    list_display = ('get_agent_name', 'agent_code', 'branch', 'joining_date', 'is_active', 'status', 'get_total_commission_earned')
+    list_display = ('get_agent_name', 'agent_code', 'branch', 'joining_date', 'is_active', 'status',
+                    'total_policies_sold', 'active_policies', 'lapsed_policies', 'total_premium_collected',
+                    'get_total_commission_earned')
+    list_select_related = ('application', 'branch')
     search_fields = ('agent_code', 'application__first_name', 'application__last_name', 'application__email')
     list_filter = ('branch', 'is_active', 'status', 'joining_date')
-    readonly_fields = ('id', 'total_policies_sold', 'total_premium_collected', 'last_policy_date', 'get_total_commission_earned')
+    readonly_fields = ('id', 'total_policies_sold', 'total_premium_collected', 'active_policies', 'lapsed_policies',
+                       'last_policy_date', 'get_total_commission_earned')
     inlines = [AgentReportInline]
     def get_agent_name(self, obj):
         if obj.application:
@@ -227,9 +231,21 @@ class SalesAgentAdmin(admin.ModelAdmin):
     get_agent_name.short_description = 'Agent Name'
     
     def get_total_commission_earned(self, obj):
-        total = obj.agentreport_set.aggregate(total_commission=Sum('commission_earned'))['total_commission']
-        return total if total is not None else Decimal('0.00')
+        return obj.total_commission_earned
     get_total_commission_earned.short_description = 'Total Commission Earned'
+    get_total_commission_earned.admin_order_field = 'total_commission_earned'
+
+    # Maintained with F() increments by the commission and policy signals
+    COUNTER_FIELDS = ('total_policies_sold', 'total_premium_collected', 'total_commission_earned',
+                      'active_policies', 'lapsed_policies', 'last_policy_date')
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save(update_fields=[
+                f.name for f in obj._meta.concrete_fields if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ])
+        else:
+            obj.save()
     
     fieldsets = (
         ('Basic Information', {
@@ -242,7 +258,7 @@ class SalesAgentAdmin(admin.ModelAdmin):
             'fields': ('joining_date', 'termination_date', 'termination_reason')
         }),
         ('Performance Metrics', {
-            'fields': ('total_policies_sold', 'total_premium_collected', 'last_policy_date')
+            'fields': ('total_policies_sold', 'active_policies', 'lapsed_policies', 'total_premium_collected', 'last_policy_date')
         }),
     )
 
@@ -253,6 +269,31 @@ class BonusInline(admin.StackedInline):
     readonly_fields = ('accrued_amount',)
     verbose_name_plural = 'Bonuses'
 
+@admin.register(CommissionLedgerEntry)
+class CommissionLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('agent', 'event_date', 'premium_amount', 'commission_rate', 'commission_amount', 'policy_holder')
+    search_fields = ('agent__agent_code', 'policy_holder__policy_number', 'idempotency_key')
+    list_filter = ('event_date', 'branch')
+    list_select_related = ('agent__application', 'policy_holder')
+
+    def has_change_permission(self, request, obj=None):
+        return False  # Append-only
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AgentPerformance)
+class AgentPerformanceAdmin(admin.ModelAdmin):
+    list_display = ('agent', 'branch', 'period', 'period_start', 'policies_sold', 'premium_collected',
+                    'commission_earned', 'policies_lapsed')
+    search_fields = ('agent__agent_code', 'agent__application__first_name', 'agent__application__last_name')
+    list_filter = ('period', 'branch', 'period_start')
+    list_select_related = ('agent__application', 'branch')
+    readonly_fields = ('agent', 'branch', 'period', 'period_start', 'policies_sold', 'premium_collected',
+                       'commission_earned', 'policies_lapsed')
+
+
 @admin.register(DurationFactor)
 class DurationFactorAdmin(admin.ModelAdmin):
     list_display = ('min_duration', 'max_duration', 'factor', 'policy_type')
@@ -318,22 +359,25 @@ class ClaimProcessingAdmin(admin.ModelAdmin):
     actions = ['approve_claim', 'reject_claim']
     
     def approve_claim(self, request, queryset):
-        for claim_processing in queryset:
-            claim_processing.processing_status = 'Approved'
-            claim_processing.save()
-            claim_processing.finalize_claim()
-        self.message_user(request, f"{queryset.count()} claim(s) have been approved.")
+        batch, queued = enqueue_finalization(queryset, 'Approved', request.user)
+        self.message_user(request, f"{queued} claim(s) queued for approval (batch {batch}).")
     approve_claim.short_description = "Approve selected claims"
     
     def reject_claim(self, request, queryset):
-        for claim_processing in queryset:
-            claim_processing.processing_status = 'Rejected'
-            claim_processing.save()
-            claim_processing.finalize_claim()
-        self.message_user(request, f"{queryset.count()} claim(s) have been rejected.")
+        batch, queued = enqueue_finalization(queryset, 'Rejected', request.user)
+        self.message_user(request, f"{queued} claim(s) queued for rejection (batch {batch}).")
     reject_claim.short_description = "Reject selected claims"
 
 
+@admin.register(ClaimFinalizationJob)
+class ClaimFinalizationJobAdmin(admin.ModelAdmin):
+    list_display = ('claim_processing', 'decision', 'status', 'attempts', 'batch', 'created_at', 'finished_at')
+    search_fields = ('claim_processing__claim_request__policy_holder__policy_number', 'batch')
+    list_filter = ('status', 'decision', 'created_at')
+    readonly_fields = ('attempts', 'error', 'created_at', 'started_at', 'finished_at')
+    list_select_related = ('claim_processing__claim_request__policy_holder',)
+
+
 @admin.register(PaymentProcessing)
 class PaymentProcessingAdmin(admin.ModelAdmin):
     list_display = ('claim_request', 'branch', 'company', 'processing_status', 'amount_paid', 'payment_date')
@@ -350,17 +394,44 @@ class UnderwritingAdmin(admin.ModelAdmin):
     readonly_fields = ('last_updated_at',)
 
 
+class MaturityValueFilter(admin.SimpleListFilter):
+    """Bands of the stored estimated maturity value, for ranking by liability."""
+    title = 'estimated maturity value'
+    parameter_name = 'maturity_value'
+    bands = (
+        ('lt100k', 'Below Rs. 1,00,000', None, 100000),
+        ('100k-500k', 'Rs. 1,00,000 - 5,00,000', 100000, 500000),
+        ('500k-1m', 'Rs. 5,00,000 - 10,00,000', 500000, 1000000),
+        ('gte1m', 'Rs. 10,00,000 and above', 1000000, None),
+    )
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, label, _, _ in self.bands]
+
+    def queryset(self, request, queryset):
+        for key, _, low, high in self.bands:
+            if self.value() == key:
+                if low is not None:
+                    queryset = queryset.filter(estimated_maturity_value__gte=low)
+                if high is not None:
+                    queryset = queryset.filter(estimated_maturity_value__lt=high)
+                return queryset
+        return queryset
+
+
 @admin.register(PremiumPayment)
 class PremiumPaymentAdmin(admin.ModelAdmin):
     list_display = ('policy_holder', 'annual_premium', 'total_paid', 'next_payment_date', 'payment_status', 'estimated_maturity_value_display')
     search_fields = ('policy_holder__policy_number', 'policy_holder__customer__first_name')
-    list_filter = ('payment_status',)
+    list_filter = ('payment_status', MaturityValueFilter)
     readonly_fields = ('annual_premium', 'interval_payment', 'total_paid', 'total_premium', 'next_payment_date', 'estimated_maturity_value_display')
+    list_select_related = ('policy_holder__customer',)
 
     def estimated_maturity_value_display(self, obj):
-        value = obj.calculate_estimated_maturity_value()
+        value = obj.estimated_maturity_value
         return f"Rs. {value:,.2f}" if value else "N/A"
     estimated_maturity_value_display.short_description = 'Estimated Maturity Value'
+    estimated_maturity_value_display.admin_order_field = 'estimated_maturity_value'
 
 
 @admin.register(Loan)
@@ -376,4 +447,34 @@ class LoanRepaymentAdmin(admin.ModelAdmin):
     list_display = ('loan', 'repayment_date', 'amount', 'repayment_type', 'remaining_loan_balance')
     search_fields = ('loan__policy_holder__policy_number',)
     list_filter = ('repayment_type', 'repayment_date')
-    readonly_fields = ('remaining_loan_balance',)
\ No newline at end of file
+    readonly_fields = ('remaining_loan_balance',)
+
+
+@admin.register(LoanTransaction)
+class LoanTransactionAdmin(admin.ModelAdmin):
+    list_display = ('loan', 'transaction_date', 'transaction_type', 'principal_amount', 'interest_amount', 'reference')
+    search_fields = ('loan__policy_holder__policy_number', 'reference')
+    list_filter = ('transaction_type', 'transaction_date')
+    readonly_fields = ('created_at',)
+    list_select_related = ('loan__policy_holder',)
+
+    def has_change_permission(self, request, obj=None):
+        return False  # Append-only
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(PolicyFinancialSummary)
+class PolicyFinancialSummaryAdmin(admin.ModelAdmin):
+    list_display = ('policy_holder', 'total_bonus', 'loan_principal', 'loan_interest', 'total_premium_paid', 'premium_payment_count', 'max_loan', 'loan_headroom', 'updated_at')
+    search_fields = ('policy_holder__policy_number',)
+    list_filter = ('policy_holder__branch',)
+    readonly_fields = ('total_bonus', 'loan_principal', 'loan_interest', 'total_premium_paid', 'premium_payment_count', 'gsv_value', 'max_loan', 'loan_headroom', 'updated_at')
+    list_select_related = ('policy_holder__customer',)
+
+
+@admin.register(BatchCheckpoint)
+class BatchCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('job', 'last_completed_on', 'run_date', 'last_pk', 'processed', 'updated_at')
+    search_fields = ('job',)
+    readonly_fields = ('updated_at',)
@@ -1,7 +1,5 @@
 import sys
 from django.apps import AppConfig
-from django.db import transaction
-from django.utils import timezone
 
 class InsuranceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -23,21 +21,7 @@ class InsuranceConfig(AppConfig):
 
     def accrue_daily_interest(self):
         """Accrue interest on all active loans"""
-        from insurance.models import Loan  # Import here to avoid app registry issues
-        
-        today = timezone.now().date()
-        active_loans = Loan.objects.filter(loan_status="Active")
-        
-        updated_count = 0
-        error_count = 0
-        
-        with transaction.atomic():
-            for loan in active_loans:
-                try:
-                    loan.accrue_interest()
-                    updated_count += 1
-                except Exception as e:
-                    error_count += 1
-                    print(f"Error processing loan {loan.id}: {str(e)}")
-        
-        print(f"Interest accrual complete. Updated: {updated_count}, Errors: {error_count}")
\ No newline at end of file
+        from insurance.jobs import accrue_loan_interest  # Import here to avoid app registry issues
+
+        report = accrue_loan_interest()
+        print(f"Interest accrual complete. {report}")
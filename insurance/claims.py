@@ -0,0 +1,241 @@
+"""
+Claim finalization queue.
+
+Finalizing a claim creates its payout and settles the claim request. Admin
+actions and the API only enqueue ClaimFinalizationJob rows; the worker
+(``manage.py run_claim_worker``) claims queued jobs in batches and finalizes
+each batch with a handful of set-based queries, pricing all its payouts
+in one query with ``claim_payouts``. The database table is the
+queue, so no broker is needed and progress is visible through the API.
+"""
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# Attempts before a job is left as failed
+MAX_ATTEMPTS = 3
+
+# Running jobs older than this are assumed to belong to a dead worker and are requeued
+STALE_AFTER = timedelta(minutes=15)
+
+CENT = Decimal("0.01")
+
+
+class Payout(NamedTuple):
+    policy_holder_id: int
+    sum_assured: Decimal
+    total_bonus: Decimal
+    outstanding_loan: Decimal
+    amount: Decimal
+
+
+def claim_payouts(claim_requests):
+    """
+    Payout of every ClaimRequest in the queryset, keyed by its ID.
+
+    Bonus and loan totals come from the holders' PolicyFinancialSummary, as
+    in ``PaymentProcessing.calculate_payout``; holders without a summary yet
+    are totalled from the source tables in correlated subqueries, so the
+    whole batch is priced in one query. Amounts follow
+    ``PaymentProcessing.payout_amount``: sum assured plus accrued bonuses
+    less loan principal and accrued interest, not below zero.
+    """
+    from insurance.models import Bonus, Loan, PaymentProcessing
+
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    bonuses = (
+        Bonus.objects.filter(policy_holder=OuterRef("policy_holder")).order_by().values("policy_holder")
+        .annotate(total=Sum("accrued_amount")).values("total")
+    )
+    loans = (
+        Loan.objects.filter(policy_holder=OuterRef("policy_holder"), loan_status="Active").order_by()
+        .values("policy_holder").annotate(total=Sum(F("remaining_balance") + F("accrued_interest"))).values("total")
+    )
+    summary = "policy_holder__financial_summary__"
+    rows = claim_requests.order_by().values_list(
+        "pk",
+        "policy_holder_id",
+        "policy_holder__sum_assured",
+        Coalesce(
+            F(f"{summary}total_bonus"), Subquery(bonuses, output_field=amount), Value(Decimal("0.00")),
+            output_field=amount,
+        ),
+        Coalesce(
+            F(f"{summary}loan_principal") + F(f"{summary}loan_interest"), Subquery(loans, output_field=amount),
+            Value(Decimal("0.00")), output_field=amount,
+        ),
+    )
+
+    payouts = {}
+    for pk, holder_id, sum_assured, total_bonus, outstanding_loan in rows.iterator(chunk_size=2000):
+        sum_assured = sum_assured or Decimal("0.00")
+        total_bonus = total_bonus.quantize(CENT)
+        outstanding_loan = outstanding_loan.quantize(CENT)
+        payouts[pk] = Payout(
+            holder_id, sum_assured, total_bonus, outstanding_loan,
+            PaymentProcessing.payout_amount(sum_assured, total_bonus, outstanding_loan),
+        )
+    return payouts
+
+
+def enqueue_finalization(queryset, decision, user=None):
+    """
+    Mark the given ClaimProcessing rows ``decision`` and queue their finalization.
+
+    Claims that already have a queued or running job are left alone. Returns
+    the batch ID shared by the new jobs and the number of jobs created.
+    """
+    from insurance.models import ClaimFinalizationJob
+
+    batch = uuid.uuid4()
+    with transaction.atomic():
+        pks = list(
+            queryset.exclude(finalization_jobs__status__in=["Queued", "Running"])
+            .order_by("pk").values_list("pk", flat=True)
+        )
+        queryset.model.objects.filter(pk__in=pks).update(processing_status=decision, processed_at=timezone.now())
+        ClaimFinalizationJob.objects.bulk_create([
+            ClaimFinalizationJob(claim_processing_id=pk, decision=decision, batch=batch, requested_by=user)
+            for pk in pks
+        ])
+    return batch, len(pks)
+
+
+def claim_jobs(batch_size):
+    """Take up to ``batch_size`` queued jobs, oldest first, and mark them running."""
+    from insurance.models import ClaimFinalizationJob
+
+    with transaction.atomic():
+        jobs = list(
+            ClaimFinalizationJob.objects.select_for_update(skip_locked=True)
+            .filter(status="Queued").order_by("pk")[:batch_size]
+        )
+        now = timezone.now()
+        for job in jobs:
+            job.status = "Running"
+            job.started_at = now
+            job.attempts += 1
+        ClaimFinalizationJob.objects.bulk_update(jobs, ["status", "started_at", "attempts"])
+    return jobs
+
+
+def requeue_stale_jobs(now=None):
+    """Return running jobs abandoned by a dead worker to the queue, or fail them once out of attempts."""
+    from insurance.models import ClaimFinalizationJob
+
+    cutoff = (now or timezone.now()) - STALE_AFTER
+    stale = ClaimFinalizationJob.objects.filter(status="Running", started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status="Failed", error="Worker stopped while finalizing.", finished_at=timezone.now()
+    )
+    requeued = stale.update(status="Queued")
+    return requeued, failed
+
+
+def finalize_jobs(jobs):
+    """
+    Finalize the claims of ``jobs`` in one transaction.
+
+    Approved claims get a completed PaymentProcessing, bulk created with the
+    amounts of ``claim_payouts`` (an existing payment is marked completed
+    instead), and their request is approved. Rejected claims only have their
+    request rejected.
+    """
+    from insurance.models import ClaimFinalizationJob, ClaimProcessing, ClaimRequest, PaymentProcessing
+
+    processings = ClaimProcessing.objects.in_bulk([job.claim_processing_id for job in jobs])
+    approved = [processings[job.claim_processing_id] for job in jobs if job.decision == "Approved"]
+    rejected = [processings[job.claim_processing_id] for job in jobs if job.decision == "Rejected"]
+
+    with transaction.atomic():
+        paid = set(
+            PaymentProcessing.objects.filter(
+                claim_request_id__in=[p.claim_request_id for p in approved]
+            ).values_list("claim_request_id", flat=True)
+        )
+        unpaid = [p for p in approved if p.claim_request_id not in paid]
+        payouts = claim_payouts(ClaimRequest.objects.filter(pk__in=[p.claim_request_id for p in unpaid]))
+
+        PaymentProcessing.objects.bulk_create([
+            PaymentProcessing(
+                claim_request_id=p.claim_request_id,
+                branch_id=p.branch_id,
+                company_id=p.company_id,
+                processing_status="Completed",
+                amount_paid=payouts[p.claim_request_id].amount,
+            )
+            for p in unpaid
+        ])
+        PaymentProcessing.objects.filter(claim_request_id__in=paid).update(processing_status="Completed")
+        ClaimRequest.objects.filter(pk__in=[p.claim_request_id for p in approved]).update(status="Approved")
+        ClaimRequest.objects.filter(pk__in=[p.claim_request_id for p in rejected]).update(status="Rejected")
+        ClaimFinalizationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status="Done", error="", finished_at=timezone.now()
+        )
+
+
+def fail_job(job, error):
+    """Record a job's error and requeue it, or leave it failed once out of attempts."""
+    from insurance.models import ClaimFinalizationJob
+
+    status = "Failed" if job.attempts >= MAX_ATTEMPTS else "Queued"
+    ClaimFinalizationJob.objects.filter(pk=job.pk).update(
+        status=status, error=str(error), finished_at=timezone.now() if status == "Failed" else None
+    )
+
+
+def run_batch(batch_size=200):
+    """
+    Claim and finalize one batch of jobs. Returns the number of jobs taken.
+
+    If the batch fails as a whole, its jobs are retried one by one so a
+    single bad claim only fails (or requeues) its own job.
+    """
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return 0
+    try:
+        finalize_jobs(jobs)
+    except Exception:
+        for job in jobs:
+            try:
+                finalize_jobs([job])
+            except Exception as e:
+                fail_job(job, e)
+    return len(jobs)
+
+
+def run_worker(batch_size=200, once=False, poll_interval=5, progress=None):
+    """
+    Finalize queued claims until the queue is empty, then poll for more.
+
+    With ``once`` the worker stops as soon as the queue is drained. Returns
+    the number of jobs processed.
+    """
+    processed = 0
+    while True:
+        requeue_stale_jobs()
+        taken = run_batch(batch_size)
+        processed += taken
+        if taken:
+            if progress:
+                progress(processed)
+            continue
+        if once:
+            return processed
+        time.sleep(poll_interval)
+
+
+def queue_status(queryset):
+    """Job counts by status for the given ClaimFinalizationJob queryset."""
+    from insurance.models import ClaimFinalizationJob
+
+    counts = dict(queryset.order_by().values("status").annotate(count=Count("pk")).values_list("status", "count"))
+    return {status: counts.get(status, 0) for status, _ in ClaimFinalizationJob.STATUS_CHOICES}
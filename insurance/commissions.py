@@ -0,0 +1,325 @@
+"""
+Agent commission ledger and its rollups.
+
+Every premium payment credited to an agent is appended to the
+CommissionLedgerEntry ledger under an idempotency key. The monthly
+AgentReport premium and commission totals, the SalesAgent lifetime totals
+and the daily and monthly AgentPerformance rows are maintained from it with
+F-expression increments, together with policy sales and lapses. A month can
+be regenerated from the ledger in bulk.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from insurance.ledger import add_months
+
+# PolicyHolder statuses counted as lapsed for agent performance
+LAPSED_STATUSES = ("Cancelled", "Expired")
+
+
+def commission_amount(premium_amount, commission_rate):
+    return (premium_amount * commission_rate / 100).quantize(Decimal("1.00"))
+
+
+def payment_event_key(payment):
+    """
+    Idempotency key of the payment most recently applied to ``payment``.
+
+    Payments are numbered by ``payments_applied``, which only grows, so
+    recording a payment again (from a retry or a stale copy of the row) is a
+    no-op, while a later payment is recorded even if a correction brought
+    ``total_paid`` back to an earlier figure.
+    """
+    return f"premium-payment:{payment.pk}:{payment.payments_applied}"
+
+
+def record_premium_payment(payment, amount, event_date=None):
+    """
+    Append the commission entry for ``amount`` paid on ``payment`` and roll it up.
+
+    Returns the new entry, or None if the holder has no agent or the event
+    was already recorded.
+    """
+    from insurance.models import CommissionLedgerEntry
+
+    agent = payment.policy_holder.agent
+    if not agent or amount <= 0:
+        return None
+
+    rate = agent.commission_rate if isinstance(agent.commission_rate, Decimal) else Decimal(str(agent.commission_rate))
+    entry = CommissionLedgerEntry(
+        idempotency_key=payment_event_key(payment),
+        agent=agent,
+        branch_id=agent.branch_id,
+        policy_holder_id=payment.policy_holder_id,
+        premium_payment=payment,
+        event_date=event_date or date.today(),
+        premium_amount=amount,
+        commission_rate=rate,
+        commission_amount=commission_amount(amount, rate),
+    )
+    try:
+        with transaction.atomic():
+            entry.save()
+            apply_to_rollups(entry)
+    except IntegrityError:
+        if CommissionLedgerEntry.objects.filter(idempotency_key=entry.idempotency_key).exists():
+            return None
+        raise
+    return entry
+
+
+def report_defaults(month):
+    return {
+        "reporting_period": f"{month.year}-{month.month}",
+        "policies_sold": 0,
+        "total_premium": Decimal("0.00"),
+        "commission_earned": Decimal("0.00"),
+        "target_achievement": Decimal("0.00"),
+        "renewal_rate": Decimal("0.00"),
+        "customer_retention": Decimal("0.00"),
+    }
+
+
+def apply_to_rollups(entry):
+    """Add a ledger entry to its agent's monthly report and lifetime premium total."""
+    from insurance.models import AgentReport, SalesAgent
+
+    month = entry.event_date.replace(day=1)
+    updated = AgentReport.objects.filter(agent_id=entry.agent_id, report_date=month).update(
+        total_premium=F("total_premium") + entry.premium_amount,
+        commission_earned=F("commission_earned") + entry.commission_amount,
+    )
+    if not updated:
+        AgentReport.objects.create(
+            agent_id=entry.agent_id,
+            branch_id=entry.branch_id,
+            report_date=month,
+            **{
+                **report_defaults(month),
+                "total_premium": entry.premium_amount,
+                "commission_earned": entry.commission_amount,
+            },
+        )
+    SalesAgent.objects.filter(pk=entry.agent_id).update(
+        total_premium_collected=F("total_premium_collected") + entry.premium_amount,
+        total_commission_earned=F("total_commission_earned") + entry.commission_amount,
+    )
+    bump_performance(
+        entry.agent_id, entry.branch_id, entry.event_date,
+        premium_collected=entry.premium_amount, commission_earned=entry.commission_amount,
+    )
+
+
+def bump_performance(agent_id, branch_id, day, **deltas):
+    """Add ``deltas`` to the agent's daily and monthly AgentPerformance rows for ``day``."""
+    from insurance.models import AgentPerformance
+
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    for period, start in (("day", day), ("month", day.replace(day=1))):
+        lookup = {"agent_id": agent_id, "period": period, "period_start": start}
+        if AgentPerformance.objects.filter(**lookup).update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                AgentPerformance.objects.create(branch_id=branch_id, **lookup, **deltas)
+        except IntegrityError:
+            # Created concurrently since the update above
+            AgentPerformance.objects.filter(**lookup).update(**increments)
+
+
+def status_counter(status):
+    """SalesAgent counter a policy in ``status`` is counted in, if any."""
+    if status == "Active":
+        return "active_policies"
+    if status in LAPSED_STATUSES:
+        return "lapsed_policies"
+    return None
+
+
+def record_policy_status(previous, policy_holder, day):
+    """
+    Move a policy between its agents' active and lapsed counters.
+
+    ``previous`` is the ``(agent_id, status)`` the policy had before this
+    save, or None for a new policy. A policy entering a lapsed status also
+    counts as lapsed in the agent's performance for ``day``.
+    """
+    from insurance.models import SalesAgent
+
+    old_agent_id, old_status = previous or (None, None)
+    new_agent_id, new_status = policy_holder.agent_id, policy_holder.status
+    old_counter, new_counter = status_counter(old_status), status_counter(new_status)
+    if (old_agent_id, old_counter) != (new_agent_id, new_counter):
+        if old_agent_id and old_counter:
+            SalesAgent.objects.filter(pk=old_agent_id).update(**{old_counter: F(old_counter) - 1})
+        if new_agent_id and new_counter:
+            SalesAgent.objects.filter(pk=new_agent_id).update(**{new_counter: F(new_counter) + 1})
+    if new_agent_id and new_status in LAPSED_STATUSES and old_status not in LAPSED_STATUSES:
+        bump_performance(new_agent_id, policy_holder.agent.branch_id, day, policies_lapsed=1)
+
+
+class ReportRebuild:
+    def __init__(self, month, created, updated, unchanged):
+        self.month = month
+        self.created = created
+        self.updated = updated
+        self.unchanged = unchanged
+
+
+def rebuild_agent_reports(month, dry_run=False):
+    """
+    Regenerate the premium and commission totals of a month's AgentReports from the ledger.
+
+    Reports missing for agents with entries are created and reports that
+    disagree with the ledger are corrected, all with bulk writes. Reports of
+    agents with no entries that month predate the ledger or were kept by
+    hand, and are left alone, as are ``policies_sold`` and the other report
+    fields.
+    """
+    from insurance.models import AgentReport, CommissionLedgerEntry
+
+    month = month.replace(day=1)
+    totals = {
+        agent_id: (
+            (premium or Decimal("0.00")).quantize(Decimal("1.00")),
+            (commission or Decimal("0.00")).quantize(Decimal("1.00")),
+            branch_id,
+        )
+        for agent_id, branch_id, premium, commission in (
+            CommissionLedgerEntry.objects.filter(event_date__gte=month, event_date__lt=add_months(month, 1))
+            .order_by().values("agent", "agent__branch")
+            .annotate(premium=Sum("premium_amount"), commission=Sum("commission_amount"))
+            .values_list("agent", "agent__branch", "premium", "commission")
+        )
+    }
+    reports = {report.agent_id: report for report in AgentReport.objects.filter(report_date=month)}
+
+    missing = [
+        AgentReport(
+            agent_id=agent_id, branch_id=branch_id, report_date=month,
+            **{**report_defaults(month), "total_premium": premium, "commission_earned": commission},
+        )
+        for agent_id, (premium, commission, branch_id) in totals.items()
+        if agent_id not in reports
+    ]
+    changed = []
+    for agent_id, report in reports.items():
+        if agent_id not in totals:
+            continue
+        premium, commission, _ = totals[agent_id]
+        if (report.total_premium, report.commission_earned) != (premium, commission):
+            report.total_premium = premium
+            report.commission_earned = commission
+            changed.append(report)
+
+    if not dry_run:
+        with transaction.atomic():
+            AgentReport.objects.bulk_create(missing)
+            AgentReport.objects.bulk_update(changed, ["total_premium", "commission_earned"])
+    return ReportRebuild(month, len(missing), len(changed), len(reports) - len(changed))
+
+
+class PerformanceRebuild:
+    def __init__(self, month, created, updated, agents_updated):
+        self.month = month
+        self.created = created
+        self.updated = updated
+        self.agents_updated = agents_updated
+
+
+def rebuild_agent_performance(month, dry_run=False):
+    """
+    Regenerate a month's AgentPerformance premium and commission from the ledger,
+    and resynchronize every agent's lifetime counters.
+
+    Daily and monthly rows are created or corrected with bulk writes;
+    ``policies_sold`` and ``policies_lapsed`` have no other source and are
+    kept. Active and lapsed counters are recounted from the policies, and
+    ``total_premium_collected`` and ``total_commission_earned`` are summed
+    from the agents' reports.
+    """
+    from insurance.models import AgentPerformance, AgentReport, CommissionLedgerEntry, PolicyHolder, SalesAgent
+
+    month = month.replace(day=1)
+    zero = Decimal("0.00")
+    expected = {}
+    entries = (
+        CommissionLedgerEntry.objects.filter(event_date__gte=month, event_date__lt=add_months(month, 1))
+        .order_by().values("agent", "agent__branch", "event_date")
+        .annotate(premium=Sum("premium_amount"), commission=Sum("commission_amount"))
+        .values_list("agent", "agent__branch", "event_date", "premium", "commission")
+    )
+    for agent_id, branch_id, day, premium, commission in entries:
+        for key in ((agent_id, "day", day), (agent_id, "month", month)):
+            total_premium, total_commission, _ = expected.get(key, (zero, zero, branch_id))
+            expected[key] = (
+                total_premium + (premium or zero).quantize(zero),
+                total_commission + (commission or zero).quantize(zero),
+                branch_id,
+            )
+
+    rows = {
+        (row.agent_id, row.period, row.period_start): row
+        for row in AgentPerformance.objects.filter(period_start__gte=month, period_start__lt=add_months(month, 1))
+    }
+    missing = [
+        AgentPerformance(
+            agent_id=agent_id, branch_id=branch_id, period=period, period_start=start,
+            premium_collected=premium, commission_earned=commission,
+        )
+        for (agent_id, period, start), (premium, commission, branch_id) in expected.items()
+        if (agent_id, period, start) not in rows
+    ]
+    changed = []
+    for key, row in rows.items():
+        premium, commission, _ = expected.get(key, (zero, zero, None))
+        if (row.premium_collected, row.commission_earned) != (premium, commission):
+            row.premium_collected = premium
+            row.commission_earned = commission
+            changed.append(row)
+
+    counts = {}
+    for agent_id, status, count in (
+        PolicyHolder.objects.filter(agent__isnull=False).order_by().values("agent", "status")
+        .annotate(count=Count("pk")).values_list("agent", "status", "count")
+    ):
+        counter = status_counter(status)
+        if counter:
+            counts.setdefault(agent_id, {"active_policies": 0, "lapsed_policies": 0})[counter] += count
+    report_totals = {
+        agent_id: (premium, commission)
+        for agent_id, premium, commission in (
+            AgentReport.objects.order_by().values("agent")
+            .annotate(premium=Sum("total_premium"), commission=Sum("commission_earned"))
+            .values_list("agent", "premium", "commission")
+        )
+    }
+    agents = list(SalesAgent.objects.only(
+        "pk", "active_policies", "lapsed_policies", "total_premium_collected", "total_commission_earned"
+    ))
+    agents_changed = []
+    for agent in agents:
+        premium, commission = report_totals.get(agent.pk, (zero, zero))
+        values = {
+            "active_policies": 0, "lapsed_policies": 0, **counts.get(agent.pk, {}),
+            "total_premium_collected": (premium or zero).quantize(zero),
+            "total_commission_earned": (commission or zero).quantize(zero),
+        }
+        if any(getattr(agent, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(agent, field, value)
+            agents_changed.append(agent)
+
+    if not dry_run:
+        with transaction.atomic():
+            AgentPerformance.objects.bulk_create(missing)
+            AgentPerformance.objects.bulk_update(changed, ["premium_collected", "commission_earned"])
+            SalesAgent.objects.bulk_update(
+                agents_changed,
+                ["active_policies", "lapsed_policies", "total_premium_collected", "total_commission_earned"],
+            )
+    return PerformanceRebuild(month, len(missing), len(changed), len(agents_changed))
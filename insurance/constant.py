@@ -64,3 +64,11 @@ PAYMENT_CHOICES = [
     ("Partially Paid", "Partially Paid"),
     ("Paid", "Paid"),
 ]
+
+# Number of premium instalments per year for each PolicyHolder.payment_interval
+PAYMENT_INTERVAL_COUNTS = {
+    "quarterly": 4,
+    "semi_annual": 2,
+    "annual": 1,
+    "Single": 1,
+}
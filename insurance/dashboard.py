@@ -0,0 +1,48 @@
+"""
+Cached snapshot behind the home dashboard.
+
+The dashboard shows the row count and newest rows of each section. Building
+it touches every table, so the result is kept in the shared cache under the
+current snapshot version and rebuilt on the first request after a change.
+Saves and deletes of the reference and policy models bump the version
+through signals. Premium payments, bonuses, loans, repayments and agent
+reports change too often for that to leave anything cached, so their
+changes, like bulk writes that bypass signals, are picked up once
+``SNAPSHOT_TIMEOUT`` expires.
+"""
+from django.core.cache import cache
+
+SNAPSHOT_VERSION_KEY = "home-snapshot-version"
+
+# Upper bound in seconds on how stale the snapshot gets after bulk writes
+SNAPSHOT_TIMEOUT = 300
+
+# Newest rows of each section included in the snapshot
+SECTION_LIMIT = 20
+
+
+def snapshot_key(variant=""):
+    return f"home-snapshot:{cache.get(SNAPSHOT_VERSION_KEY, 0)}:{variant}"
+
+
+def cached_snapshot(build, variant=""):
+    """
+    The current snapshot, built with ``build()`` and cached if missing or stale.
+
+    Snapshots that differ by more than the data, such as the host their URLs
+    point to, are cached apart under their ``variant``.
+    """
+    key = snapshot_key(variant)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build()
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def invalidate_snapshot():
+    """Make every process rebuild the snapshot on its next request."""
+    try:
+        cache.incr(SNAPSHOT_VERSION_KEY)
+    except ValueError:
+        cache.add(SNAPSHOT_VERSION_KEY, 1, timeout=None)
@@ -0,0 +1,674 @@
+"""
+Batch jobs over the whole book.
+
+Each resumable job walks its rows in primary key order, one chunk per
+transaction, and records its position in a BatchCheckpoint row after every
+chunk. A run that is interrupted picks up after the last committed chunk when
+started again on the same day. Rows are read with set-based queries and
+written with ``bulk_update``, so no model ``save()`` or signal runs.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from insurance.rating import bonus_rates, rate_tables, surrender_bands
+
+
+class BatchReport:
+    """Counters and throughput of one job run."""
+
+    def __init__(self, job, since, run_date, resumed_from=None):
+        self.job = job
+        self.since = since
+        self.run_date = run_date
+        self.resumed_from = resumed_from
+        self.examined = 0
+        self.updated = 0
+        self.chunks = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def add_chunk(self, examined, updated):
+        self.chunks += 1
+        self.examined += examined
+        self.updated += updated
+        self.elapsed = time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        """Rows examined per second."""
+        return self.examined / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.job}: examined {self.examined}, updated {self.updated} "
+            f"in {self.chunks} chunk(s), {self.elapsed:.2f}s ({self.rate:.0f} rows/s)"
+        )
+
+
+def start_checkpoint(job, today):
+    """
+    Lock the job's checkpoint and decide where this run starts.
+
+    Returns (checkpoint, resume_after_pk). A run left unfinished today is
+    resumed; one left unfinished on an earlier day starts again, because its
+    values were computed for a different date.
+    """
+    from insurance.models import BatchCheckpoint
+
+    with transaction.atomic():
+        checkpoint, _ = BatchCheckpoint.objects.select_for_update().get_or_create(job=job)
+        if checkpoint.run_date == today and checkpoint.last_pk is not None:
+            return checkpoint, checkpoint.last_pk
+        checkpoint.run_date = today
+        checkpoint.last_pk = None
+        checkpoint.processed = 0
+        checkpoint.save()
+    return checkpoint, None
+
+
+def advance_checkpoint(checkpoint, last_pk, processed):
+    checkpoint.last_pk = last_pk
+    checkpoint.processed += processed
+    checkpoint.save(update_fields=["last_pk", "processed", "updated_at"])
+
+
+def finish_checkpoint(checkpoint):
+    checkpoint.last_completed_on = checkpoint.run_date
+    checkpoint.run_date = None
+    checkpoint.last_pk = None
+    checkpoint.save(update_fields=["last_completed_on", "run_date", "last_pk", "updated_at"])
+
+
+SURRENDER_VALUE_JOB = "revalue_surrender_values"
+
+
+def band_crossings(since, today):
+    """
+    Filter for premium payments whose GSV or SSV band may differ between
+    ``since`` and ``today``.
+
+    A holder's duration reaches ``n`` years on day ``start_date + 365 * n``,
+    which is the arithmetic of ``calculate_gsv``. For every year at which one
+    of the policy's bands starts or ends, payments of holders whose start date
+    puts that anniversary in ``(since, today]`` are selected.
+    """
+    tables = surrender_bands.tables()
+    policies_by_year = {}
+    for kind in ("gsv", "ssv"):
+        for policy_id, index in tables[kind].items():
+            for year in index.boundaries:
+                policies_by_year.setdefault(year, set()).add(policy_id)
+
+    condition = Q(pk__in=[])
+    for year, policy_ids in policies_by_year.items():
+        offset = timedelta(days=365 * year)
+        condition |= Q(
+            policy_holder__policy_id__in=policy_ids,
+            policy_holder__start_date__gt=since - offset,
+            policy_holder__start_date__lte=today - offset,
+        )
+    return condition
+
+
+def surrender_values(rows, payment_counts, bonus_totals, today):
+    """
+    GSV and SSV for ``(policy_id, start_date, total_paid, annual_premium,
+    holder_id)`` rows, computed as ``GSVRate.calculate_gsv`` and
+    ``SSVConfig.calculate_ssv`` would on ``today``. Rows those methods would
+    fail on are valued at zero, as ``PremiumPayment.save`` does.
+    """
+    values = []
+    for policy_id, start_date, total_paid, annual_premium, holder_id in rows:
+        policy = rate_tables.policy_terms(policy_id)
+        if policy is None or start_date is None:
+            values.append((Decimal("0.00"), Decimal("0.00")))
+            continue
+        duration_years = (today - start_date).days // 365
+
+        gsv = Decimal("0.00")
+        gsv_rate = surrender_bands.gsv_rate(policy_id, duration_years)
+        if gsv_rate is not None:
+            paid_premium = max(total_paid - annual_premium, Decimal("0.00"))
+            gsv = (paid_premium * gsv_rate / Decimal(100)).quantize(Decimal("1.00"))
+
+        ssv = Decimal("0.00")
+        band = surrender_bands.ssv_band(policy_id, duration_years) if policy.policy_type == "Endownment" else None
+        if band and payment_counts.get(holder_id, 0) >= band.eligibility_years:
+            premium_component = total_paid * (band.ssv_factor / Decimal(100))
+            ssv = (premium_component + bonus_totals.get(holder_id, Decimal("0.00"))).quantize(Decimal("1.00"))
+
+        values.append((gsv, ssv))
+    return values
+
+
+# Columns ``revalue_payments`` reads for each premium payment
+SURRENDER_VALUE_FIELDS = (
+    "pk",
+    "gsv_value",
+    "ssv_value",
+    "policy_holder__policy_id",
+    "policy_holder__start_date",
+    "total_paid",
+    "annual_premium",
+    "policy_holder_id",
+)
+
+
+def revalue_payments(rows, today):
+    """
+    Write the GSV and SSV of ``rows`` (``SURRENDER_VALUE_FIELDS`` tuples) that
+    changed, and update the loan eligibility of holders whose GSV changed.
+    Returns the number of payments updated. Call inside a transaction.
+    """
+    from insurance.models import Bonus, PremiumPayment
+
+    holder_ids = {row[7] for row in rows}
+    payment_counts = dict(
+        PremiumPayment.objects.filter(policy_holder_id__in=holder_ids)
+        .order_by().values("policy_holder").annotate(count=Count("pk"))
+        .values_list("policy_holder", "count")
+    )
+    bonus_totals = dict(
+        Bonus.objects.filter(policy_holder_id__in=holder_ids)
+        .order_by().values("policy_holder").annotate(total=Sum("accrued_amount"))
+        .values_list("policy_holder", "total")
+    )
+    values = surrender_values([row[3:] for row in rows], payment_counts, bonus_totals, today)
+
+    changed = [
+        PremiumPayment(pk=row[0], gsv_value=gsv, ssv_value=ssv)
+        for row, (gsv, ssv) in zip(rows, values)
+        if (row[1], row[2]) != (gsv, ssv)
+    ]
+    PremiumPayment.objects.bulk_update(changed, ["gsv_value", "ssv_value"])
+    update_loan_eligibility({row[7] for row, (gsv, ssv) in zip(rows, values) if row[1] != gsv})
+    return len(changed)
+
+
+def revalue_surrender_values(chunk_size=2000, full=False, today=None, progress=None):
+    """
+    Recompute ``gsv_value`` and ``ssv_value`` of premium payments.
+
+    Only payments whose holder crossed a GSV/SSV band boundary since the last
+    completed run are revalued, unless ``full`` is set or the job has never
+    completed. Holders whose GSV changed get their loan eligibility updated
+    in the same transaction. ``progress`` is called with the report after
+    every chunk.
+    """
+    from insurance.models import PremiumPayment
+
+    today = today or date.today()
+    checkpoint, resume_after = start_checkpoint(SURRENDER_VALUE_JOB, today)
+    since = None if full else checkpoint.last_completed_on
+
+    queryset = PremiumPayment.objects.all()
+    if since is not None:
+        queryset = queryset.filter(band_crossings(since, today))
+
+    report = BatchReport(SURRENDER_VALUE_JOB, since, today, resume_after)
+    cursor = resume_after or 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=cursor).order_by("pk").values_list(*SURRENDER_VALUE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+
+        cursor = rows[-1][0]
+        with transaction.atomic():
+            updated = revalue_payments(rows, today)
+            advance_checkpoint(checkpoint, cursor, len(rows))
+
+        report.add_chunk(len(rows), updated)
+        if progress:
+            progress(report)
+
+    finish_checkpoint(checkpoint)
+    return report
+
+
+def update_loan_eligibility(holder_ids):
+    """Copy the first-payment GSV of the given holders onto their summaries and re-derive the loan eligibility."""
+    from insurance.models import PolicyFinancialSummary
+
+    if not holder_ids:
+        return
+    gsv_by_holder = dict(first_payment_gsv(holder_ids))
+    summaries = list(PolicyFinancialSummary.objects.select_for_update().filter(policy_holder_id__in=holder_ids))
+    for summary in summaries:
+        summary.gsv_value = gsv_by_holder.get(summary.policy_holder_id) or Decimal("0.00")
+        summary.update_loan_eligibility()
+    PolicyFinancialSummary.objects.bulk_update(summaries, ["gsv_value", *PolicyFinancialSummary.ELIGIBILITY_FIELDS])
+
+
+SUMMARY_FIELDS = [
+    "total_bonus",
+    "loan_principal",
+    "loan_interest",
+    "total_premium_paid",
+    "premium_payment_count",
+    "gsv_value",
+    "max_loan",
+    "loan_headroom",
+]
+
+
+class SummaryReport:
+    def __init__(self, examined, missing, drifted, fixed):
+        self.examined = examined
+        self.missing = missing
+        self.drifted = drifted
+        self.fixed = fixed
+
+
+def first_payment_gsv(holder_ids=None):
+    """``(holder_id, gsv_value)`` of each holder's first premium payment, the GSV loans are measured against."""
+    from insurance.models import PremiumPayment
+
+    first_payments = PremiumPayment.objects.order_by().values("policy_holder").annotate(first=Min("pk"))
+    if holder_ids is not None:
+        first_payments = first_payments.filter(policy_holder_id__in=holder_ids)
+    return PremiumPayment.objects.filter(
+        pk__in=first_payments.values("first")
+    ).values_list("policy_holder_id", "gsv_value").iterator(chunk_size=5000)
+
+
+def expected_financial_summaries():
+    """Summary values of every policy holder, from grouped aggregates of the source tables."""
+    from insurance.models import Bonus, Loan, PolicyFinancialSummary, PolicyHolder, PremiumPayment
+
+    zero = Decimal("0.00")
+    expected = {
+        pk: {
+            "total_bonus": zero,
+            "loan_principal": zero,
+            "loan_interest": zero,
+            "total_premium_paid": zero,
+            "premium_payment_count": 0,
+            "gsv_value": zero,
+        }
+        for pk in PolicyHolder.objects.values_list("pk", flat=True).iterator(chunk_size=5000)
+    }
+    bonuses = (
+        Bonus.objects.order_by().values("policy_holder")
+        .annotate(total=Sum("accrued_amount")).values_list("policy_holder", "total")
+    )
+    for holder_id, total in bonuses:
+        expected[holder_id]["total_bonus"] = total or zero
+    loans = (
+        Loan.objects.filter(loan_status="Active").order_by().values("policy_holder")
+        .annotate(principal=Sum("remaining_balance"), interest=Sum("accrued_interest"))
+        .values_list("policy_holder", "principal", "interest")
+    )
+    for holder_id, principal, interest in loans:
+        expected[holder_id]["loan_principal"] = principal or zero
+        expected[holder_id]["loan_interest"] = interest or zero
+    premiums = (
+        PremiumPayment.objects.order_by().values("policy_holder")
+        .annotate(paid=Sum("total_paid"), count=Count("pk"))
+        .values_list("policy_holder", "paid", "count")
+    )
+    for holder_id, paid, count in premiums:
+        expected[holder_id]["total_premium_paid"] = paid or zero
+        expected[holder_id]["premium_payment_count"] = count
+    for holder_id, gsv in first_payment_gsv():
+        expected[holder_id]["gsv_value"] = gsv or zero
+    for values in expected.values():
+        values.update(PolicyFinancialSummary.loan_eligibility(
+            values["gsv_value"], values["loan_principal"], values["loan_interest"]
+        ))
+    return expected
+
+
+def rebuild_financial_summaries(fix=True, chunk_size=2000):
+    """
+    Compare every PolicyFinancialSummary with the source tables.
+
+    Missing summaries and summaries whose totals have drifted are reported
+    and, with ``fix``, created or corrected with bulk writes.
+    """
+    from insurance.models import PolicyFinancialSummary
+
+    expected = expected_financial_summaries()
+    stored = {
+        row[0]: dict(zip(SUMMARY_FIELDS, row[1:]))
+        for row in PolicyFinancialSummary.objects.values_list("policy_holder_id", *SUMMARY_FIELDS)
+    }
+    missing = [holder_id for holder_id in expected if holder_id not in stored]
+    drifted = [
+        holder_id for holder_id, values in expected.items()
+        if holder_id in stored and stored[holder_id] != values
+    ]
+
+    fixed = 0
+    if fix:
+        with transaction.atomic():
+            PolicyFinancialSummary.objects.bulk_create(
+                [PolicyFinancialSummary(policy_holder_id=holder_id, **expected[holder_id]) for holder_id in missing],
+                batch_size=chunk_size,
+            )
+            PolicyFinancialSummary.objects.bulk_update(
+                [PolicyFinancialSummary(policy_holder_id=holder_id, **expected[holder_id]) for holder_id in drifted],
+                SUMMARY_FIELDS,
+                batch_size=chunk_size,
+            )
+        fixed = len(missing) + len(drifted)
+    return SummaryReport(len(expected), missing, drifted, fixed)
+
+
+BONUS_DECLARATION_JOB = "declare_bonuses"
+
+
+def anniversary_passed(year, as_of):
+    """
+    Filter on ``start_date`` selecting the policies started before ``year``
+    whose anniversary in ``year`` falls on or before ``as_of``; the queryset
+    form of ``bonus_year_due``.
+    """
+    started = Q(start_date__lt=date(year, 1, 1))
+    if year < as_of.year:
+        return started
+    passed = Q(start_date__month__lt=as_of.month) | Q(start_date__month=as_of.month, start_date__day__lte=as_of.day)
+    if anniversary(date(2000, 2, 29), year) == as_of:
+        passed |= Q(start_date__month=2, start_date__day=29)  # Celebrated on 28 February
+    return started & passed
+
+
+def anniversary(start_date, year):
+    try:
+        return start_date.replace(year=year)
+    except ValueError:  # 29 February
+        return start_date.replace(year=year, day=28)
+
+
+def bonus_year_due(start_date, year, today):
+    """
+    Whether a policy started on ``start_date`` is owed the bonus of ``year``
+    by ``today``: its anniversary in that year has passed. The rule
+    ``declare_bonuses`` applies to active policies.
+    """
+    return start_date.year < year and anniversary(start_date, year) <= today
+
+
+def bonus_amount(policy_id, duration_years, sum_assured):
+    """Yearly bonus of a holder, computed as ``Bonus.calculate_bonus`` does."""
+    bonus_per_1000 = bonus_rates.latest_rate(policy_id, duration_years)
+    if bonus_per_1000 is None:
+        return Decimal(0)
+    return ((sum_assured / Decimal(1000)) * bonus_per_1000).quantize(Decimal("1.00"))
+
+
+def credit_bonuses(bonuses, batch_size=5000):
+    """
+    ``bulk_create`` unsaved Bonus rows and add them to the holders' financial
+    summaries. Call inside a transaction.
+    """
+    from insurance.models import Bonus, PolicyFinancialSummary
+
+    Bonus.objects.bulk_create(bonuses, batch_size=batch_size)
+    amounts = {}
+    for bonus in bonuses:
+        amounts[bonus.policy_holder_id] = amounts.get(bonus.policy_holder_id, Decimal("0.00")) + bonus.accrued_amount
+    # Holders without a summary yet get one built from the new rows on first use
+    summaries = list(PolicyFinancialSummary.objects.select_for_update().filter(policy_holder_id__in=amounts))
+    for summary in summaries:
+        summary.total_bonus += amounts[summary.policy_holder_id]
+    PolicyFinancialSummary.objects.bulk_update(summaries, ["total_bonus"])
+
+
+class BonusDeclarationReport(BatchReport):
+    def __init__(self, year, as_of, dry_run):
+        super().__init__(BONUS_DECLARATION_JOB, None, as_of)
+        self.year = year
+        self.dry_run = dry_run
+        # policy code -> [bonuses credited, total accrued amount]
+        self.per_product = {}
+
+    def add_bonus(self, policy_code, amount):
+        totals = self.per_product.setdefault(policy_code, [0, Decimal("0.00")])
+        totals[0] += 1
+        totals[1] += amount
+
+    @property
+    def total_amount(self):
+        return sum((amount for _, amount in self.per_product.values()), Decimal("0.00"))
+
+
+def declare_bonuses(year, as_of=None, chunk_size=5000, dry_run=False, progress=None):
+    """
+    Credit the yearly bonus of ``year`` to every active policy owed one.
+
+    A holder is owed a bonus once its anniversary in ``year`` has passed
+    (as of ``as_of``, default today) and it has no Bonus dated in that year
+    yet. Holders are found with one anti-join per chunk, amounts are computed
+    from the cached ``bonus_rates`` resolver exactly as
+    ``Bonus.calculate_bonus`` does, and the rows are written with ``bulk_create``. Each chunk locks the
+    job's checkpoint row before its anti-join, so concurrent or repeated runs
+    never credit a year twice. Financial summaries are updated in the same
+    transaction.
+    """
+    from insurance.models import BatchCheckpoint, Bonus, PolicyHolder
+
+    as_of = as_of or date.today()
+    if year > as_of.year:
+        raise ValueError(f"Cannot declare bonuses for {year} before it has started.")
+
+    owed = (
+        PolicyHolder.objects.filter(
+            anniversary_passed(year, as_of),
+            status="Active",
+            customer__isnull=False,
+            policy__isnull=False,
+            sum_assured__isnull=False,
+        )
+        .filter(~Exists(Bonus.objects.filter(
+            policy_holder=OuterRef("pk"),
+            start_date__gte=date(year, 1, 1),
+            start_date__lte=date(year, 12, 31),
+        )))
+        .order_by("pk")
+    )
+    BatchCheckpoint.objects.get_or_create(job=BONUS_DECLARATION_JOB)
+
+    report = BonusDeclarationReport(year, as_of, dry_run)
+    cursor = 0
+    while True:
+        with transaction.atomic():
+            checkpoint = BatchCheckpoint.objects.select_for_update().get(job=BONUS_DECLARATION_JOB)
+            rows = list(
+                owed.filter(pk__gt=cursor).values_list(
+                    "pk", "customer_id", "policy_id", "policy__policy_code",
+                    "sum_assured", "duration_years", "start_date",
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+
+            bonuses = []
+            for holder_id, customer_id, policy_id, policy_code, sum_assured, duration, start_date in rows:
+                amount = bonus_amount(policy_id, duration, sum_assured)
+                bonuses.append(Bonus(
+                    customer_id=customer_id,
+                    policy_holder_id=holder_id,
+                    bonus_type="SI",
+                    accrued_amount=amount,
+                    start_date=anniversary(start_date, year),
+                ))
+                report.add_bonus(policy_code, amount)
+            cursor = rows[-1][0]
+
+            if not dry_run:
+                credit_bonuses(bonuses, chunk_size)
+                checkpoint.processed = report.examined + len(rows)
+                checkpoint.save(update_fields=["processed", "updated_at"])
+
+        report.add_chunk(len(rows), 0 if dry_run else len(rows))
+        if progress:
+            progress(report)
+
+    if not dry_run:
+        BatchCheckpoint.objects.filter(job=BONUS_DECLARATION_JOB).update(last_completed_on=as_of)
+    return report
+
+
+def missing_bonus_years(holders, today):
+    """
+    Years without a Bonus for each holder, from one grouped query.
+
+    ``holders`` is a list of ``(pk, start_date)``. A holder is owed a bonus
+    for every year after its start year whose anniversary has passed by
+    ``today`` (see ``bonus_year_due``).
+    """
+    from insurance.models import Bonus
+
+    credited = set(
+        Bonus.objects.filter(policy_holder_id__in=[pk for pk, _ in holders])
+        .order_by()
+        .values_list("policy_holder_id", ExtractYear("start_date"))
+        .distinct()
+    )
+    return {
+        pk: [
+            year for year in range(start_date.year + 1, today.year + 1)
+            if bonus_year_due(start_date, year, today) and (pk, year) not in credited
+        ]
+        for pk, start_date in holders
+    }
+
+
+def backfill_bonus_gaps(queryset=None, today=None, chunk_size=2000, progress=None):
+    """
+    Insert the yearly bonuses missing from ``queryset`` (all policy holders if None).
+
+    Each chunk locks its holders, finds the missing years with
+    ``missing_bonus_years`` and inserts them with ``credit_bonuses``, so the
+    job is safe to repeat. The save path calls it for a single holder on
+    commit; the ``backfill_bonus_gaps`` command runs it over the whole book.
+    Only Active holders are credited, as by ``declare_bonuses``; holders
+    without a customer are skipped, since Bonus requires one.
+    """
+    from insurance.models import Bonus, PolicyHolder
+
+    today = today or date.today()
+    if queryset is None:
+        queryset = PolicyHolder.objects.all()
+    queryset = queryset.filter(
+        status="Active", start_date__isnull=False, start_date__year__lt=today.year, customer__isnull=False
+    ).order_by("pk")
+
+    report = BatchReport("backfill_bonus_gaps", None, today)
+    cursor = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.filter(pk__gt=cursor).select_for_update().values_list(
+                    "pk", "customer_id", "policy_id", "sum_assured", "duration_years", "start_date",
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+            gaps = missing_bonus_years([(row[0], row[5]) for row in rows], today)
+
+            bonuses = []
+            for holder_id, customer_id, policy_id, sum_assured, duration, start_date in rows:
+                if not gaps[holder_id]:
+                    continue
+                amount = bonus_amount(policy_id, duration, sum_assured) if sum_assured is not None else None
+                if amount is None:
+                    continue  # calculate_bonus cannot price a holder without a sum assured
+                for year in gaps[holder_id]:
+                    bonuses.append(Bonus(
+                        customer_id=customer_id,
+                        policy_holder_id=holder_id,
+                        bonus_type="SI",
+                        accrued_amount=amount,
+                        start_date=anniversary(start_date, year),
+                    ))
+            credit_bonuses(bonuses, chunk_size)
+            cursor = rows[-1][0]
+
+        report.add_chunk(len(rows), len(bonuses))
+        if progress:
+            progress(report)
+    return report
+
+
+LOAN_ACCRUAL_JOB = "accrue_loan_interest"
+
+
+def accrued_interest(remaining_balance, interest_rate, days):
+    """Interest for ``days`` days, computed and rounded as ``Loan.accrue_interest`` does."""
+    daily_rate = interest_rate / 100 / 365
+    interest = remaining_balance * Decimal(daily_rate) * Decimal(days)
+    return interest.quantize(Decimal("1.00"))
+
+
+def accrue_loan_interest(chunk_size=5000, today=None, progress=None):
+    """
+    Accrue interest on every active loan up to ``today``.
+
+    Interest is computed in Decimal exactly as ``Loan.accrue_interest`` does,
+    which SQL cannot reproduce, so each chunk is read with ``values_list`` and
+    written back with ``bulk_update`` in its own transaction, together with
+    the loan ledger entries, the holders' financial summaries and the job
+    checkpoint. Loans already
+    accrued today are not selected, so an interrupted run can simply be
+    started again; it also resumes after the last committed chunk.
+    """
+    from insurance.models import Loan, LoanTransaction, PolicyFinancialSummary
+
+    today = today or date.today()
+    checkpoint, resume_after = start_checkpoint(LOAN_ACCRUAL_JOB, today)
+    queryset = Loan.objects.filter(loan_status="Active", last_interest_date__lt=today).order_by("pk")
+
+    report = BatchReport(LOAN_ACCRUAL_JOB, None, today, resume_after)
+    cursor = resume_after or 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.filter(pk__gt=cursor).select_for_update().values_list(
+                    "pk", "policy_holder_id", "remaining_balance", "interest_rate",
+                    "accrued_interest", "last_interest_date",
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+
+            loans = []
+            ledger = []
+            interest_by_holder = {}
+            for pk, holder_id, remaining_balance, interest_rate, accrued, last_date in rows:
+                interest = accrued_interest(remaining_balance, interest_rate, (today - last_date).days)
+                loans.append(Loan(pk=pk, accrued_interest=accrued + interest, last_interest_date=today))
+                ledger.append(LoanTransaction(
+                    loan_id=pk, transaction_type="Interest", transaction_date=today, interest_amount=interest,
+                ))
+                interest_by_holder[holder_id] = interest_by_holder.get(holder_id, Decimal("0.00")) + interest
+            Loan.objects.bulk_update(loans, ["accrued_interest", "last_interest_date"])
+            LoanTransaction.objects.bulk_create(ledger)
+
+            # Holders without a summary yet get one built from the loans on first use
+            summaries = list(PolicyFinancialSummary.objects.select_for_update().filter(
+                policy_holder_id__in=interest_by_holder
+            ))
+            for summary in summaries:
+                summary.loan_interest += interest_by_holder[summary.policy_holder_id]
+                summary.update_loan_eligibility()
+            PolicyFinancialSummary.objects.bulk_update(
+                summaries, ["loan_interest", *PolicyFinancialSummary.ELIGIBILITY_FIELDS]
+            )
+
+            cursor = rows[-1][0]
+            advance_checkpoint(checkpoint, cursor, len(rows))
+
+        report.add_chunk(len(rows), len(rows))
+        if progress:
+            progress(report)
+
+    finish_checkpoint(checkpoint)
+    return report
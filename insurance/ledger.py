@@ -0,0 +1,237 @@
+"""
+Loan statements and forward amortization schedules.
+
+A loan's history is the LoanTransaction ledger: disbursement, interest
+accruals and repayments as signed changes to principal and interest. The
+statement annotates each entry with running balances using window functions,
+so the whole ledger comes back from one query.
+
+Repayments are posted against the loan row locked with ``select_for_update``,
+so concurrent postings to one loan serialize instead of losing updates.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import ROUND_CEILING, Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F, Sum, Window
+
+# Upper bound on generated instalments (50 years of monthly payments)
+MAX_SCHEDULE_PERIODS = 600
+
+
+def loan_statement(loan):
+    """The loan's ledger in date order, with ``principal_balance`` and ``interest_balance`` running totals."""
+    from insurance.models import LoanTransaction
+
+    order = [F("transaction_date").asc(), F("pk").asc()]
+    return (
+        LoanTransaction.objects.filter(loan=loan)
+        .annotate(
+            principal_balance=Window(Sum("principal_amount"), order_by=order),
+            interest_balance=Window(Sum("interest_amount"), order_by=order),
+        )
+        .order_by("transaction_date", "pk")
+    )
+
+
+def apply_repayment(loan, amount, repayment_type):
+    """
+    Apply a repayment to the balances of ``loan`` in memory.
+
+    Accrued interest is settled first and principal second, as allowed by
+    ``repayment_type``; the loan is marked paid once both reach zero. Returns
+    the ``(principal_payment, interest_payment)`` split. The caller must hold
+    the row lock and write the balances back.
+    """
+    remaining = amount
+    interest_payment = principal_payment = Decimal("0.00")
+
+    if repayment_type in ("Both", "Interest"):
+        interest_payment = min(remaining, loan.accrued_interest)
+        loan.accrued_interest -= interest_payment
+        remaining -= interest_payment
+
+    if repayment_type in ("Both", "Principal") and remaining > 0:
+        principal_payment = min(remaining, loan.remaining_balance)
+        loan.remaining_balance -= principal_payment
+
+    if loan.remaining_balance <= 0 and loan.accrued_interest <= 0:
+        loan.loan_status = "Paid"
+    return principal_payment, interest_payment
+
+
+@dataclass
+class RepaymentPosting:
+    """Outcome of ``post_repayments``: the created repayments and the rejected lines by index."""
+    posted: list = field(default_factory=list)
+    rejected: list = field(default_factory=list)
+    batches: int = 0
+
+
+def post_repayments(lines, batch_size=500):
+    """
+    Post a file of repayments, one transaction per ``batch_size`` lines.
+
+    ``lines`` are dicts with ``loan`` (ID), ``amount``, ``repayment_type`` and
+    an optional ``reference``, applied in order. Each batch locks its loans in
+    primary key order, applies the repayments in memory and writes loans,
+    repayments, ledger entries and the holders' financial summaries in bulk,
+    without the per-row validation of ``Loan.save``. Lines for unknown or
+    settled loans, and lines whose reference is already in the ledger, are
+    rejected and the rest of their batch is still posted, so a file with
+    references can safely be posted again.
+    """
+    from insurance.models import Loan, LoanRepayment, LoanTransaction, PolicyFinancialSummary
+
+    result = RepaymentPosting()
+    today = date.today()
+    for start in range(0, len(lines), batch_size):
+        batch = lines[start:start + batch_size]
+        with transaction.atomic():
+            loans = {
+                loan.pk: loan
+                for loan in Loan.objects.select_for_update().filter(
+                    pk__in={line["loan"] for line in batch}
+                ).order_by("pk").only(
+                    "pk", "policy_holder_id", "remaining_balance", "accrued_interest", "loan_status"
+                )
+            }
+            # Read after the loan locks, so a concurrent posting of the same lines has committed
+            posted_references = set(LoanTransaction.objects.filter(
+                reference__in=[line["reference"] for line in batch if line.get("reference")]
+            ).values_list("reference", flat=True))
+
+            repayments = []
+            splits = []
+            references = []
+            paid_by_holder = {}
+            for index, line in enumerate(batch, start):
+                reference = line.get("reference") or None
+                loan = loans.get(line["loan"])
+                if loan is None:
+                    result.rejected.append({"index": index, "loan": line["loan"], "error": "Loan not found."})
+                    continue
+                if reference in posted_references:
+                    result.rejected.append({"index": index, "loan": loan.pk, "error": "Already posted."})
+                    continue
+                if loan.loan_status != "Active":
+                    result.rejected.append({"index": index, "loan": loan.pk, "error": "Loan is already paid."})
+                    continue
+                if reference:
+                    posted_references.add(reference)
+
+                principal_payment, interest_payment = apply_repayment(loan, line["amount"], line["repayment_type"])
+                repayments.append(LoanRepayment(
+                    loan=loan,
+                    amount=line["amount"],
+                    repayment_type=line["repayment_type"],
+                    remaining_loan_balance=loan.remaining_balance + loan.accrued_interest,
+                ))
+                splits.append((principal_payment, interest_payment))
+                references.append(reference)
+                principal, interest = paid_by_holder.get(loan.policy_holder_id, (Decimal("0.00"), Decimal("0.00")))
+                paid_by_holder[loan.policy_holder_id] = (principal + principal_payment, interest + interest_payment)
+
+            if not repayments:
+                continue
+            Loan.objects.bulk_update(
+                {repayment.loan_id: repayment.loan for repayment in repayments}.values(),
+                ["remaining_balance", "accrued_interest", "loan_status"],
+            )
+            LoanRepayment.objects.bulk_create(repayments)
+            LoanTransaction.objects.bulk_create([
+                LoanTransaction(
+                    loan_id=repayment.loan_id,
+                    repayment=repayment,
+                    transaction_type="Repayment",
+                    transaction_date=today,
+                    principal_amount=-principal_payment,
+                    interest_amount=-interest_payment,
+                    reference=reference,
+                )
+                for repayment, (principal_payment, interest_payment), reference in zip(repayments, splits, references)
+            ])
+
+            # Holders without a summary yet get one built from the loans on first use
+            summaries = list(PolicyFinancialSummary.objects.select_for_update().filter(
+                policy_holder_id__in=paid_by_holder
+            ))
+            for summary in summaries:
+                principal, interest = paid_by_holder[summary.policy_holder_id]
+                summary.loan_principal -= principal
+                summary.loan_interest -= interest
+                summary.update_loan_eligibility()
+            PolicyFinancialSummary.objects.bulk_update(
+                summaries, ["loan_principal", "loan_interest", *PolicyFinancialSummary.ELIGIBILITY_FIELDS]
+            )
+
+        result.posted.extend(repayments)
+        result.batches += 1
+    return result
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    for last_day in (31, 30, 29, 28):
+        try:
+            return date(year, month, min(day.day, last_day))
+        except ValueError:
+            continue
+
+
+def level_instalment(principal, annual_rate, months):
+    """Monthly payment that repays ``principal`` over ``months`` at ``annual_rate`` percent, rounded up to the paisa."""
+    monthly_rate = annual_rate / Decimal(1200)
+    if monthly_rate == 0:
+        payment = principal / months
+    else:
+        payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+    return payment.quantize(Decimal("1.00"), rounding=ROUND_CEILING)
+
+
+def amortize(principal, interest, monthly_rate, instalment):
+    """Yield ``(payment, interest_paid, principal_paid, principal, interest)`` each month until repaid."""
+    while principal > 0 or interest > 0:
+        interest += (principal * monthly_rate).quantize(Decimal("1.00"))
+        payment = min(instalment, principal + interest)
+        interest_paid = min(payment, interest)
+        principal_paid = payment - interest_paid
+        interest -= interest_paid
+        principal -= principal_paid
+        yield payment, interest_paid, principal_paid, principal, interest
+
+
+def amortization_schedule(principal, interest, annual_rate, instalment, start=None):
+    """
+    Yield the forward schedule of monthly ``instalment`` payments.
+
+    Each month accrues ``annual_rate / 12`` percent on the outstanding
+    principal, and each payment settles interest first and principal second,
+    like a "Both" LoanRepayment. Raises ValueError before the first row if
+    the instalment never reduces the principal or would take more than
+    ``MAX_SCHEDULE_PERIODS`` months to repay the loan, so a schedule is never
+    cut short.
+    """
+    monthly_rate = annual_rate / Decimal(1200)
+    if principal > 0 and instalment <= (principal * monthly_rate).quantize(Decimal("1.00")):
+        raise ValueError("Instalment does not cover the monthly interest; the loan would never be repaid.")
+    periods = sum(1 for _ in islice(amortize(principal, interest, monthly_rate, instalment), MAX_SCHEDULE_PERIODS + 1))
+    if periods > MAX_SCHEDULE_PERIODS:
+        raise ValueError(f"Instalment is too small to repay the loan within {MAX_SCHEDULE_PERIODS} months.")
+
+    start = start or date.today()
+    rows = amortize(principal, interest, monthly_rate, instalment)
+    for period, (payment, interest_paid, principal_paid, principal, interest) in enumerate(rows, start=1):
+        yield {
+            "period": period,
+            "due_date": add_months(start, period),
+            "payment": payment,
+            "interest_paid": interest_paid,
+            "principal_paid": principal_paid,
+            "principal_balance": principal,
+            "interest_balance": interest,
+        }
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from insurance.jobs import accrue_loan_interest
+
+
+class Command(BaseCommand):
+    help = "Accrue interest on every active loan up to today. Resumes an interrupted run from its checkpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Loans per chunk and transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(str(report))
+
+        report = accrue_loan_interest(chunk_size=options["chunk_size"], progress=progress)
+        if report.resumed_from:
+            self.stdout.write(f"Resumed after loan #{report.resumed_from}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Accrued interest on {report.updated} loan(s) in {report.chunks} chunk(s), "
+            f"{report.elapsed:.2f}s ({report.rate:.0f} loans/s)"
+        ))
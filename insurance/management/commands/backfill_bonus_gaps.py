@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from insurance.jobs import backfill_bonus_gaps
+from insurance.models import PolicyHolder
+
+
+class Command(BaseCommand):
+    help = "Insert the yearly bonuses missing for policies started in earlier years, e.g. after backdating."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy", action="append", dest="policy_codes", metavar="POLICY_CODE",
+            help="Only repair holders of this InsurancePolicy code. May be repeated.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Policy holders per chunk and transaction (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(str(report))
+
+        queryset = PolicyHolder.objects.all()
+        if options["policy_codes"]:
+            queryset = queryset.filter(policy__policy_code__in=options["policy_codes"])
+
+        report = backfill_bonus_gaps(queryset, chunk_size=options["chunk_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {report.examined} policy holder(s), inserted {report.updated} missing bonus(es). "
+            f"{report.elapsed:.2f}s ({report.rate:.0f} holders/s)"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from insurance.models import InsurancePolicy
+from insurance.rating import rebuild_premium_grid
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized premium-rate grid of each insurance policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy", action="append", dest="policy_codes", metavar="POLICY_CODE",
+            help="Only rebuild the grid of this InsurancePolicy code. May be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        policies = InsurancePolicy.objects.all()
+        if options["policy_codes"]:
+            policies = policies.filter(policy_code__in=options["policy_codes"])
+
+        for policy in policies:
+            rows = rebuild_premium_grid(policy)
+            self.stdout.write(f"{policy.policy_code}: {rows} grid row(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt premium grids for {policies.count()} policy(ies)."))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance.jobs import declare_bonuses
+
+
+class Command(BaseCommand):
+    help = "Credit the yearly bonus to every active policy whose anniversary in the year has passed and that has not been credited yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year", type=int, default=date.today().year,
+            help="Bonus year to declare (default: current year).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would be credited without writing anything.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Policies per chunk and transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(str(report))
+
+        try:
+            report = declare_bonuses(
+                options["year"], chunk_size=options["chunk_size"],
+                dry_run=options["dry_run"], progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for policy_code, (count, amount) in sorted(report.per_product.items()):
+            self.stdout.write(f"{policy_code}: {count} bonus(es), {amount}")
+
+        verb = "Would credit" if report.dry_run else "Credited"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report.examined} bonus(es) for {report.year}, total {report.total_amount}. "
+            f"{report.elapsed:.2f}s ({report.rate:.0f} policies/s)"
+        ))
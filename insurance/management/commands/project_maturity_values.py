@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from insurance.models import PolicyHolder
+from insurance.portfolio import project_maturity_values
+from insurance.rating import annuity_factors
+
+
+class Command(BaseCommand):
+    help = "Project estimated and actual maturity values for every policy holder and write them as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--policy", action="append", dest="policy_codes", metavar="POLICY_CODE",
+            help="Only value holders of this InsurancePolicy code. May be repeated.",
+        )
+        parser.add_argument(
+            "--output", default="-",
+            help="CSV file to write (default: standard output).",
+        )
+
+    def handle(self, *args, **options):
+        queryset = PolicyHolder.objects.all()
+        if options["policy_codes"]:
+            queryset = queryset.filter(policy__policy_code__in=options["policy_codes"])
+
+        projection = project_maturity_values(queryset)
+
+        if options["output"] == "-":
+            projection.write_csv(self.stdout)
+            # Keep the summary out of the CSV stream
+            summary = sys.stderr
+        else:
+            with open(options["output"], "w", newline="") as stream:
+                projection.write_csv(stream)
+            summary = self.stdout
+
+        summary.write(self.style.SUCCESS(
+            f"Valued {len(projection)} policy holder(s). "
+            f"Estimated maturity total: {projection.total_estimated}, "
+            f"actual maturity total: {projection.total_actual}"
+        ) + "\n")
+        stats = annuity_factors.stats()
+        summary.write(f"Annuity factors: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['size']} cached\n")
@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance.commissions import rebuild_agent_performance
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate a month's daily and monthly agent performance from the commission ledger "
+        "and resynchronize the agents' policy and commission counters. Run after rebuild_agent_reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month", help="Month to rebuild as YYYY-MM (default: the current month).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing.",
+        )
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        else:
+            month = date.today()
+
+        result = rebuild_agent_performance(month, dry_run=options["dry_run"])
+        would = "would " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.month:%Y-%m}: {would}create {result.created} performance row(s), "
+            f"{would}correct {result.updated}, {would}resynchronize {result.agents_updated} agent(s)"
+        ))
@@ -0,0 +1,35 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance.commissions import rebuild_agent_reports
+
+
+class Command(BaseCommand):
+    help = "Regenerate a month's agent report premium and commission totals from the commission ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month", help="Month to rebuild as YYYY-MM (default: the current month).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing.",
+        )
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        else:
+            month = date.today()
+
+        result = rebuild_agent_reports(month, dry_run=options["dry_run"])
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.month:%Y-%m}: {verb} {result.created} report(s), "
+            f"{'would correct' if options['dry_run'] else 'corrected'} {result.updated}, "
+            f"{result.unchanged} already matched the ledger"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance.jobs import rebuild_financial_summaries
+
+
+class Command(BaseCommand):
+    help = "Verify PolicyFinancialSummary rows against bonuses, loans and premium payments and rebuild any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only report missing or drifted summaries; exit with an error if any are found.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Rows per bulk write (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        report = rebuild_financial_summaries(fix=not options["verify"], chunk_size=options["chunk_size"])
+
+        for holder_id in report.drifted[:50]:
+            self.stdout.write(f"Drifted: policy holder #{holder_id}")
+        if len(report.drifted) > 50:
+            self.stdout.write(f"... and {len(report.drifted) - 50} more")
+
+        summary = (
+            f"Checked {report.examined} policy holder(s): {len(report.missing)} missing, "
+            f"{len(report.drifted)} drifted, {report.fixed} rebuilt."
+        )
+        if options["verify"] and (report.missing or report.drifted):
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
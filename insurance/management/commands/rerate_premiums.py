@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from insurance.models import PremiumPayment
+from insurance.portfolio import rerate_premiums
+
+
+class Command(BaseCommand):
+    help = "Re-price premium payments against the current mortality rates, duration factors and policy terms."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing anything.",
+        )
+        parser.add_argument(
+            "--policy", action="append", dest="policy_codes", metavar="POLICY_CODE",
+            help="Only re-rate holders of this InsurancePolicy code. May be repeated.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Rows per bulk_update batch (default: 2000).",
+        )
+        parser.add_argument(
+            "--show", type=int, default=50,
+            help="Number of changed rows to list in the report (default: 50, 0 for all).",
+        )
+
+    def handle(self, *args, **options):
+        queryset = PremiumPayment.objects.all()
+        if options["policy_codes"]:
+            queryset = queryset.filter(policy_holder__policy__policy_code__in=options["policy_codes"])
+
+        report = rerate_premiums(
+            queryset, dry_run=options["dry_run"], chunk_size=options["chunk_size"]
+        )
+
+        shown = report.changes if not options["show"] else report.changes[:options["show"]]
+        for change in shown:
+            self.stdout.write(str(change))
+        if len(shown) < len(report.changes):
+            self.stdout.write(f"... and {len(report.changes) - len(shown)} more")
+
+        verb = "would change" if report.dry_run else "updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Examined {report.examined} premium payment(s), {verb} {len(report.changes)}. "
+            f"Annual premium delta: {report.annual_premium_delta}"
+        ))
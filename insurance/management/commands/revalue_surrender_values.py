@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from insurance.jobs import revalue_surrender_values
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute GSV and SSV of premium payments whose holders crossed a surrender value "
+        "band since the last run. Resumes an interrupted run from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Revalue every premium payment, e.g. after GSV or SSV bands were edited.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Rows per chunk and checkpoint (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(str(report))
+
+        report = revalue_surrender_values(
+            chunk_size=options["chunk_size"], full=options["full"], progress=progress
+        )
+        if report.resumed_from:
+            self.stdout.write(f"Resumed after premium payment #{report.resumed_from}")
+        scope = f"band crossings since {report.since}" if report.since else "all premium payments"
+        self.stdout.write(self.style.SUCCESS(f"{report} [{scope}, as of {report.run_date}]"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from insurance.claims import run_worker
+
+
+class Command(BaseCommand):
+    help = "Finalize queued claims in batches. Keeps polling for new jobs unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=200,
+            help="Jobs per batch and transaction (default: 200).",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=5,
+            help="Seconds to wait when the queue is empty (default: 5).",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit as soon as the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        def progress(processed):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Processed {processed} job(s)")
+
+        processed = run_worker(
+            batch_size=options["batch_size"],
+            once=options["once"],
+            poll_interval=options["poll_interval"],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} claim finalization job(s)"))
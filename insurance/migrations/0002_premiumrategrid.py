@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PremiumRateGrid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('age', models.PositiveIntegerField()),
+                ('duration_years', models.PositiveIntegerField()),
+                ('payment_interval', models.CharField(max_length=20)),
+                ('include_adb', models.BooleanField(default=False)),
+                ('include_ptd', models.BooleanField(default=False)),
+                ('annual_rate', models.DecimalField(decimal_places=10, help_text='Annual premium per 1000 sum assured.', max_digits=20)),
+                ('interval_rate', models.DecimalField(decimal_places=10, help_text='Interval premium per 1000 sum assured.', max_digits=20)),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='premium_grid', to='insurance.insurancepolicy')),
+            ],
+            options={
+                'verbose_name': 'Premium Rate Grid',
+                'verbose_name_plural': 'Premium Rate Grid',
+                'unique_together': {('policy', 'age', 'duration_years', 'payment_interval', 'include_adb', 'include_ptd')},
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:11
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+
+def estimated_maturity_value(sum_assured, annual_premium, duration_years, guaranteed_rate, terminal_rate):
+    # Frozen copy of PremiumPayment.calculate_estimated_maturity_value as of this migration
+    sum_assured = sum_assured or Decimal('0.00')
+    annual_premium = annual_premium or Decimal('0.00')
+    term = Decimal(str(duration_years)) if duration_years else Decimal('0')
+    guaranteed_rate = guaranteed_rate if guaranteed_rate is not None else Decimal('0.0000')
+    terminal_rate = terminal_rate if terminal_rate is not None else Decimal('0.0000')
+
+    if guaranteed_rate > 0 and annual_premium > 0 and term > 0:
+        try:
+            factor = ((Decimal(1) + guaranteed_rate) ** term - Decimal(1)) / guaranteed_rate
+        except InvalidOperation:
+            return Decimal('0.00')
+        guaranteed_additions = annual_premium * factor
+    else:
+        guaranteed_additions = annual_premium * term
+
+    return (
+        sum_assured
+        + guaranteed_additions
+        + sum_assured * Decimal('0.045') * term
+        + sum_assured * terminal_rate
+    ).quantize(Decimal('1.00'))
+
+
+def backfill_estimated_maturity_values(apps, schema_editor):
+    PremiumPayment = apps.get_model('insurance', 'PremiumPayment')
+    rows = PremiumPayment.objects.order_by('pk').values_list(
+        'pk',
+        'annual_premium',
+        'policy_holder__sum_assured',
+        'policy_holder__duration_years',
+        'policy_holder__policy_id',
+        'policy_holder__policy__guaranteed_interest_rate',
+        'policy_holder__policy__terminal_bonus_rate',
+    )
+    changed = [
+        PremiumPayment(
+            pk=pk,
+            estimated_maturity_value=(
+                estimated_maturity_value(sum_assured, premium, duration, guaranteed, terminal)
+                if policy_id is not None else Decimal('0.00')
+            ),
+        )
+        for pk, premium, sum_assured, duration, policy_id, guaranteed, terminal in rows.iterator(chunk_size=2000)
+    ]
+    PremiumPayment.objects.bulk_update(changed, ['estimated_maturity_value'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0002_premiumrategrid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='premiumpayment',
+            name='estimated_maturity_value',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, help_text='Stored result of calculate_estimated_maturity_value, kept current by signals.', max_digits=14),
+        ),
+        migrations.RunPython(backfill_estimated_maturity_values, migrations.RunPython.noop),
+    ]
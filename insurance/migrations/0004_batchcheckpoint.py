@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0003_premiumpayment_estimated_maturity_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100, unique=True)),
+                ('last_completed_on', models.DateField(blank=True, help_text='Run date of the last run that finished.', null=True)),
+                ('run_date', models.DateField(blank=True, help_text='Run date of the run in progress, if any.', null=True)),
+                ('last_pk', models.BigIntegerField(blank=True, help_text='Highest primary key processed by the run in progress.', null=True)),
+                ('processed', models.PositiveIntegerField(default=0, help_text='Rows processed by the run in progress or the last run.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Batch Checkpoint',
+                'verbose_name_plural': 'Batch Checkpoints',
+            },
+        ),
+    ]
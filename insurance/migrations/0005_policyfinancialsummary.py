@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0004_batchcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyFinancialSummary',
+            fields=[
+                ('policy_holder', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='financial_summary', serialize=False, to='insurance.policyholder')),
+                ('total_bonus', models.DecimalField(decimal_places=2, default=0, help_text='Sum of accrued bonuses.', max_digits=14)),
+                ('loan_principal', models.DecimalField(decimal_places=2, default=0, help_text='Remaining principal of active loans.', max_digits=14)),
+                ('loan_interest', models.DecimalField(decimal_places=2, default=0, help_text='Accrued interest of active loans.', max_digits=14)),
+                ('total_premium_paid', models.DecimalField(decimal_places=2, default=0, help_text='Sum of total_paid over premium payments.', max_digits=14)),
+                ('premium_payment_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Policy Financial Summary',
+                'verbose_name_plural': 'Policy Financial Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0005_policyfinancialsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bonus',
+            index=models.Index(fields=['policy_holder', 'start_date'], name='insurance_b_policy__128f11_idx'),
+        ),
+    ]
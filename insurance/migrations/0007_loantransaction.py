@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_existing_loans(apps, schema_editor):
+    """Existing loans have no history; start their ledger from the current balances."""
+    Loan = apps.get_model('insurance', 'Loan')
+    LoanTransaction = apps.get_model('insurance', 'LoanTransaction')
+    LoanTransaction.objects.bulk_create(
+        [
+            LoanTransaction(
+                loan_id=loan_id,
+                transaction_type='Opening',
+                transaction_date=last_interest_date,
+                principal_amount=remaining_balance,
+                interest_amount=accrued_interest,
+            )
+            for loan_id, remaining_balance, accrued_interest, last_interest_date in Loan.objects.values_list(
+                'pk', 'remaining_balance', 'accrued_interest', 'last_interest_date'
+            ).iterator()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0006_bonus_holder_start_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('Opening', 'Opening Balance'), ('Disbursement', 'Disbursement'), ('Interest', 'Interest Accrual'), ('Repayment', 'Repayment')], max_length=20)),
+                ('transaction_date', models.DateField()),
+                ('principal_amount', models.DecimalField(decimal_places=2, default=0, help_text='Change in principal balance.', max_digits=12)),
+                ('interest_amount', models.DecimalField(decimal_places=2, default=0, help_text='Change in accrued interest.', max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='insurance.loan')),
+                ('repayment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='insurance.loanrepayment')),
+            ],
+            options={
+                'verbose_name': 'Loan Transaction',
+                'verbose_name_plural': 'Loan Transactions',
+                'indexes': [models.Index(fields=['loan', 'transaction_date'], name='insurance_l_loan_id_2b9d99_idx')],
+            },
+        ),
+        migrations.RunPython(open_existing_loans, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0007_loantransaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyfinancialsummary',
+            name='gsv_value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='GSV of the first premium payment, the basis for loans.', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='policyfinancialsummary',
+            name='loan_headroom',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, help_text='Maximum loan less the outstanding loan, not below zero.', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='policyfinancialsummary',
+            name='max_loan',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Largest loan the GSV allows.', max_digits=14),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:26
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0008_loan_eligibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimFinalizationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decision', models.CharField(choices=[('Approved', 'Approved'), ('Rejected', 'Rejected')], max_length=20)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Queued', max_length=20)),
+                ('batch', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('claim_processing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finalization_jobs', to='insurance.claimprocessing')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claim_finalization_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Claim Finalization Job',
+                'verbose_name_plural': 'Claim Finalization Jobs',
+                'indexes': [models.Index(fields=['status', 'id'], name='insurance_c_status_9acc67_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['Queued', 'Running'])), fields=('claim_processing',), name='unique_active_claim_finalization_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0009_claimfinalizationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True)),
+                ('event_date', models.DateField()),
+                ('premium_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('commission_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('commission_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commission_entries', to='insurance.salesagent')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commission_entries', to='insurance.branch')),
+                ('policy_holder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commission_entries', to='insurance.policyholder')),
+                ('premium_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commission_entries', to='insurance.premiumpayment')),
+            ],
+            options={
+                'verbose_name': 'Commission Ledger Entry',
+                'verbose_name_plural': 'Commission Ledger Entries',
+                'indexes': [models.Index(fields=['agent', 'event_date'], name='insurance_c_agent_i_c38049_idx'), models.Index(fields=['event_date'], name='insurance_c_event_d_ed5be2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def count_existing_policies(apps, schema_editor):
+    """Start the agent counters and lifetime totals from the existing policies and reports."""
+    SalesAgent = apps.get_model('insurance', 'SalesAgent')
+    agents = SalesAgent.objects.annotate(
+        active=Count('policyholder', filter=Q(policyholder__status='Active')),
+        lapsed=Count('policyholder', filter=Q(policyholder__status__in=['Cancelled', 'Expired'])),
+    )
+    report_totals = {
+        agent_id: (premium, commission)
+        for agent_id, premium, commission in (
+            apps.get_model('insurance', 'AgentReport').objects.order_by().values('agent')
+            .annotate(premium=Sum('total_premium'), commission=Sum('commission_earned'))
+            .values_list('agent', 'premium', 'commission')
+        )
+    }
+    updated = []
+    for agent in agents:
+        agent.active_policies = agent.active
+        agent.lapsed_policies = agent.lapsed
+        premium, commission = report_totals.get(agent.pk, (0, 0))
+        agent.total_premium_collected = premium or 0
+        agent.total_commission_earned = commission or 0
+        updated.append(agent)
+    SalesAgent.objects.bulk_update(
+        updated, ['active_policies', 'lapsed_policies', 'total_premium_collected', 'total_commission_earned'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0010_commissionledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesagent',
+            name='active_policies',
+            field=models.IntegerField(default=0, help_text='Policies sold by the agent that are Active.'),
+        ),
+        migrations.AddField(
+            model_name='salesagent',
+            name='lapsed_policies',
+            field=models.IntegerField(default=0, help_text='Policies sold by the agent that are Cancelled or Expired.'),
+        ),
+        migrations.AddField(
+            model_name='salesagent',
+            name='total_commission_earned',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='AgentPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('policies_sold', models.IntegerField(default=0)),
+                ('premium_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('policies_lapsed', models.IntegerField(default=0)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance', to='insurance.salesagent')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_performance', to='insurance.branch')),
+            ],
+            options={
+                'verbose_name': 'Agent Performance',
+                'verbose_name_plural': 'Agent Performance',
+                'indexes': [models.Index(fields=['period', 'period_start', 'branch'], name='insurance_a_period_2ce0eb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('agent', 'period', 'period_start'), name='unique_agent_performance_period')],
+            },
+        ),
+        migrations.RunPython(count_existing_policies, migrations.RunPython.noop),
+    ]
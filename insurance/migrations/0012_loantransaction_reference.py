@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0011_agentperformance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loantransaction',
+            name='reference',
+            field=models.CharField(blank=True, help_text="Payer's reference of a repayment posted from a file.", max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance', '0012_loantransaction_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='premiumpayment',
+            name='payments_applied',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of payments applied so far; numbers each payment in the commission ledger.'),
+        ),
+    ]
@@ -1,15 +1,19 @@
 from datetime import date
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
 import re
+import uuid
 from rest_framework.authtoken.models import Token
 from django.db.models.signals import post_save  
 from typing import Dict, Union
 from django.dispatch import receiver
 from django.utils.timezone import now
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.hashers import make_password, check_password
-from django.db.models import Sum
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from insurance.ledger import apply_repayment
+from insurance.rating import annuity_factors, bonus_rates, grid_premium, rate_tables, surrender_bands
 from insurance.constant import DOCUMENT_TYPES, EMPLOYEE_STATUS_CHOICES, EXE_FREQ_CHOICE, GENDER_CHOICES, PAYMENT_CHOICES, POLICY_TYPES, PROCESSING_STATUS_CHOICES, PROVINCE_CHOICES, RISK_CHOICES, STATUS_CHOICES
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -174,6 +178,31 @@ class Company(models.Model):
         return self.name
 
 #Branch Model
+class BranchQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Annotate ``total_agents``, ``total_policy_holders`` and ``total_premium``
+        (premiums paid by the branch's policy holders) as correlated subqueries,
+        so a page of branches and their statistics come back in one query.
+        """
+        def total(queryset, group, aggregate, output_field, default):
+            subquery = queryset.order_by().values(group).annotate(total=aggregate).values("total")
+            return Coalesce(Subquery(subquery, output_field=output_field), Value(default), output_field=output_field)
+
+        return self.select_related("company", "user").annotate(
+            total_agents=total(
+                SalesAgent.objects.filter(branch=OuterRef("pk")), "branch", Count("pk"), models.IntegerField(), 0,
+            ),
+            total_policy_holders=total(
+                PolicyHolder.objects.filter(branch=OuterRef("pk")), "branch", Count("pk"), models.IntegerField(), 0,
+            ),
+            total_premium=total(
+                PremiumPayment.objects.filter(policy_holder__branch=OuterRef("pk")), "policy_holder__branch",
+                Sum("total_paid"), models.DecimalField(max_digits=14, decimal_places=2), Decimal("0.00"),
+            ),
+        )
+
+
 class Branch(models.Model):
     name = models.CharField(max_length=255)
     branch_code = models.IntegerField(unique=True, default=1)
@@ -183,6 +212,8 @@ class Branch(models.Model):
         Company, on_delete=models.CASCADE, related_name="branches", default=1
     )
 
+    objects = BranchQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Branch"
         verbose_name_plural = "Branches"
@@ -298,16 +329,16 @@ class GSVRate(models.Model):
         """Calculate Guaranteed Surrender Value (GSV) based on a PremiumPayment."""
         try:
             policy_holder = premium_payment.policy_holder
+            if policy_holder.policy_id is None:
+                raise ValueError("policy holder has no policy")
             duration_years = (date.today() - policy_holder.start_date).days // 365
-            gsv_rate = policy_holder.policy.gsv_rates.filter(
-                min_year__lte=duration_years, max_year__gte=duration_years
-            ).first()
+            gsv_rate = surrender_bands.gsv_rate(policy_holder.policy_id, duration_years)
 
-            if not gsv_rate:
+            if gsv_rate is None:
                 return Decimal("0.00")  # No GSV defined for current duration
 
             paid_premium = max(premium_payment.total_paid - premium_payment.annual_premium, Decimal("0.00"))
-            return (paid_premium * gsv_rate.rate / Decimal(100)).quantize(Decimal("1.00"))
+            return (paid_premium * gsv_rate / Decimal(100)).quantize(Decimal("1.00"))
         except Exception as e:
             raise ValidationError(f"Error calculating GSV: {e}")
 
@@ -362,28 +393,26 @@ class SSVConfig(models.Model):
         """Calculate Special Surrender Value (SSV) based on PremiumPayment."""
         try:
             policy_holder = premium_payment.policy_holder
+            policy = rate_tables.policy_terms(policy_holder.policy_id)
+            if policy is None:
+                raise ValueError("policy holder has no policy")
 
-            if policy_holder.policy.policy_type != "Endownment":
+            if policy.policy_type != "Endownment":
                 return Decimal("0.00")  # SSV only applies to endowment policies
 
             duration_years = (date.today() - policy_holder.start_date).days // 365
-            premiums_paid = policy_holder.premium_payments.count()
 
             # Get applicable SSV configuration
-            applicable_range = policy_holder.policy.ssv_configs.filter(
-                min_year__lte=duration_years, max_year__gte=duration_years
-            ).first()
-
-            if (
-                not applicable_range
-                or premiums_paid < applicable_range.eligibility_years
-            ):
+            applicable_range = surrender_bands.ssv_band(policy_holder.policy_id, duration_years)
+            if not applicable_range:
+                return Decimal("0.00")
+
+            summary = PolicyFinancialSummary.for_holder(policy_holder)
+            if summary.premium_payment_count < applicable_range.eligibility_years:
                 return Decimal("0.00")
 
             # Total Bonuses
-            total_bonuses = policy_holder.bonuses.aggregate(
-                total=Sum("accrued_amount")
-            )["total"] or Decimal("0.00")
+            total_bonuses = summary.total_bonus
 
             # Calculate SSV
             premium_component = premium_payment.total_paid * (
@@ -496,6 +525,11 @@ class SalesAgent(models.Model):
     total_premium_collected = models.DecimalField(
         max_digits=12, decimal_places=2, default=0.00
     )
+    total_commission_earned = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0.00
+    )
+    active_policies = models.IntegerField(default=0, help_text="Policies sold by the agent that are Active.")
+    lapsed_policies = models.IntegerField(default=0, help_text="Policies sold by the agent that are Cancelled or Expired.")
     last_policy_date = models.DateField(null=True, blank=True)
     termination_date = models.DateField(null=True, blank=True)
     termination_reason = models.CharField(max_length=200, null=True, blank=True)
@@ -552,6 +586,37 @@ class DurationFactor(models.Model):
     def __str__(self):
         return f"{self.policy_type} ({self.min_duration}-{self.max_duration} years): {self.factor}x"
 
+#Premium Rate Grid Model
+class PremiumRateGrid(models.Model):
+    """
+    Materialized premium per 1000 sum assured for one pricing combination of a policy.
+
+    Rebuilt on commit when the policy's pricing terms, or any MortalityRate or
+    DurationFactor, change (see insurance.rating.schedule_premium_grid_rebuild).
+    """
+    policy = models.ForeignKey(
+        "InsurancePolicy", on_delete=models.CASCADE, related_name="premium_grid"
+    )
+    age = models.PositiveIntegerField()
+    duration_years = models.PositiveIntegerField()
+    payment_interval = models.CharField(max_length=20)
+    include_adb = models.BooleanField(default=False)
+    include_ptd = models.BooleanField(default=False)
+    annual_rate = models.DecimalField(
+        max_digits=20, decimal_places=10, help_text="Annual premium per 1000 sum assured."
+    )
+    interval_rate = models.DecimalField(
+        max_digits=20, decimal_places=10, help_text="Interval premium per 1000 sum assured."
+    )
+
+    class Meta:
+        verbose_name = "Premium Rate Grid"
+        verbose_name_plural = "Premium Rate Grid"
+        unique_together = ["policy", "age", "duration_years", "payment_interval", "include_adb", "include_ptd"]
+
+    def __str__(self):
+        return f"{self.policy_id} age {self.age}, {self.duration_years} years, {self.payment_interval}: {self.annual_rate} per 1000"
+
 
 #Customer Model
 class Customer(models.Model):
@@ -576,6 +641,9 @@ class Customer(models.Model):
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    def get_full_name(self):
+        return " ".join(name for name in (self.first_name, self.middle_name, self.last_name) if name)
     
     def save(self, *args, **kwargs):
         creating = self.pk is None and self.user is None
@@ -848,10 +916,10 @@ class PolicyHolder(models.Model):
             guaranteed_additions_future_value = Decimal('0.00')
             if guaranteed_rate > 0 and annual_premium > 0 and policy_term > 0:
                 # Future Value of an Ordinary Annuity: P * [((1 + r)^n - 1) / r]
-                try:
-                    future_value_factor = ((Decimal(1) + guaranteed_rate)**policy_term - Decimal(1)) / guaranteed_rate
+                future_value_factor = annuity_factors.factor(guaranteed_rate, policy_term)
+                if future_value_factor is not None:
                     guaranteed_additions_future_value = annual_premium * future_value_factor
-                except InvalidOperation:
+                else:
                      # Handle potential calculation errors (e.g., overflow if term is huge)
                      print(f"Error calculating future value factor for Policy {self.policy_number}")
                      guaranteed_additions_future_value = annual_premium * policy_term # Fallback to total premium?
@@ -861,7 +929,7 @@ class PolicyHolder(models.Model):
 
             # 2. Actual Accrued Bonuses (Sum from related Bonus objects)
             # Ensure bonuses are linked to PolicyHolder now
-            total_actual_bonus = self.bonuses.aggregate(total=Sum('accrued_amount'))['total'] or Decimal('0.00')
+            total_actual_bonus = PolicyFinancialSummary.for_holder(self).total_bonus
 
             # 3. Terminal Bonus Component
             terminal_rate = policy.terminal_bonus_rate if policy.terminal_bonus_rate is not None else Decimal('0.0000')
@@ -1012,17 +1080,16 @@ class Bonus(models.Model):
     def calculate_bonus(self):
         """Calculate yearly bonus based on policy type, duration, and sum assured."""
         try:
-            policy = self.policy_holder.policy
             duration = self.policy_holder.duration_years
             sum_assured = self.policy_holder.sum_assured
-            # Fetch applicable bonus rate
-            bonus_rate_obj = BonusRate.get_bonus_rate(policy, duration)
+            # Fetch applicable bonus rate (same resolution as BonusRate.get_bonus_rate, from cache)
+            bonus_per_thousand = bonus_rates.latest_rate(self.policy_holder.policy_id, duration)
 
-            if not bonus_rate_obj:
+            if bonus_per_thousand is None:
             
                 return Decimal(0)  # No bonus if rate is not defined
 
-            bonus_per_1000 = Decimal(str(bonus_rate_obj.bonus_per_thousand))
+            bonus_per_1000 = Decimal(str(bonus_per_thousand))
             sum_assured = Decimal(str(sum_assured))
 
            
@@ -1043,6 +1110,12 @@ class Bonus(models.Model):
 
     def __str__(self):
         return f"Bonus for {self.policy_holder} on {self.start_date}"
+
+    class Meta:
+        indexes = [
+            # Anti-join of the bonus declaration run: has this holder been credited this year?
+            models.Index(fields=["policy_holder", "start_date"]),
+        ]
     
     
 #ClaimRequest Model
@@ -1161,7 +1234,6 @@ class PaymentProcessing(models.Model):
         try:
             claim = self.claim_request
             ph = claim.policy_holder
-            policy = ph.policy
 
             # Base amount: Sum Assured
             payout_base = ph.sum_assured or Decimal('0.00')
@@ -1177,22 +1249,8 @@ class PaymentProcessing(models.Model):
             #     payout_base += ph.sum_assured or Decimal('0.00')
             # --- END: Commented-out Rider Logic --- 
 
-            # Add Actual Accrued Bonuses (Sum from related Bonus objects)
-            total_actual_bonus = ph.bonuses.aggregate(total=Sum('accrued_amount'))['total'] or Decimal('0.00')
-
-            # Calculate Total Outstanding Loan Amount (Principal + Interest)
-            total_outstanding_loan = Decimal('0.00')
-            active_loans = ph.loans.filter(loan_status='Active')
-            for loan in active_loans:
-                total_outstanding_loan += (loan.remaining_balance + loan.accrued_interest)
-
-            # Final Payout Calculation (Current Active Logic)
-            payout = payout_base + total_actual_bonus - total_outstanding_loan
-            
-            # Ensure payout is not negative
-            payout = max(payout, Decimal('0.00')) 
-
-            return payout.quantize(Decimal("1.00"))
+            summary = PolicyFinancialSummary.for_holder(ph)
+            return self.payout_amount(payout_base, summary.total_bonus, summary.outstanding_loan)
 
         except Exception as e:
             import traceback
@@ -1200,6 +1258,17 @@ class PaymentProcessing(models.Model):
             traceback.print_exc()
             return Decimal("0.00")
 
+    @staticmethod
+    def payout_amount(sum_assured, total_bonus, outstanding_loan):
+        """Sum assured plus accrued bonuses less the outstanding loan (principal + interest)."""
+        # Final Payout Calculation (Current Active Logic)
+        payout = sum_assured + total_bonus - outstanding_loan
+
+        # Ensure payout is not negative
+        payout = max(payout, Decimal('0.00'))
+
+        return payout.quantize(Decimal("1.00"))
+
     def save(self, *args, **kwargs):
         # Calculate payout only if status is being set to Completed and amount_paid is not set yet
         # Or perhaps recalculate whenever saved? Simpler: Recalculate on save if amount is 0.
@@ -1315,6 +1384,10 @@ class PremiumPayment(models.Model):
         max_digits=12, decimal_places=2, default=0, 
         help_text="Amount being paid in this transaction."
     )
+    payments_applied = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Number of payments applied so far; numbers each payment in the commission ledger."
+    )
     next_payment_date = models.DateField(null=True, blank=True)
     # Fine due represents the *accumulated* unpaid fine amount
     fine_due = models.DecimalField(
@@ -1333,6 +1406,10 @@ class PremiumPayment(models.Model):
     ssv_value = models.DecimalField(
         max_digits=12, decimal_places=2, default=0, editable=False
     )
+    estimated_maturity_value = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False, db_index=True,
+        help_text="Stored result of calculate_estimated_maturity_value, kept current by signals."
+    )
     payment_status = models.CharField(
         max_length=255, choices=PAYMENT_CHOICES, default="Unpaid"
     )
@@ -1371,69 +1448,9 @@ class PremiumPayment(models.Model):
                     "Policy, Sum Assured, and Age are required for premium calculation."
                 )
 
-            # Fetch mortality rate based on age range
-            mortality_rate_obj = MortalityRate.objects.filter(
-                age_group_start__lte=age, age_group_end__gte=age
-            ).first()
-
-            if not mortality_rate_obj:
-                return Decimal("0.00"), Decimal("0.00") # Ensure Decimal return
-
-            mortality_rate = Decimal(mortality_rate_obj.rate)
-
-            # Base premium calculation
-            base_premium = (sum_assured * mortality_rate) / Decimal(100)
-
-            # Fetch duration factor
-            duration_factor_obj = DurationFactor.objects.filter(
-                min_duration__lte=duration_years, max_duration__gte=duration_years
-            ).first()
-
-            if not duration_factor_obj:
-                return Decimal("0.00"), Decimal("0.00") # Ensure Decimal return
-
-            duration_factor = Decimal(
-                duration_factor_obj.factor
-            )  # Ensure it's a Decimal
-
-            # Adjust premium based on policy type
-            if policy.policy_type == "Endownment":
-                adjusted_premium = (
-                    base_premium * Decimal(policy.base_multiplier) * duration_factor
-                )
-            elif policy.policy_type == "Term":
-                adjusted_premium = base_premium
-            else:
-                raise ValidationError(f"Unsupported policy type: {policy.policy_type}")
-
-            # Add ADB/PTD charges if applicable
-            adb_charge = (
-                (sum_assured * Decimal(policy.adb_percentage)) / Decimal(100)
-                if policy.include_adb
-                else Decimal("0.00")
-            )
-            ptd_charge = (
-                (sum_assured * Decimal(policy.ptd_percentage)) / Decimal(100)
-                if policy.include_ptd
-                else Decimal("0.00")
-            )
-
-            annual_premium = adjusted_premium + adb_charge + ptd_charge
-
-            # Calculate interval payments
-            interval_mapping = {
-                "quarterly": 4,
-                "semi_annual": 2,
-                "annual": 1,
-                "Single": 1,
-            }
-            interval_count = interval_mapping.get(
-                self.policy_holder.payment_interval, 1
-            )
-            interval_payment = annual_premium / Decimal(interval_count)
-
-            return annual_premium.quantize(Decimal("1.00")), interval_payment.quantize(
-                Decimal("1.00")
+            # Served from the policy's premium grid / rating cache (see insurance.rating)
+            return grid_premium(
+                policy, age, duration_years, sum_assured, self.policy_holder.payment_interval
             )
 
         except Exception as e: # Catch generic exceptions too
@@ -1473,7 +1490,10 @@ class PremiumPayment(models.Model):
 
         # --- Process Payment --- 
         payment_made_this_save = self.paid_amount
+        # Read by the commission ledger signal; zero when this save records no payment
+        self._payment_event = max(payment_made_this_save, Decimal("0.00"))
         if payment_made_this_save > 0:
+            self.payments_applied += 1
             # Decide how payment applies: Fine first, then principal? 
             # Simple approach: Just add to total_paid. Fine is tracked separately.
             self.total_paid += payment_made_this_save
@@ -1522,6 +1542,8 @@ class PremiumPayment(models.Model):
             print(f"Error calculating SSV: {e}")
             self.ssv_value = Decimal('0.00')
 
+        self.estimated_maturity_value = self.calculate_estimated_maturity_value()
+
         # Call full_clean to run validations (including our custom clean method)
         self.full_clean()
 
@@ -1569,7 +1591,9 @@ class PremiumPayment(models.Model):
             annual_bonus_rate = Decimal('0.045') 
 
             if guaranteed_rate > 0 and annual_premium > 0 and policy_term > 0:
-                future_value_factor = ((Decimal(1) + guaranteed_rate)**policy_term - Decimal(1)) / guaranteed_rate
+                future_value_factor = annuity_factors.factor(guaranteed_rate, policy_term)
+                if future_value_factor is None:
+                    raise InvalidOperation("future value factor could not be evaluated")
                 guaranteed_additions_future_value = annual_premium * future_value_factor
             else:
                 guaranteed_additions_future_value = annual_premium * policy_term
@@ -1624,8 +1648,86 @@ class AgentReport(models.Model):
         verbose_name = "Agent Report"
         verbose_name_plural = "Agent Reports"
 
+#Commission Ledger Model
+
+class CommissionLedgerEntry(models.Model):
+    """
+    One premium payment credited to an agent, with the commission it earned.
+
+    Entries are only ever appended. ``idempotency_key`` identifies the payment
+    event, so recording the same event twice adds nothing. AgentReport
+    premium and commission totals and SalesAgent.total_premium_collected are
+    rollups of this ledger.
+    """
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    agent = models.ForeignKey(SalesAgent, on_delete=models.CASCADE, related_name="commission_entries")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="commission_entries")
+    policy_holder = models.ForeignKey(
+        "PolicyHolder", on_delete=models.SET_NULL, null=True, blank=True, related_name="commission_entries"
+    )
+    premium_payment = models.ForeignKey(
+        PremiumPayment, on_delete=models.SET_NULL, null=True, blank=True, related_name="commission_entries"
+    )
+    event_date = models.DateField()
+    premium_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    commission_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    commission_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Commission Ledger Entry"
+        verbose_name_plural = "Commission Ledger Entries"
+        indexes = [
+            models.Index(fields=["agent", "event_date"]),
+            models.Index(fields=["event_date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.commission_amount} for {self.agent} on {self.event_date}"
+
+
+#Agent Performance Rollup Model
+
+class AgentPerformance(models.Model):
+    """
+    An agent's activity in one day or month, maintained incrementally.
+
+    Policies sold, premium collected, commission earned and policies lapsed
+    are added as the events happen, so leaderboards read a single row per
+    agent and period.
+    """
+    PERIOD_CHOICES = [
+        ("day", "Day"),
+        ("month", "Month"),
+    ]
+
+    agent = models.ForeignKey(SalesAgent, on_delete=models.CASCADE, related_name="performance")
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="agent_performance")
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    policies_sold = models.IntegerField(default=0)
+    premium_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    policies_lapsed = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Agent Performance"
+        verbose_name_plural = "Agent Performance"
+        constraints = [
+            models.UniqueConstraint(fields=["agent", "period", "period_start"], name="unique_agent_performance_period"),
+        ]
+        indexes = [
+            models.Index(fields=["period", "period_start", "branch"]),
+        ]
+
+    def __str__(self):
+        return f"{self.agent} {self.period} of {self.period_start}"
+
 #Loan Model 
 
+# Share of the GSV that can be lent against a policy
+LOAN_TO_GSV_RATIO = Decimal("0.90")
+
 class Loan(models.Model):
     policy_holder = models.ForeignKey(
         "PolicyHolder", on_delete=models.CASCADE, related_name="loans"
@@ -1667,10 +1769,12 @@ class Loan(models.Model):
     ) -> Dict[str, Union[bool, str, Decimal]]:
         """
         Calculate maximum loan amount and validate requested amount if provided.
+
+        Reads the GSV and maximum loan precomputed on the holder's financial summary.
         """
         try:
-            premium_payment = self.policy_holder.premium_payments.first()
-            if not premium_payment:
+            summary = PolicyFinancialSummary.for_holder(self.policy_holder)
+            if not summary.premium_payment_count:
                 return {
                     "is_valid": False,
                     "message": "No premium payments found for policy holder",
@@ -1678,8 +1782,8 @@ class Loan(models.Model):
                     "gsv_value": Decimal("0"),
                 }
 
-            gsv = premium_payment.gsv_value
-            max_loan = gsv * Decimal("0.90")
+            gsv = summary.gsv_value
+            max_loan = summary.max_loan
 
             result = {
                 "is_valid": True,
@@ -1734,9 +1838,17 @@ class Loan(models.Model):
         """Save the loan with validation."""
         try:
             self.full_clean()  # This will call our clean() method
-            if not self.pk:  # On loan creation
+            is_new = not self.pk
+            if is_new:  # On loan creation
                 self.remaining_balance = self.loan_amount
             super().save(*args, **kwargs)
+            if is_new:
+                LoanTransaction.objects.create(
+                    loan=self,
+                    transaction_type="Disbursement",
+                    transaction_date=date.today(),
+                    principal_amount=self.loan_amount,
+                )
         except ValidationError as e:
             raise ValidationError(e.message_dict)
         except Exception as e:
@@ -1763,9 +1875,16 @@ class Loan(models.Model):
                 * Decimal(days_since_last_accrual)
             )
 
-            self.accrued_interest += interest.quantize(Decimal("1.00"))
+            interest = interest.quantize(Decimal("1.00"))
+            self.accrued_interest += interest
             self.last_interest_date = today
             self.save()
+            LoanTransaction.objects.create(
+                loan=self,
+                transaction_type="Interest",
+                transaction_date=today,
+                interest_amount=interest,
+            )
         except Exception as e:
             raise ValidationError(f"Error accruing interest: {str(e)}")
 
@@ -1798,36 +1917,319 @@ class LoanRepayment(models.Model):
     )
 
     def process_repayment(self):
-        """Apply repayment to interest and/or principal."""
-        remaining = self.amount
-
-        if self.repayment_type in ("Both", "Interest"):
-            # Deduct from accrued interest first
-            interest_payment = min(remaining, self.loan.accrued_interest)
-            self.loan.accrued_interest -= interest_payment
-            remaining -= interest_payment
+        """
+        Apply repayment to interest and/or principal.
 
-        if self.repayment_type in ("Both", "Principal") and remaining > 0:
-            # Deduct from remaining balance
-            principal_payment = min(remaining, self.loan.remaining_balance)
-            self.loan.remaining_balance -= principal_payment
+        The loan row is locked for the split, and the new balances are
+        written with an update rather than ``Loan.save``, so concurrent
+        repayments on one loan cannot overwrite each other.
+        """
+        loan = Loan.objects.select_for_update().only(
+            "pk", "policy_holder_id", "remaining_balance", "accrued_interest", "loan_status"
+        ).get(pk=self.loan_id)
+        principal_payment, interest_payment = apply_repayment(loan, self.amount, self.repayment_type)
+        Loan.objects.filter(pk=loan.pk).update(
+            remaining_balance=loan.remaining_balance,
+            accrued_interest=loan.accrued_interest,
+            loan_status=loan.loan_status,
+        )
+        PolicyFinancialSummary.refresh(loan.policy_holder_id, ["loans"])
 
-        # Update loan status
-        if self.loan.remaining_balance <= 0 and self.loan.accrued_interest <= 0:
-            self.loan.loan_status = "Paid"
+        # Recorded in the loan ledger once this repayment is saved
+        self._ledger_amounts = (principal_payment, interest_payment)
 
-        # Save the updated loan
-        self.loan.save()
+        # Keep the caller's loan instance in step with the row
+        self.loan.remaining_balance = loan.remaining_balance
+        self.loan.accrued_interest = loan.accrued_interest
+        self.loan.loan_status = loan.loan_status
 
         # Set the remaining loan balance for this repayment
         self.remaining_loan_balance = (
-            self.loan.remaining_balance + self.loan.accrued_interest
+            loan.remaining_balance + loan.accrued_interest
         )
 
     def save(self, *args, **kwargs):
         """Process repayment before saving."""
-        self.process_repayment()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.process_repayment()
+            super().save(*args, **kwargs)
+            principal_payment, interest_payment = self._ledger_amounts
+            LoanTransaction.objects.create(
+                loan=self.loan,
+                repayment=self,
+                transaction_type="Repayment",
+                transaction_date=self.repayment_date,
+                principal_amount=-principal_payment,
+                interest_amount=-interest_payment,
+            )
 
     def __str__(self):
         return f"Repayment for {self.loan} on {self.repayment_date}"
+
+
+# Loan Ledger Model
+
+class LoanTransaction(models.Model):
+    """
+    One movement on a loan's principal or interest balance.
+
+    Amounts are signed: disbursements and interest accruals are positive,
+    repayments negative, so running sums give the balances. Repayments posted
+    from a file carry the line's ``reference``, so a file posted twice is
+    applied once.
+    """
+    TRANSACTION_TYPES = [
+        ("Opening", "Opening Balance"),
+        ("Disbursement", "Disbursement"),
+        ("Interest", "Interest Accrual"),
+        ("Repayment", "Repayment"),
+    ]
+
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="transactions")
+    repayment = models.ForeignKey(
+        LoanRepayment, on_delete=models.SET_NULL, null=True, blank=True, related_name="ledger_entries"
+    )
+    transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
+    transaction_date = models.DateField()
+    principal_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, help_text="Change in principal balance."
+    )
+    interest_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, help_text="Change in accrued interest."
+    )
+    reference = models.CharField(
+        max_length=100, unique=True, null=True, blank=True,
+        help_text="Payer's reference of a repayment posted from a file.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Loan Transaction"
+        verbose_name_plural = "Loan Transactions"
+        indexes = [
+            models.Index(fields=["loan", "transaction_date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_transaction_type_display()} on {self.loan} ({self.transaction_date})"
+
+
+#Policy Financial Summary Model
+
+class PolicyFinancialSummary(models.Model):
+    """
+    Running totals of a policy holder's bonuses, loans and premium payments.
+
+    Refreshed by signals whenever a Bonus, Loan, LoanRepayment or
+    PremiumPayment is written, so valuation and payout code can read them in
+    one row fetch instead of aggregating the related tables. The loan
+    eligibility columns are derived from the GSV and loan totals on every
+    refresh.
+    """
+    policy_holder = models.OneToOneField(
+        PolicyHolder, on_delete=models.CASCADE, primary_key=True, related_name="financial_summary"
+    )
+    total_bonus = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Sum of accrued bonuses."
+    )
+    loan_principal = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Remaining principal of active loans."
+    )
+    loan_interest = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Accrued interest of active loans."
+    )
+    total_premium_paid = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Sum of total_paid over premium payments."
+    )
+    premium_payment_count = models.PositiveIntegerField(default=0)
+    gsv_value = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="GSV of the first premium payment, the basis for loans."
+    )
+    max_loan = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, help_text="Largest loan the GSV allows."
+    )
+    loan_headroom = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, db_index=True,
+        help_text="Maximum loan less the outstanding loan, not below zero.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Groups of fields that can be refreshed independently
+    COMPONENTS = {
+        "bonus": ["total_bonus"],
+        "loans": ["loan_principal", "loan_interest"],
+        "premiums": ["total_premium_paid", "premium_payment_count", "gsv_value"],
+    }
+    # Derived from the components whenever any of them is refreshed
+    ELIGIBILITY_FIELDS = ["max_loan", "loan_headroom"]
+
+    class Meta:
+        verbose_name = "Policy Financial Summary"
+        verbose_name_plural = "Policy Financial Summaries"
+
+    def __str__(self):
+        return f"Financial summary for {self.policy_holder}"
+
+    @property
+    def outstanding_loan(self):
+        """Principal plus interest owed on active loans."""
+        return self.loan_principal + self.loan_interest
+
+    @classmethod
+    def compute(cls, policy_holder_id, components=None):
+        """Current values of the given components, aggregated from the source tables."""
+        components = components or cls.COMPONENTS
+        values = {}
+        if "bonus" in components:
+            values["total_bonus"] = Bonus.objects.filter(policy_holder_id=policy_holder_id).aggregate(
+                total=Sum("accrued_amount")
+            )["total"] or Decimal("0.00")
+        if "loans" in components:
+            loans = Loan.objects.filter(policy_holder_id=policy_holder_id, loan_status="Active").aggregate(
+                principal=Sum("remaining_balance"), interest=Sum("accrued_interest")
+            )
+            values["loan_principal"] = loans["principal"] or Decimal("0.00")
+            values["loan_interest"] = loans["interest"] or Decimal("0.00")
+        if "premiums" in components:
+            premiums = PremiumPayment.objects.filter(policy_holder_id=policy_holder_id).aggregate(
+                paid=Sum("total_paid"), count=Count("pk")
+            )
+            values["total_premium_paid"] = premiums["paid"] or Decimal("0.00")
+            values["premium_payment_count"] = premiums["count"]
+            values["gsv_value"] = PremiumPayment.objects.filter(policy_holder_id=policy_holder_id).order_by(
+                "pk"
+            ).values_list("gsv_value", flat=True).first() or Decimal("0.00")
+        return values
+
+    @staticmethod
+    def loan_eligibility(gsv_value, loan_principal, loan_interest):
+        """Maximum loan and remaining headroom for a GSV and the outstanding loans."""
+        max_loan = (gsv_value * LOAN_TO_GSV_RATIO).quantize(Decimal("1.00"), rounding=ROUND_DOWN)
+        return {
+            "max_loan": max_loan,
+            "loan_headroom": max(max_loan - loan_principal - loan_interest, Decimal("0.00")),
+        }
+
+    def update_loan_eligibility(self):
+        """Recompute ``max_loan`` and ``loan_headroom`` from the stored GSV and loans."""
+        for field, value in self.loan_eligibility(self.gsv_value, self.loan_principal, self.loan_interest).items():
+            setattr(self, field, value)
+        return self.ELIGIBILITY_FIELDS
+
+    @classmethod
+    def refresh(cls, policy_holder_id, components=None):
+        """
+        Recompute the given components (all if None) of a holder's summary and save them.
+
+        Only the requested components are aggregated; a summary that doesn't
+        exist yet is built from all of them.
+        """
+        components = components or cls.COMPONENTS
+        with transaction.atomic():
+            summary = cls.objects.select_for_update().filter(policy_holder_id=policy_holder_id).first()
+            if summary is None:
+                values = cls.compute(policy_holder_id)
+                summary, created = cls.objects.get_or_create(
+                    policy_holder_id=policy_holder_id,
+                    defaults={**values, **cls.loan_eligibility(
+                        values["gsv_value"], values["loan_principal"], values["loan_interest"]
+                    )},
+                )
+                if created:
+                    return summary
+                # Created concurrently; lock it and refresh as usual
+                summary = cls.objects.select_for_update().get(policy_holder_id=policy_holder_id)
+
+            values = cls.compute(policy_holder_id, components)
+            for field, value in values.items():
+                setattr(summary, field, value)
+            summary.save(update_fields=[*values, *summary.update_loan_eligibility(), "updated_at"])
+        return summary
+
+    @classmethod
+    def for_holder(cls, policy_holder):
+        """The holder's summary, built on first use."""
+        try:
+            return cls.objects.get(policy_holder_id=policy_holder.pk)
+        except cls.DoesNotExist:
+            return cls.refresh(policy_holder.pk)
+
+
+#Batch Job Checkpoint Model
+
+class BatchCheckpoint(models.Model):
+    """Progress of a resumable batch job, one row per job."""
+    job = models.CharField(max_length=100, unique=True)
+    last_completed_on = models.DateField(
+        null=True, blank=True, help_text="Run date of the last run that finished."
+    )
+    run_date = models.DateField(
+        null=True, blank=True, help_text="Run date of the run in progress, if any."
+    )
+    last_pk = models.BigIntegerField(
+        null=True, blank=True, help_text="Highest primary key processed by the run in progress."
+    )
+    processed = models.PositiveIntegerField(
+        default=0, help_text="Rows processed by the run in progress or the last run."
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Batch Checkpoint"
+        verbose_name_plural = "Batch Checkpoints"
+
+    def __str__(self):
+        return f"{self.job} (last completed {self.last_completed_on or 'never'})"
+
+
+#Claim Finalization Job Model
+
+class ClaimFinalizationJob(models.Model):
+    """
+    A queued request to finalize one ClaimProcessing, run by the claim worker.
+
+    Jobs enqueued together share a ``batch`` so their progress can be
+    followed as a whole. At most one job per claim can be queued or running.
+    """
+    STATUS_CHOICES = [
+        ("Queued", "Queued"),
+        ("Running", "Running"),
+        ("Done", "Done"),
+        ("Failed", "Failed"),
+    ]
+    DECISION_CHOICES = [
+        ("Approved", "Approved"),
+        ("Rejected", "Rejected"),
+    ]
+
+    claim_processing = models.ForeignKey(
+        ClaimProcessing, on_delete=models.CASCADE, related_name="finalization_jobs"
+    )
+    decision = models.CharField(max_length=20, choices=DECISION_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Queued")
+    batch = models.UUIDField(default=uuid.uuid4, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="claim_finalization_jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Claim Finalization Job"
+        verbose_name_plural = "Claim Finalization Jobs"
+        indexes = [
+            models.Index(fields=["status", "id"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["claim_processing"],
+                condition=models.Q(status__in=["Queued", "Running"]),
+                name="unique_active_claim_finalization_job",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.decision} {self.claim_processing} ({self.status})"
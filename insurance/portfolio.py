@@ -0,0 +1,552 @@
+"""
+Vectorized calculations over the whole book of policies.
+
+The per-object methods in models.py are convenient for a single record but run
+several queries each. The engines here load the same inputs for many records
+into NumPy arrays, compute every result in one pass and write back in bulk.
+
+Money and rates are held as scaled integers (fixed point) rather than floats,
+so the results match the Decimal arithmetic in models.py to the last paisa,
+including its ROUND_HALF_EVEN quantization. Where models.py works at full
+Decimal context precision (the compound-interest maturity factors) the arrays
+hold Decimal objects instead, which keeps the arithmetic identical.
+"""
+import csv
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+
+from insurance.constant import PAYMENT_INTERVAL_COUNTS
+from insurance.jobs import SURRENDER_VALUE_FIELDS, revalue_payments
+from insurance.rating import annuity_factors, rate_tables
+
+# Every rating input is a DecimalField with two decimal places
+RATE_SCALE = 100
+
+# int64 products must stay below this; larger books fall back to Python ints
+INT64_SAFE_LIMIT = 2 ** 62
+
+
+def compact(array):
+    """Use int64 when every value fits, otherwise keep exact Python ints."""
+    array = np.asarray(array, dtype=object)
+    if len(array) and max(abs(int(value)) for value in array) >= INT64_SAFE_LIMIT:
+        return array
+    return array.astype(np.int64)
+
+
+def to_fixed(values, scale=RATE_SCALE):
+    """Convert Decimals to scaled integers. Returns (array, mask of non-null values)."""
+    present = np.array([value is not None for value in values], dtype=bool)
+    fixed = compact(
+        [int((Decimal(value) * scale).to_integral_value()) if value is not None else 0 for value in values]
+    )
+    return fixed, present
+
+
+def multiply(left, right):
+    """Elementwise product that switches to Python ints instead of overflowing int64."""
+    if len(left) and int(np.abs(left).max()) * int(np.abs(right).max()) >= INT64_SAFE_LIMIT:
+        return left.astype(object) * right.astype(object)
+    return left * right
+
+
+def from_fixed(value, places=2):
+    """Convert a scaled integer back to a Decimal with ``places`` decimal places."""
+    return Decimal(int(value)).scaleb(-places)
+
+
+def divide_half_even(numerator, denominator):
+    """Integer division of arrays rounded like Decimal.quantize (ROUND_HALF_EVEN)."""
+    quotient = numerator // denominator
+    remainder = numerator - quotient * denominator
+    twice = remainder * 2
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up.astype(quotient.dtype)
+
+
+def lookup_intervals(index, keys):
+    """Vectorized IntervalIndex.lookup. Returns (scaled values, mask of hits)."""
+    if not len(index):
+        return np.zeros(len(keys), dtype=object), np.zeros(len(keys), dtype=bool)
+
+    values, present = to_fixed(index.values)
+    positions = np.searchsorted(np.array(index.boundaries), keys, side="right") - 1
+    found = positions >= 0
+    positions = np.where(found, positions, 0)
+    return values[positions], found & present[positions]
+
+
+class PremiumInputs:
+    """Columnar copy of everything ``PremiumPayment.calculate_premium`` reads."""
+
+    fields = (
+        "pk",
+        "policy_holder__policy_id",
+        "policy_holder__sum_assured",
+        "policy_holder__age",
+        "policy_holder__duration_years",
+        "policy_holder__payment_interval",
+        "policy_holder__policy_number",
+        "annual_premium",
+        "interval_payment",
+        "total_premium",
+        "total_paid",
+        "payment_status",
+        "next_payment_date",
+    )
+
+    def __init__(self, queryset):
+        from insurance.models import InsurancePolicy
+
+        rows = list(queryset.values_list(*self.fields).order_by("pk").iterator(chunk_size=5000))
+        columns = list(zip(*rows)) if rows else [()] * len(self.fields)
+        (
+            self.pks,
+            policy_ids,
+            sum_assured,
+            ages,
+            durations,
+            intervals,
+            self.policy_numbers,
+            self.annual_premium,
+            self.interval_payment,
+            self.total_premium,
+            self.total_paid,
+            self.payment_status,
+            self.next_payment_date,
+        ) = columns
+        self.size = len(rows)
+
+        self.sum_assured, self.has_sum_assured = to_fixed(sum_assured)
+        self.ages = np.array([age or 0 for age in ages], dtype=np.int64)
+        self.durations = np.array([duration or 0 for duration in durations], dtype=np.int64)
+        self.interval_counts = np.array(
+            [PAYMENT_INTERVAL_COUNTS.get(interval, 1) for interval in intervals], dtype=np.int64
+        )
+        self.single_payment = np.array([interval == "Single" for interval in intervals], dtype=bool)
+
+        # Per-product terms, broadcast to one entry per payment
+        policies = {
+            policy.pk: policy
+            for policy in InsurancePolicy.objects.filter(pk__in=set(policy_ids) - {None})
+        }
+        self.has_policy = np.array([policy_id in policies for policy_id in policy_ids], dtype=bool)
+        terms = [policies.get(policy_id) for policy_id in policy_ids]
+        self.policy_type = np.array([policy.policy_type if policy else "" for policy in terms], dtype=object)
+        self.base_multiplier, _ = to_fixed([policy.base_multiplier if policy else 0 for policy in terms])
+        self.adb_percentage, _ = to_fixed(
+            [policy.adb_percentage if policy and policy.include_adb else 0 for policy in terms]
+        )
+        self.ptd_percentage, _ = to_fixed(
+            [policy.ptd_percentage if policy and policy.include_ptd else 0 for policy in terms]
+        )
+
+
+def compute_premiums(inputs):
+    """
+    Annual and interval premiums, in paisa, for every row of ``inputs``.
+
+    Mirrors ``PremiumPayment.calculate_premium``. With every rate scaled by
+    100 the annual premium is ``sum_assured * K / 10**8`` where
+
+        Endownment: K = mortality * base_multiplier * duration_factor + (adb + ptd) * 10**4
+        Term:       K = (mortality + adb + ptd) * 10**4
+
+    Rows that calculate_premium would price at zero (missing policy, sum
+    assured, age, rating band or an unsupported policy type) come back as 0.
+    """
+    tables = rate_tables.tables()
+    mortality, has_mortality = lookup_intervals(tables["mortality"], inputs.ages)
+    duration_factor, has_duration_factor = lookup_intervals(tables["duration"], inputs.durations)
+
+    riders = (inputs.adb_percentage + inputs.ptd_percentage) * 10 ** 4
+    endowment = inputs.policy_type == "Endownment"
+    term = inputs.policy_type == "Term"
+    rate = np.where(
+        endowment,
+        multiply(multiply(mortality, inputs.base_multiplier), duration_factor) + riders,
+        mortality * 10 ** 4 + riders,
+    )
+
+    priced = (
+        inputs.has_policy
+        & inputs.has_sum_assured
+        & (inputs.sum_assured != 0)
+        & (inputs.ages > 0)
+        & has_mortality
+        & has_duration_factor
+        & (endowment | term)
+    )
+    numerator = np.where(priced, multiply(inputs.sum_assured, rate), 0)
+    annual = divide_half_even(numerator, 10 ** 8)
+    interval = divide_half_even(numerator, inputs.interval_counts * 10 ** 8)
+    return annual, interval
+
+
+class RerateChange:
+    """One premium payment whose stored premiums differ from the current rates."""
+
+    def __init__(self, pk, policy_number, old, new):
+        self.pk = pk
+        self.policy_number = policy_number
+        self.old = old
+        self.new = new
+
+    def __str__(self):
+        return (
+            f"#{self.pk} {self.policy_number or 'Pending'}: "
+            f"annual {self.old['annual_premium']} -> {self.new['annual_premium']}, "
+            f"interval {self.old['interval_payment']} -> {self.new['interval_payment']}, "
+            f"total {self.old['total_premium']} -> {self.new['total_premium']}"
+        )
+
+
+class RerateReport:
+    def __init__(self, examined, changes, dry_run):
+        self.examined = examined
+        self.changes = changes
+        self.dry_run = dry_run
+
+    @property
+    def annual_premium_delta(self):
+        return sum(
+            (change.new["annual_premium"] - change.old["annual_premium"] for change in self.changes),
+            Decimal("0.00"),
+        )
+
+
+RERATE_FIELDS = [
+    "annual_premium",
+    "interval_payment",
+    "total_premium",
+    "remaining_premium",
+    "payment_status",
+    "next_payment_date",
+]
+
+
+def rerate_premiums(queryset=None, dry_run=False, chunk_size=2000):
+    """
+    Re-price premium payments against the current rating tables.
+
+    Recomputes annual_premium, interval_payment and total_premium, then the
+    remaining premium and payment status the same way ``PremiumPayment.save``
+    derives them. Changed rows are written with chunked ``bulk_update``, so no
+    model ``save()`` or signal runs; their estimated maturity value, GSV, SSV
+    and their holders' loan eligibility are refreshed in the same
+    transaction. With ``dry_run`` nothing is written and the report lists
+    what would change.
+    """
+    from insurance.models import PremiumPayment
+
+    if queryset is None:
+        queryset = PremiumPayment.objects.all()
+
+    inputs = PremiumInputs(queryset)
+    annual, interval = compute_premiums(inputs)
+    total = np.where(inputs.single_payment, interval, annual * inputs.durations)
+
+    changes = []
+    for row in range(inputs.size):
+        total_paid = inputs.total_paid[row] or Decimal("0.00")
+        new = {
+            "annual_premium": from_fixed(annual[row]),
+            "interval_payment": from_fixed(interval[row]),
+            "total_premium": from_fixed(total[row]),
+        }
+        new["remaining_premium"] = max(new["total_premium"] - total_paid, Decimal("0.00"))
+        if total_paid >= new["total_premium"] and new["total_premium"] > 0:
+            new["payment_status"] = "Paid"
+        elif total_paid > 0:
+            new["payment_status"] = "Partially Paid"
+        else:
+            new["payment_status"] = "Unpaid"
+
+        old = {
+            "annual_premium": inputs.annual_premium[row],
+            "interval_payment": inputs.interval_payment[row],
+            "total_premium": inputs.total_premium[row],
+        }
+        if any(old[field] != new[field] for field in old):
+            # Fully paid policies have no next instalment, as in PremiumPayment.save
+            new["next_payment_date"] = None if new["payment_status"] == "Paid" else inputs.next_payment_date[row]
+            changes.append(RerateChange(inputs.pks[row], inputs.policy_numbers[row], old, new))
+
+    if not dry_run:
+        today = date.today()
+        for start in range(0, len(changes), chunk_size):
+            batch = [PremiumPayment(pk=change.pk, **change.new) for change in changes[start:start + chunk_size]]
+            with transaction.atomic():
+                PremiumPayment.objects.bulk_update(batch, RERATE_FIELDS)
+                # The estimated maturity value and GSV depend on the annual premium
+                rerated = PremiumPayment.objects.filter(pk__in=[payment.pk for payment in batch])
+                refresh_estimated_maturity_values(rerated)
+                revalue_payments(list(rerated.order_by("pk").values_list(*SURRENDER_VALUE_FIELDS)), today)
+
+    return RerateReport(inputs.size, changes, dry_run)
+
+
+# PolicyHolder.calculate_actual_maturity_value only values policies in these states
+MATURITY_STATUSES = ("Active", "Matured")
+
+# Flat yearly bonus assumed by PremiumPayment.calculate_estimated_maturity_value
+ESTIMATED_ANNUAL_BONUS_RATE = Decimal("0.045")
+
+
+def decimal_array(values, default="0.00"):
+    """Object array of Decimals with None replaced by ``default``."""
+    default = Decimal(default)
+    return np.array([default if value is None else value for value in values], dtype=object)
+
+
+def quantize_cents(values):
+    return np.array([value.quantize(Decimal("1.00")) for value in values], dtype=object)
+
+
+def guaranteed_additions_value(premiums, guaranteed, terms):
+    """
+    Future value of the annual premiums at the guaranteed interest rate.
+
+    Returns (values, mask of rows whose annuity factor could not be
+    evaluated). Rows without a positive rate, premium and term, or whose
+    factor failed, are valued at premium * term as in models.py.
+    """
+    compound = (
+        np.array([rate > 0 for rate in guaranteed], dtype=bool)
+        & np.array([premium > 0 for premium in premiums], dtype=bool)
+        & np.array([term > 0 for term in terms], dtype=bool)
+    )
+    factors = {}
+    for rate, term in set(zip(guaranteed[compound], terms[compound])):
+        factors[rate, term] = annuity_factors.factor(rate, term)
+    factor = np.array(
+        [
+            factors[rate, term] if is_compound else None
+            for rate, term, is_compound in zip(guaranteed, terms, compound)
+        ],
+        dtype=object,
+    )
+    factor_failed = compound & np.array([value is None for value in factor], dtype=bool)
+    return premiums * np.where(compound & ~factor_failed, factor, terms), factor_failed
+
+
+def estimated_maturity_value(sum_assured, terms, guaranteed_additions, terminal):
+    """Sum assured + guaranteed additions + flat yearly bonus + terminal bonus, to the paisa."""
+    return quantize_cents(
+        sum_assured
+        + guaranteed_additions
+        + sum_assured * ESTIMATED_ANNUAL_BONUS_RATE * terms
+        + sum_assured * terminal
+    )
+
+
+class MaturityProjection:
+    """
+    Column-oriented maturity valuation of a set of policy holders.
+
+    Each attribute named in ``columns`` is a sequence with one entry per
+    holder, in primary key order. ``estimated_maturity_value`` is the value
+    ``calculate_estimated_maturity_value`` gives for the holder's first
+    premium payment, or None when the holder has no payment yet.
+    """
+
+    columns = (
+        "policy_holder_id",
+        "policy_number",
+        "policy_code",
+        "status",
+        "sum_assured",
+        "duration_years",
+        "annual_premium",
+        "guaranteed_interest_rate",
+        "terminal_bonus_rate",
+        "accrued_bonus",
+        "estimated_maturity_value",
+        "actual_maturity_value",
+    )
+
+    def __init__(self, **columns):
+        for name in self.columns:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.policy_holder_id)
+
+    def rows(self):
+        return zip(*(getattr(self, name) for name in self.columns))
+
+    @property
+    def total_estimated(self):
+        return sum((value for value in self.estimated_maturity_value if value is not None), Decimal("0.00"))
+
+    @property
+    def total_actual(self):
+        return sum(self.actual_maturity_value, Decimal("0.00"))
+
+    def write_csv(self, stream):
+        """Write a header row and one row per holder to a text stream."""
+        writer = csv.writer(stream)
+        writer.writerow(self.columns)
+        for row in self.rows():
+            writer.writerow(["" if value is None else value for value in row])
+
+
+def project_maturity_values(queryset=None):
+    """
+    Estimated and actual maturity values for every policy holder in ``queryset``.
+
+    Mirrors ``PremiumPayment.calculate_estimated_maturity_value`` and
+    ``PolicyHolder.calculate_actual_maturity_value`` but reads all inputs with
+    three queries (holders with their policy terms, first premium payments and
+    summed bonuses). Future value factors come from the shared
+    ``annuity_factors`` table, looked up once per distinct (rate, term).
+    Rows the per-object methods would value at zero because of missing data
+    or an ineligible status come back as 0.00.
+    """
+    from insurance.models import Bonus, PolicyHolder, PremiumPayment
+
+    if queryset is None:
+        queryset = PolicyHolder.objects.all()
+
+    holders = list(
+        queryset.order_by("pk").values_list(
+            "pk",
+            "policy_number",
+            "status",
+            "sum_assured",
+            "duration_years",
+            "policy_id",
+            "policy__policy_code",
+            "policy__guaranteed_interest_rate",
+            "policy__terminal_bonus_rate",
+        )
+    )
+    holder_ids = queryset.values("pk")
+
+    # premium_payments.first() has no explicit ordering, so it is the lowest pk
+    first_premium = {}
+    payments = (
+        PremiumPayment.objects.filter(policy_holder__in=holder_ids)
+        .order_by("policy_holder_id", "pk")
+        .values_list("policy_holder_id", "annual_premium")
+    )
+    for holder_id, annual_premium in payments.iterator(chunk_size=5000):
+        first_premium.setdefault(holder_id, annual_premium)
+
+    bonuses = dict(
+        Bonus.objects.filter(policy_holder__in=holder_ids)
+        .order_by()
+        .values("policy_holder")
+        .annotate(total=Sum("accrued_amount"))
+        .values_list("policy_holder", "total")
+    )
+
+    columns = list(zip(*holders)) if holders else [()] * 9
+    (
+        pks,
+        policy_numbers,
+        statuses,
+        sum_assured,
+        durations,
+        policy_ids,
+        policy_codes,
+        guaranteed_rates,
+        terminal_rates,
+    ) = columns
+
+    sum_assured = decimal_array(sum_assured)
+    terms = np.array([Decimal(str(years)) if years else Decimal("0") for years in durations], dtype=object)
+    premiums = decimal_array([first_premium.get(pk) for pk in pks])
+    guaranteed = decimal_array(guaranteed_rates, "0.0000")
+    terminal = decimal_array(terminal_rates, "0.0000")
+    accrued = decimal_array([bonuses.get(pk) for pk in pks])
+
+    has_payment = np.array([pk in first_premium for pk in pks], dtype=bool)
+    has_policy = np.array([policy_id is not None for policy_id in policy_ids], dtype=bool)
+    eligible = np.array([status in MATURITY_STATUSES for status in statuses], dtype=bool)
+
+    guaranteed_additions, factor_failed = guaranteed_additions_value(premiums, guaranteed, terms)
+    zero = Decimal("0.00")
+
+    actual = quantize_cents(sum_assured + guaranteed_additions + accrued + sum_assured * terminal)
+    actual = np.where(eligible & has_policy, actual, zero)
+
+    estimated = estimated_maturity_value(sum_assured, terms, guaranteed_additions, terminal)
+    # The estimate has no fallback when the factor fails, it reports zero
+    estimated = np.where(has_policy & ~factor_failed, estimated, zero)
+    estimated = np.where(has_payment, estimated, None)
+
+    return MaturityProjection(
+        policy_holder_id=list(pks),
+        policy_number=list(policy_numbers),
+        policy_code=list(policy_codes),
+        status=list(statuses),
+        sum_assured=list(sum_assured),
+        duration_years=list(durations),
+        annual_premium=list(premiums),
+        guaranteed_interest_rate=list(guaranteed),
+        terminal_bonus_rate=list(terminal),
+        accrued_bonus=list(quantize_cents(accrued)),
+        estimated_maturity_value=list(estimated),
+        actual_maturity_value=list(actual),
+    )
+
+
+def refresh_estimated_maturity_values(queryset, chunk_size=2000):
+    """
+    Recompute the stored ``estimated_maturity_value`` of premium payments.
+
+    Gives the same figure as ``calculate_estimated_maturity_value`` for each
+    payment and writes only rows whose stored value differs, with chunked
+    ``bulk_update``. Returns the number of rows updated.
+    """
+    model = queryset.model
+    rows = list(
+        queryset.order_by("pk").values_list(
+            "pk",
+            "estimated_maturity_value",
+            "annual_premium",
+            "policy_holder__sum_assured",
+            "policy_holder__duration_years",
+            "policy_holder__policy_id",
+            "policy_holder__policy__guaranteed_interest_rate",
+            "policy_holder__policy__terminal_bonus_rate",
+        ).iterator(chunk_size=5000)
+    )
+    if not rows:
+        return 0
+    (
+        pks,
+        stored,
+        premiums,
+        sum_assured,
+        durations,
+        policy_ids,
+        guaranteed_rates,
+        terminal_rates,
+    ) = zip(*rows)
+
+    sum_assured = decimal_array(sum_assured)
+    terms = np.array([Decimal(str(years)) if years else Decimal("0") for years in durations], dtype=object)
+    premiums = decimal_array(premiums)
+    guaranteed = decimal_array(guaranteed_rates, "0.0000")
+    terminal = decimal_array(terminal_rates, "0.0000")
+    has_policy = np.array([policy_id is not None for policy_id in policy_ids], dtype=bool)
+
+    guaranteed_additions, factor_failed = guaranteed_additions_value(premiums, guaranteed, terms)
+    estimated = estimated_maturity_value(sum_assured, terms, guaranteed_additions, terminal)
+    estimated = np.where(has_policy & ~factor_failed, estimated, Decimal("0.00"))
+
+    changed = [
+        model(pk=pk, estimated_maturity_value=value)
+        for pk, old, value in zip(pks, stored, estimated)
+        if old != value
+    ]
+    for start in range(0, len(changed), chunk_size):
+        with transaction.atomic():
+            model.objects.bulk_update(changed[start:start + chunk_size], ["estimated_maturity_value"])
+    return len(changed)
@@ -0,0 +1,631 @@
+"""
+In-process caches for the premium rating tables.
+
+MortalityRate and DurationFactor are small reference tables that are read on
+every premium calculation but edited rarely. They are loaded once per process
+into sorted interval arrays and answered with bisect lookups, so a cache hit
+does not touch the database. Writes bump a shared version number in the Django
+cache (a database table shared by every worker, see ``CACHES``). Each process
+reads that version at most once every ``VERSION_CHECK_INTERVAL`` seconds and
+reloads when it has moved, so other workers pick up a change within that
+interval.
+
+The pricing terms of each InsurancePolicy are cached separately by
+``policy_terms``, so ``price_premium`` and the memoized ``quote`` can price
+plain inputs without loading a PolicyHolder or PremiumPayment. Editing a
+policy reloads only the terms, and memoized quotes are keyed by the terms
+themselves, so only that policy's quotes stop matching.
+
+BonusRate bands are cached per policy and year by ``bonus_rates``; GSVRate
+and SSVConfig year bands are compiled per policy into the same kind
+of interval index by ``surrender_bands``.
+
+On top of the tables, each policy has a materialized PremiumRateGrid holding
+the premium per 1000 sum assured for every age, duration, payment interval and
+rider combination. ``grid_premium`` prices from it with one dict lookup and a
+multiply. A product's grid is rebuilt on commit when its own pricing terms
+change, and every grid is when a rating table changes; all the changes made
+in one transaction share a single rebuild per product.
+
+Maturity valuation uses the future value factor ``((1+r)**n - 1)/r`` of the
+guaranteed interest rate over the policy term. Rates come from a handful of
+products and terms are small integers, so ``annuity_factors`` memoizes the
+factors by (rate, term) and precomputes each product's factors when it is saved.
+"""
+import bisect
+import functools
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from insurance.constant import PAYMENT_INTERVAL_COUNTS
+
+# Seconds a process trusts its copy of a table before reading the shared version again
+VERSION_CHECK_INTERVAL = 5
+
+# Size of the per-process memo of quote results
+QUOTE_CACHE_SIZE = 20000
+
+# Upper bound on memoized annuity factors; the table is cleared when it fills up
+ANNUITY_FACTOR_CACHE_SIZE = 10000
+
+# Ages covered by the materialized premium grid (PolicyHolder.clean allows 18-60)
+GRID_AGES = range(18, 61)
+
+# (include_adb, include_ptd) combinations materialized per policy
+RIDER_COMBINATIONS = [(False, False), (True, False), (False, True), (True, True)]
+
+PolicyTerms = namedtuple(
+    "PolicyTerms",
+    [
+        "pk", "name", "policy_type", "base_multiplier", "include_adb", "include_ptd",
+        "adb_percentage", "ptd_percentage", "min_sum_assured", "max_sum_assured",
+    ],
+)
+
+
+class IntervalIndex:
+    """
+    Sorted interval array built from ``(start, end, value)`` rows.
+
+    Rows are split into non-overlapping segments. Where rows overlap, the first
+    row in the given order wins, which mirrors
+    ``queryset.filter(start__lte=x, end__gte=x).first()``.
+    """
+
+    def __init__(self, rows):
+        rows = [
+            (start, end, value)
+            for start, end, value in rows
+            if start is not None and end is not None and start <= end
+        ]
+        points = sorted({start for start, _, _ in rows} | {end + 1 for _, end, _ in rows})
+
+        self.boundaries = []
+        self.values = []
+        for point in points:
+            winner = next((value for start, end, value in rows if start <= point <= end), None)
+            self.boundaries.append(point)
+            self.values.append(winner)
+
+    def lookup(self, key):
+        """Return the value of the interval covering ``key``, or None."""
+        if key is None:
+            return None
+        position = bisect.bisect_right(self.boundaries, key) - 1
+        if position < 0:
+            return None
+        return self.values[position]
+
+    def __len__(self):
+        return len(self.boundaries)
+
+
+class VersionedTableCache:
+    """
+    Base class for process-local caches of reference tables.
+
+    Subclasses implement ``load()``. The loaded tables are reused until the
+    shared version stored under ``version_key`` changes, which happens whenever
+    any process calls ``invalidate()``. The shared version is read at most once
+    every ``version_check_interval`` seconds, so hits in between run no query.
+    """
+
+    version_key = None
+    version_check_interval = VERSION_CHECK_INTERVAL
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None
+        self._version = None
+        self._shared_version = None
+        self._checked_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        raise NotImplementedError
+
+    def shared_version(self):
+        """The shared version, read from the cache when the last read is too old."""
+        now = time.monotonic()
+        if (
+            self._tables is None
+            or self._checked_at is None
+            or now - self._checked_at >= self.version_check_interval
+        ):
+            self._shared_version = cache.get(self.version_key, 0)
+            self._checked_at = now
+        return self._shared_version
+
+    def tables(self):
+        version = self.shared_version()
+        tables = self._tables
+        if tables is not None and version == self._version:
+            self.hits += 1
+            return tables
+
+        with self._lock:
+            if self._tables is None or version != self._version:
+                self._tables = self.load()
+                self._version = version
+                self.misses += 1
+            else:
+                self.hits += 1
+            return self._tables
+
+    def invalidate(self):
+        """Drop the local copy and tell other processes to reload theirs."""
+        self._tables = None
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, 1, timeout=None)
+
+    @property
+    def version(self):
+        """Version of the currently loaded tables."""
+        return self._version
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "version": self._version}
+
+
+class RateTableCache(VersionedTableCache):
+    """MortalityRate by age and DurationFactor by duration in years."""
+
+    version_key = "insurance:rate-tables:version"
+
+    def load(self):
+        from insurance.models import DurationFactor, MortalityRate
+
+        mortality = MortalityRate.objects.order_by("pk").values_list(
+            "age_group_start", "age_group_end", "rate"
+        )
+        duration = DurationFactor.objects.order_by("min_duration", "pk").values_list(
+            "min_duration", "max_duration", "factor"
+        )
+        return {
+            "mortality": IntervalIndex(mortality),
+            "duration": IntervalIndex(duration),
+        }
+
+    def invalidate(self):
+        super().invalidate()
+        _memoized_quote.cache_clear()
+
+    def mortality_rate(self, age):
+        """Mortality rate (%) for an age, or None if no age group covers it."""
+        return self.tables()["mortality"].lookup(age)
+
+    def duration_factor(self, duration_years):
+        """Duration factor for a policy term, or None if no band covers it."""
+        return self.tables()["duration"].lookup(duration_years)
+
+    def policy_terms(self, policy_id):
+        """Cached pricing terms of an InsurancePolicy, or None if it doesn't exist."""
+        return policy_terms.terms(policy_id)
+
+
+class PolicyTermsCache(VersionedTableCache):
+    """PolicyTerms of every InsurancePolicy, keyed by policy id."""
+
+    version_key = "insurance:policy-terms:version"
+
+    def load(self):
+        from insurance.models import InsurancePolicy
+
+        return {row[0]: PolicyTerms(*row) for row in InsurancePolicy.objects.values_list(*PolicyTerms._fields)}
+
+    def terms(self, policy_id):
+        return self.tables().get(policy_id)
+
+
+rate_tables = RateTableCache()
+policy_terms = PolicyTermsCache()
+
+
+SSVBand = namedtuple("SSVBand", ["ssv_factor", "eligibility_years"])
+
+
+class SurrenderBandCache(VersionedTableCache):
+    """GSVRate and SSVConfig year bands of every policy, keyed by policy id."""
+
+    version_key = "insurance:surrender-bands:version"
+
+    def load(self):
+        from insurance.models import GSVRate, SSVConfig
+
+        gsv, ssv = {}, {}
+        for policy_id, min_year, max_year, rate in GSVRate.objects.order_by("pk").values_list(
+            "policy_id", "min_year", "max_year", "rate"
+        ):
+            gsv.setdefault(policy_id, []).append((min_year, max_year, rate))
+        for policy_id, min_year, max_year, factor, eligibility in SSVConfig.objects.order_by("pk").values_list(
+            "policy_id", "min_year", "max_year", "ssv_factor", "eligibility_years"
+        ):
+            ssv.setdefault(policy_id, []).append((min_year, max_year, SSVBand(factor, eligibility)))
+        return {
+            "gsv": {policy_id: IntervalIndex(rows) for policy_id, rows in gsv.items()},
+            "ssv": {policy_id: IntervalIndex(rows) for policy_id, rows in ssv.items()},
+        }
+
+    def gsv_rate(self, policy_id, duration_years):
+        """GSV rate (%) of the band covering ``duration_years``, or None."""
+        index = self.tables()["gsv"].get(policy_id)
+        return index.lookup(duration_years) if index else None
+
+    def ssv_band(self, policy_id, duration_years):
+        """SSVBand covering ``duration_years``, or None."""
+        index = self.tables()["ssv"].get(policy_id)
+        return index.lookup(duration_years) if index else None
+
+
+surrender_bands = SurrenderBandCache()
+
+
+class BonusRateCache(VersionedTableCache):
+    """
+    BonusRate bands of every policy, indexed by declaration year and by
+    policy term (duration band).
+
+    ``latest_rate`` answers ``BonusRate.get_bonus_rate``: bands are merged
+    newest year first, so where several years cover a term the latest wins.
+    """
+
+    version_key = "insurance:bonus-rates:version"
+
+    def load(self):
+        from insurance.models import BonusRate
+
+        rows = {}
+        for policy_id, year, min_year, max_year, bonus_per_thousand in BonusRate.objects.order_by("-year", "pk").values_list(
+            "policy_id", "year", "min_year", "max_year", "bonus_per_thousand"
+        ):
+            rows.setdefault(policy_id, []).append((year, min_year, max_year, bonus_per_thousand))
+
+        tables = {}
+        for policy_id, bands in rows.items():
+            by_year = {}
+            for year, min_year, max_year, bonus_per_thousand in bands:
+                by_year.setdefault(year, []).append((min_year, max_year, bonus_per_thousand))
+            tables[policy_id] = {
+                "latest": IntervalIndex([band[1:] for band in bands]),
+                "years": {year: IntervalIndex(year_bands) for year, year_bands in by_year.items()},
+            }
+        return tables
+
+    def latest_rate(self, policy_id, duration_years):
+        """Bonus per 1000 sum assured of the latest year covering the term, or None."""
+        bands = self.tables().get(policy_id)
+        return bands["latest"].lookup(duration_years) if bands else None
+
+    def rate_for_year(self, policy_id, year, duration_years):
+        """Bonus per 1000 sum assured declared for ``year`` for the term, or None."""
+        bands = self.tables().get(policy_id)
+        index = bands["years"].get(year) if bands else None
+        return index.lookup(duration_years) if index else None
+
+
+bonus_rates = BonusRateCache()
+
+
+def annual_premium_rate(policy, age, duration_years, include_adb=None, include_ptd=None):
+    """
+    Unrounded annual premium per 1 of sum assured, or None when no mortality
+    rate or duration factor covers the inputs.
+
+    ``policy`` is an InsurancePolicy or its cached PolicyTerms. Riders default
+    to the policy's own ADB/PTD settings.
+    """
+    if include_adb is None:
+        include_adb = policy.include_adb
+    if include_ptd is None:
+        include_ptd = policy.include_ptd
+
+    mortality_rate = rate_tables.mortality_rate(age)
+    if mortality_rate is None:
+        return None
+
+    # Base premium per unit of sum assured
+    base_rate = Decimal(mortality_rate) / Decimal(100)
+
+    duration_factor = rate_tables.duration_factor(duration_years)
+    if duration_factor is None:
+        return None
+
+    # Adjust premium based on policy type
+    if policy.policy_type == "Endownment":
+        adjusted_rate = base_rate * Decimal(policy.base_multiplier) * Decimal(duration_factor)
+    elif policy.policy_type == "Term":
+        adjusted_rate = base_rate
+    else:
+        raise ValidationError(f"Unsupported policy type: {policy.policy_type}")
+
+    # Add ADB/PTD charges if applicable
+    adb_rate = Decimal(policy.adb_percentage) / Decimal(100) if include_adb else Decimal("0.00")
+    ptd_rate = Decimal(policy.ptd_percentage) / Decimal(100) if include_ptd else Decimal("0.00")
+
+    return adjusted_rate + adb_rate + ptd_rate
+
+
+def price_premium(policy, age, duration_years, sum_assured, payment_interval,
+                  include_adb=None, include_ptd=None):
+    """
+    Annual and interval premium for plain pricing inputs, from the rating tables.
+
+    Returns ``(0.00, 0.00)`` when no mortality rate or duration factor covers
+    the inputs. Every step is exact in Decimal, so pricing through the unit
+    rate gives the same figures as multiplying the sum assured in first.
+    """
+    rate = annual_premium_rate(policy, age, duration_years, include_adb, include_ptd)
+    if rate is None:
+        return Decimal("0.00"), Decimal("0.00")
+
+    annual_premium = sum_assured * rate
+    interval_count = PAYMENT_INTERVAL_COUNTS.get(payment_interval, 1)
+    interval_payment = annual_premium / Decimal(interval_count)
+
+    return annual_premium.quantize(Decimal("1.00")), interval_payment.quantize(Decimal("1.00"))
+
+
+class PremiumGridCache(VersionedTableCache):
+    """
+    PremiumRateGrid rows of each policy, keyed for O(1) lookup.
+
+    A policy's grid is loaded the first time it is priced and kept until any
+    grid is rebuilt.
+    """
+
+    version_key = "insurance:premium-grid:version"
+
+    def load(self):
+        return {}
+
+    def rates(self, policy_id, age, duration_years, payment_interval, include_adb, include_ptd):
+        """``(annual_rate, interval_rate)`` per 1000 sum assured, or None if not materialized."""
+        grids = self.tables()
+        grid = grids.get(policy_id)
+        if grid is None:
+            from insurance.models import PremiumRateGrid
+
+            rows = PremiumRateGrid.objects.filter(policy_id=policy_id).values_list(
+                "age", "duration_years", "payment_interval", "include_adb", "include_ptd",
+                "annual_rate", "interval_rate",
+            )
+            grid = grids[policy_id] = {row[:5]: row[5:] for row in rows}
+        return grid.get((age, duration_years, payment_interval, include_adb, include_ptd))
+
+
+premium_grids = PremiumGridCache()
+
+
+def grid_premium(policy, age, duration_years, sum_assured, payment_interval,
+                 include_adb=None, include_ptd=None):
+    """
+    ``price_premium`` answered from the policy's materialized PremiumRateGrid.
+
+    Inputs outside the grid, or a grid that hasn't been rebuilt yet, fall back
+    to pricing from the rating tables.
+    """
+    if include_adb is None:
+        include_adb = policy.include_adb
+    if include_ptd is None:
+        include_ptd = policy.include_ptd
+
+    rates = premium_grids.rates(
+        policy.pk, age, duration_years, payment_interval, bool(include_adb), bool(include_ptd)
+    )
+    if rates is None:
+        return price_premium(
+            policy, age, duration_years, sum_assured, payment_interval, include_adb, include_ptd
+        )
+
+    annual_rate, interval_rate = rates
+    annual_premium = sum_assured * annual_rate / Decimal(1000)
+    interval_payment = sum_assured * interval_rate / Decimal(1000)
+    return annual_premium.quantize(Decimal("1.00")), interval_payment.quantize(Decimal("1.00"))
+
+
+def build_premium_grid(policy):
+    """Unsaved PremiumRateGrid rows for every age, duration, interval and rider combination."""
+    from insurance.models import PremiumRateGrid
+
+    if policy.policy_type not in ("Endownment", "Term"):
+        return []
+
+    durations = rate_tables.tables()["duration"].boundaries
+    if not durations:
+        return []
+
+    rows = []
+    for age in GRID_AGES:
+        for duration_years in range(durations[0], durations[-1]):
+            for include_adb, include_ptd in RIDER_COMBINATIONS:
+                rate = annual_premium_rate(policy, age, duration_years, include_adb, include_ptd)
+                if rate is None:
+                    continue
+                annual_rate = rate * Decimal(1000)
+                for payment_interval, interval_count in PAYMENT_INTERVAL_COUNTS.items():
+                    rows.append(PremiumRateGrid(
+                        policy=policy,
+                        age=age,
+                        duration_years=duration_years,
+                        payment_interval=payment_interval,
+                        include_adb=include_adb,
+                        include_ptd=include_ptd,
+                        annual_rate=annual_rate,
+                        interval_rate=annual_rate / Decimal(interval_count),
+                    ))
+    return rows
+
+
+def rebuild_premium_grid(policy):
+    """Replace the materialized grid of ``policy``. Returns the number of rows written."""
+    from insurance.models import PremiumRateGrid
+
+    rows = build_premium_grid(policy)
+    with transaction.atomic():
+        PremiumRateGrid.objects.filter(policy=policy).delete()
+        PremiumRateGrid.objects.bulk_create(rows, batch_size=2000)
+        transaction.on_commit(premium_grids.invalidate)
+    return len(rows)
+
+
+_pending_grid_rebuilds = threading.local()
+
+
+def invalidate_premium_grids(policy_ids=None):
+    """
+    Drop the materialized grids of ``policy_ids`` (all policies if None).
+
+    Pricing falls back to the rating tables until the grids are rebuilt, by
+    ``schedule_premium_grid_rebuild`` or the ``build_premium_grids`` command.
+    """
+    from insurance.models import PremiumRateGrid
+
+    grids = PremiumRateGrid.objects.all()
+    if policy_ids is not None:
+        grids = grids.filter(policy_id__in=policy_ids)
+    grids.delete()
+    premium_grids.invalidate()
+
+
+def schedule_premium_grid_rebuild(policy_ids):
+    """Drop the grids of ``policy_ids`` and rebuild them once the transaction commits."""
+    invalidate_premium_grids(policy_ids)
+
+    pending = getattr(_pending_grid_rebuilds, "policy_ids", None)
+    if pending is None:
+        pending = _pending_grid_rebuilds.policy_ids = set()
+    pending.update(policy_ids)
+    transaction.on_commit(_rebuild_pending_grids)
+
+
+def _rebuild_pending_grids():
+    # Several changes in one transaction schedule one rebuild per policy
+    from insurance.models import InsurancePolicy
+
+    pending = getattr(_pending_grid_rebuilds, "policy_ids", None)
+    if not pending:
+        return
+    policy_ids = set(pending)
+    pending.clear()
+    for policy in InsurancePolicy.objects.filter(pk__in=policy_ids):
+        rebuild_premium_grid(policy)
+
+
+def future_value_factor(rate, term):
+    """
+    ``((1 + r)**n - 1) / r``, the future value of an ordinary annuity of 1.
+
+    Evaluated in Decimal at the current context precision. Returns None when
+    Decimal cannot evaluate it.
+    """
+    try:
+        return ((Decimal(1) + rate) ** term - Decimal(1)) / rate
+    except InvalidOperation:
+        return None
+
+
+class AnnuityFactorTable:
+    """
+    Memo of future value factors keyed by (rate, term).
+
+    Factors depend only on their inputs, so entries never go stale and the
+    table needs no invalidation.
+    """
+
+    def __init__(self, max_size=ANNUITY_FACTOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._factors = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def factor(self, rate, term):
+        """Memoized ``future_value_factor(rate, term)``."""
+        key = (rate, term)
+        try:
+            factor = self._factors[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return factor
+
+        factor = future_value_factor(rate, term)
+        with self._lock:
+            self.misses += 1
+            if len(self._factors) >= self.max_size:
+                self._factors.clear()
+            self._factors[key] = factor
+        return factor
+
+    def precompute(self, rate, terms):
+        """Fill in the factors of ``rate`` for every term in ``terms``."""
+        if rate is None:
+            return
+        # Unsaved form input may still be a str or float
+        rate = Decimal(str(rate))
+        if rate <= 0:
+            return
+        for term in terms:
+            key = (rate, Decimal(term))
+            if key not in self._factors:
+                self.factor(*key)
+
+    def precompute_policy(self, policy):
+        """Precompute a product's factors for every term the duration bands cover."""
+        durations = rate_tables.tables()["duration"].boundaries
+        if durations:
+            self.precompute(policy.guaranteed_interest_rate, range(durations[0], durations[-1]))
+
+    def clear(self):
+        with self._lock:
+            self._factors.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._factors)}
+
+
+annuity_factors = AnnuityFactorTable()
+
+
+@functools.lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _memoized_quote(version, policy, age, duration_years, sum_assured, payment_interval,
+                    include_adb, include_ptd):
+    return grid_premium(
+        policy, age, duration_years, sum_assured, payment_interval, include_adb, include_ptd
+    )
+
+
+def quote(policy_id, age, duration_years, sum_assured, payment_interval,
+          include_adb=None, include_ptd=None):
+    """
+    Memoized ``grid_premium`` for a policy id, served entirely from the cache.
+
+    Results are kept in a bounded LRU keyed by the rating table version, the
+    policy's terms and the pricing inputs. They are dropped whenever the rating
+    tables change; an edited policy's old entries simply stop matching and
+    age out.
+    """
+    policy = policy_terms.terms(policy_id)
+    if policy is None:
+        raise ValidationError(f"Insurance policy {policy_id} does not exist.")
+    rate_tables.tables()
+    return _memoized_quote(
+        rate_tables.version, policy, age, duration_years, Decimal(sum_assured),
+        payment_interval, include_adb, include_ptd,
+    )
+
+
+def quote_stats():
+    """Hit/miss counters of the quote memo."""
+    info = _memoized_quote.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
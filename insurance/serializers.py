@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.hashers import make_password
@@ -5,8 +7,10 @@ from insurance.models import (
     Occupation, MortalityRate, Company, Branch, InsurancePolicy, GSVRate, SSVConfig,
     AgentApplication, SalesAgent, DurationFactor, Customer, KYC, PolicyHolder,
     BonusRate, Bonus, ClaimRequest, ClaimProcessing, PaymentProcessing, Underwriting,
-    PremiumPayment, AgentReport, Loan, LoanRepayment, User
+    PremiumPayment, AgentReport, Loan, LoanRepayment, User, LoanTransaction, PolicyFinancialSummary,
+    ClaimFinalizationJob, AgentPerformance
 )
+from insurance.rating import rate_tables
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -15,6 +19,15 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = '__all__'
         read_only_fields = ('last_login', 'created_at', 'updated_at')
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Read-only user profile, without the password hash and permissions, for nesting and listings."""
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'email', 'gender', 'phone', 'user_type', 'branch',
+                  'agent', 'is_active', 'is_staff', 'created_at')
+        read_only_fields = fields
+
 class OccupationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Occupation
@@ -32,7 +45,7 @@ class CompanySerializer(serializers.ModelSerializer):
 
 class BranchSerializer(serializers.ModelSerializer):
     company_name = serializers.ReadOnlyField(source='company.name')
-    user_details = UserSerializer(source='user', read_only=True)
+    user_details = UserSummarySerializer(source='user', read_only=True)
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(user_type='branch'), required=False, allow_null=True)
     total_agents = serializers.SerializerMethodField()
     total_policy_holders = serializers.SerializerMethodField()
@@ -45,16 +58,26 @@ class BranchSerializer(serializers.ModelSerializer):
             'total_policies',
             'total_premium',]
         read_only_fields = ['id', 'company_name', 'user_details']
+
+    # Statistics come from the annotations of Branch.objects.with_stats() when
+    # present, so a list costs no query per branch; a freshly saved branch
+    # falls back to counting.
     def get_total_agents(self, obj):
+        if hasattr(obj, 'total_agents'):
+            return obj.total_agents
         return SalesAgent.objects.filter(branch=obj).count()
 
     def get_total_policy_holders(self, obj):
+        if hasattr(obj, 'total_policy_holders'):
+            return obj.total_policy_holders
         return PolicyHolder.objects.filter(branch=obj).count()
 
     def get_total_policies(self, obj):
-        return PolicyHolder.objects.filter(branch=obj).count()
+        return self.get_total_policy_holders(obj)
 
     def get_total_premium(self, obj):
+        if hasattr(obj, 'total_premium'):
+            return obj.total_premium
         from django.db.models import Sum
         return PremiumPayment.objects.filter(policy_holder__branch=obj).aggregate(
             total=Sum('total_paid')
@@ -93,6 +116,8 @@ class SalesAgentSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesAgent
         fields = '__all__'
+        read_only_fields = ('total_policies_sold', 'total_premium_collected', 'total_commission_earned',
+                            'active_policies', 'lapsed_policies', 'last_policy_date')
     
     def get_agent_name(self, obj):
         if obj.application:
@@ -105,7 +130,7 @@ class DurationFactorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class CustomerSerializer(serializers.ModelSerializer):
-    user_details = UserSerializer(source='user', read_only=True)
+    user_details = UserSummarySerializer(source='user', read_only=True)
     password = serializers.CharField(write_only=True, required=False, style={'input_type': 'password'})
     email = serializers.EmailField(required=True)
 
@@ -163,13 +188,36 @@ class CustomerSerializer(serializers.ModelSerializer):
         
         return instance
 
+class KYCCustomerSerializer(serializers.ModelSerializer):
+    """Customer contact details embedded in a KYC record with ``?expand=customer``."""
+    class Meta:
+        model = Customer
+        fields = ('id', 'first_name', 'middle_name', 'last_name', 'email', 'phone_number', 'address', 'gender')
+        read_only_fields = fields
+
 class KYCSerializer(serializers.ModelSerializer):
+    """
+    KYC record with its customer as an ID, or as contact details when the
+    request asks for ``?expand=customer``. The viewset joins the customer, so
+    either form takes one query.
+    """
     customer_name = serializers.ReadOnlyField(source='customer.get_full_name')
-    
+
     class Meta:
         model = KYC
-        fields = '__all__'
-        depth = 10
+        fields = ('id', 'customer', 'customer_name', 'document_type', 'document_number', 'document_front',
+                  'document_back', 'pan_number', 'pan_front', 'pan_back', 'pp_photo', 'province', 'district',
+                  'municipality', 'ward', 'nearest_hospital', 'natural_hazard_exposure', 'status')
+
+    def expands_customer(self):
+        request = self.context.get('request')
+        return request is not None and 'customer' in request.query_params.get('expand', '').split(',')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.expands_customer():
+            data['customer'] = KYCCustomerSerializer(instance.customer).data
+        return data
 
 class PolicyHolderSerializer(serializers.ModelSerializer):
     customer_name = serializers.SerializerMethodField()
@@ -232,7 +280,7 @@ class ClaimProcessingSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_claim_number(self, obj):
-        return f"Claim #{obj.claim_request.id}"
+        return f"Claim #{obj.claim_request_id}"
 
 class PaymentProcessingSerializer(serializers.ModelSerializer):
     claim_number = serializers.SerializerMethodField()
@@ -245,7 +293,7 @@ class PaymentProcessingSerializer(serializers.ModelSerializer):
         read_only_fields = ('amount_paid', 'payment_date')
     
     def get_claim_number(self, obj):
-        return f"Claim #{obj.claim_request.id}"
+        return f"Claim #{obj.claim_request_id}"
 
 class UnderwritingSerializer(serializers.ModelSerializer):
     policy_holder_number = serializers.ReadOnlyField(source='policy_holder.policy_number')
@@ -269,7 +317,8 @@ class PremiumPaymentSerializer(serializers.ModelSerializer):
         model = PremiumPayment
         fields = '__all__'
         read_only_fields = ('annual_premium', 'interval_payment', 'total_paid', 
-                           'total_premium', 'remaining_premium', 'gsv_value', 'ssv_value')
+                           'total_premium', 'remaining_premium', 'gsv_value', 'ssv_value',
+                           'estimated_maturity_value')
     
     def get_customer_name(self, obj):
         if obj.policy_holder and obj.policy_holder.customer:
@@ -305,17 +354,17 @@ class LoanSerializer(serializers.ModelSerializer):
             return f"{obj.policy_holder.customer.first_name} {obj.policy_holder.customer.last_name}"
         return "No Customer"
     
-    def validate_loan_amount(self, value):
+    def validate(self, attrs):
         """
         Validate the loan amount against the policy's maximum allowed value.
         """
-        policy_holder = self.context.get('policy_holder')
-        if policy_holder:
-            loan = Loan(policy_holder=policy_holder, loan_amount=value)
-            validation = loan.calculate_max_loan(value)
+        policy_holder = attrs.get('policy_holder')
+        if policy_holder and 'loan_amount' in attrs:
+            loan = Loan(policy_holder=policy_holder, loan_amount=attrs['loan_amount'])
+            validation = loan.calculate_max_loan(attrs['loan_amount'])
             if not validation['is_valid']:
-                raise serializers.ValidationError(validation['message'])
-        return value
+                raise serializers.ValidationError({'loan_amount': validation['message']})
+        return attrs
 
 class LoanRepaymentSerializer(serializers.ModelSerializer):
     loan_id = serializers.ReadOnlyField(source='loan.id')
@@ -329,4 +378,118 @@ class LoanRepaymentSerializer(serializers.ModelSerializer):
     def get_policy_holder_number(self, obj):
         if obj.loan and obj.loan.policy_holder:
             return obj.loan.policy_holder.policy_number
-        return "No Policy"
\ No newline at end of file
+        return "No Policy"
+
+class PayoutPreviewSerializer(serializers.Serializer):
+    """A claim's payout as computed by ``claims.claim_payouts``."""
+    claim_request = serializers.IntegerField()
+    policy_holder = serializers.IntegerField(source='policy_holder_id')
+    sum_assured = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_bonus = serializers.DecimalField(max_digits=14, decimal_places=2)
+    outstanding_loan = serializers.DecimalField(max_digits=14, decimal_places=2)
+    payout = serializers.DecimalField(max_digits=14, decimal_places=2, source='amount')
+
+class ClaimFinalizationJobSerializer(serializers.ModelSerializer):
+    claim_request = serializers.ReadOnlyField(source='claim_processing.claim_request_id')
+
+    class Meta:
+        model = ClaimFinalizationJob
+        fields = ('id', 'claim_processing', 'claim_request', 'decision', 'status', 'batch', 'attempts',
+                  'error', 'requested_by', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
+
+class LoanEligibilitySerializer(serializers.ModelSerializer):
+    """Precomputed loan eligibility of a policy holder, read from its financial summary."""
+    policy_number = serializers.ReadOnlyField(source='policy_holder.policy_number')
+    branch = serializers.ReadOnlyField(source='policy_holder.branch_id')
+    outstanding_loan = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = PolicyFinancialSummary
+        fields = ('policy_holder', 'policy_number', 'branch', 'gsv_value', 'max_loan',
+                  'outstanding_loan', 'loan_headroom', 'updated_at')
+        read_only_fields = fields
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Query parameters of the agent leaderboard."""
+    METRICS = ('premium_collected', 'commission_earned', 'policies_sold')
+
+    period = serializers.ChoiceField(choices=AgentPerformance.PERIOD_CHOICES, default='month')
+    date = serializers.DateField(required=False)
+    branch = serializers.IntegerField(required=False)
+    company = serializers.IntegerField(required=False)
+    metric = serializers.ChoiceField(choices=METRICS, default='premium_collected')
+
+class AgentLeaderboardSerializer(serializers.ModelSerializer):
+    """An agent's precomputed performance in the period, with its rank by the requested metric."""
+    rank = serializers.IntegerField(read_only=True)
+    agent_code = serializers.ReadOnlyField(source='agent.agent_code')
+    agent_name = serializers.ReadOnlyField(source='agent.get_full_name')
+    active_policies = serializers.ReadOnlyField(source='agent.active_policies')
+    lapsed_policies = serializers.ReadOnlyField(source='agent.lapsed_policies')
+
+    class Meta:
+        model = AgentPerformance
+        fields = ('rank', 'agent', 'agent_code', 'agent_name', 'branch', 'period', 'period_start',
+                  'policies_sold', 'premium_collected', 'commission_earned', 'policies_lapsed',
+                  'active_policies', 'lapsed_policies')
+        read_only_fields = fields
+
+class RepaymentLineSerializer(serializers.Serializer):
+    """One line of a repayment file posted through the bulk endpoint."""
+    loan = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+    repayment_type = serializers.ChoiceField(
+        choices=LoanRepayment._meta.get_field('repayment_type').choices, default='Both'
+    )
+    reference = serializers.CharField(max_length=100, required=False)
+
+class LoanStatementEntrySerializer(serializers.ModelSerializer):
+    """A ledger entry with the running balances annotated by ``loan_statement``."""
+    principal_balance = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    interest_balance = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = LoanTransaction
+        fields = ('id', 'transaction_type', 'transaction_date', 'principal_amount', 'interest_amount',
+                  'principal_balance', 'interest_balance', 'repayment', 'reference')
+
+class RepaymentPlanSerializer(serializers.Serializer):
+    """Repayment plan for a forward amortization schedule: a fixed instalment or a number of months."""
+    instalment = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    months = serializers.IntegerField(min_value=1, max_value=600, required=False)
+    start = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if ('instalment' in attrs) == ('months' in attrs):
+            raise serializers.ValidationError("Provide either 'instalment' or 'months'.")
+        return attrs
+
+class QuoteSerializer(serializers.Serializer):
+    """Plain pricing inputs for a premium quote, validated against the cached rating tables."""
+    policy = serializers.IntegerField()
+    age = serializers.IntegerField(min_value=18, max_value=60)
+    duration_years = serializers.IntegerField(min_value=1)
+    sum_assured = serializers.DecimalField(max_digits=12, decimal_places=2)
+    payment_interval = serializers.ChoiceField(
+        choices=PolicyHolder._meta.get_field('payment_interval').choices, default='annual'
+    )
+    include_adb = serializers.BooleanField(allow_null=True, default=None)
+    include_ptd = serializers.BooleanField(allow_null=True, default=None)
+
+    def validate(self, attrs):
+        policy = rate_tables.policy_terms(attrs['policy'])
+        if policy is None:
+            raise serializers.ValidationError({'policy': f"Invalid pk \"{attrs['policy']}\" - object does not exist."})
+
+        if attrs['sum_assured'] < policy.min_sum_assured:
+            raise serializers.ValidationError({'sum_assured': f"Sum assured must be at least {policy.min_sum_assured}."})
+        if attrs['sum_assured'] > policy.max_sum_assured:
+            raise serializers.ValidationError({'sum_assured': f"Sum assured cannot exceed {policy.max_sum_assured}."})
+
+        # Riders default to the product's own settings
+        if attrs['include_adb'] is None:
+            attrs['include_adb'] = policy.include_adb
+        if attrs['include_ptd'] is None:
+            attrs['include_ptd'] = policy.include_ptd
+        return attrs
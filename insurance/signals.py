@@ -1,12 +1,20 @@
 from django.dispatch import receiver
-from insurance.models import AgentApplication, AgentReport, Bonus, ClaimProcessing, ClaimRequest, Customer, PaymentProcessing, PolicyHolder, PremiumPayment, SalesAgent, Underwriting, User
-from django.db.models.signals import post_save, pre_delete
+from insurance.models import KYC, AgentApplication, AgentReport, Bonus, BonusRate, Branch, ClaimProcessing, ClaimRequest, Company, Customer, DurationFactor, GSVRate, InsurancePolicy, Loan, MortalityRate, Occupation, PaymentProcessing, PolicyFinancialSummary, PolicyHolder, PremiumPayment, SalesAgent, SSVConfig, Underwriting, User
+from insurance.dashboard import invalidate_snapshot
+from insurance.commissions import bump_performance, record_policy_status, record_premium_payment, report_defaults
+from insurance.jobs import anniversary, backfill_bonus_gaps, bonus_year_due
+from insurance.portfolio import refresh_estimated_maturity_values
+from insurance.rating import (
+    annuity_factors, bonus_rates, policy_terms, rate_tables, schedule_premium_grid_rebuild,
+    surrender_bands,
+)
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from datetime import date
 from django.utils import timezone
 from decimal import Decimal
 from django.db import transaction
-from rest_framework.authtoken.models import Token
 from django.db.models import F
+from rest_framework.authtoken.models import Token
 
 ''' Agent Application signals'''
 
@@ -115,30 +123,22 @@ def update_agent_stats_on_new_policy(sender, instance, created, **kwargs):
         with transaction.atomic():
             agent = instance.agent
             
-            # Update agent's total policies
-            agent.total_policies_sold += 1
-            agent.last_policy_date = timezone.now().date()
-            agent.save()
-
-            # Create or update the monthly report
-            report_date = timezone.now().date()
-            report, created = AgentReport.objects.get_or_create(
+            # Update agent's total policies without overwriting concurrently maintained counters
+            SalesAgent.objects.filter(pk=agent.pk).update(
+                total_policies_sold=F('total_policies_sold') + 1,
+                last_policy_date=timezone.now().date(),
+            )
+            bump_performance(agent.pk, agent.branch_id, timezone.now().date(), policies_sold=1)
+
+            # Create the monthly report if needed, then count the sale in the database
+            month = timezone.now().date().replace(day=1)  # First day of current month
+            report, _ = AgentReport.objects.get_or_create(
                 agent=agent,
                 branch=agent.branch,
-                report_date=report_date.replace(day=1),  # First day of current month
-                defaults={
-                    'reporting_period': f"{report_date.year}-{report_date.month}",
-                    'policies_sold': 0,
-                    'total_premium': Decimal('0.00'),
-                    'commission_earned': Decimal('0.00'),
-                    'target_achievement': Decimal('0.00'),
-                    'renewal_rate': Decimal('0.00'),
-                    'customer_retention': Decimal('0.00'),
-                }
+                report_date=month,
+                defaults=report_defaults(month),
             )
-            
-            report.policies_sold += 1
-            report.save()
+            AgentReport.objects.filter(pk=report.pk).update(policies_sold=F('policies_sold') + 1)
 
 # Urenewal process
 @receiver(post_save, sender=PolicyHolder)
@@ -166,43 +166,40 @@ def handle_policy_renewal(sender, instance, created, **kwargs):
 # Signal handlers for PolicyHolder model to trigger bonus on anniversary
 @receiver(post_save, sender=PolicyHolder)
 def trigger_bonus_on_anniversary(sender, instance, created, **kwargs):
-    """Automatically credit bonus if the policy is over one year old."""
+    """Automatically credit the current year's bonus once the policy's anniversary has passed."""
     today = date.today() 
+    pending = getattr(instance, '_previous_bonus_terms', None)
+    previous = pending.pop() if pending else None
+    if instance.status != 'Active' or not instance.start_date:
+        return # Only active policies earn bonuses, as in declare_bonuses
 
-    # Ensure the policy is active and at least one year old
-    if instance.status == 'Active' and (today - instance.start_date).days >= 365:
+    # Ensure this year's anniversary has passed
+    if bonus_year_due(instance.start_date, today.year, today):
         # Check if a bonus already exists for the current year
         if not Bonus.objects.filter(policy_holder=instance, start_date__year=today.year).exists():
             try:
-                # Create the bonus for the current year
+                # Create the bonus for the current year, dated on the anniversary
                Bonus.objects.create(
+                    customer=instance.customer,
                     policy_holder=instance,
                     bonus_type='SI',  # Assuming Simple Interest as default
-                    start_date=today
+                    start_date=anniversary(instance.start_date, today.year)
                 )
                 # The bonus is calculated and saved in the Bonus model's save method
             except Exception as e:
                 print(f"Error creating bonus: {e}")
 
-    # Handle backdated policies (if start_date is updated)
-    if not created and instance.start_date:
-        # Calculate the years since the policy started
-        start_year = instance.start_date.year
-        current_year = today.year
-
-        for year in range(start_year + 1, current_year + 1):
-            # Check if a bonus already exists for the year
-            if not Bonus.objects.filter(policy_holder=instance, start_date__year=year).exists():
-                try:
-                    # Credit bonus for the year
-                    Bonus.objects.create(
-                        policy_holder=instance,
-                        bonus_type='SI',
-                        start_date=date(year, instance.start_date.month, instance.start_date.day)
-                    )
-                    # The bonus is calculated and saved in the Bonus model's save method
-                except Exception as e:
-                    print(f"Error creating bonus for year {year}: {e}")
+    # Handle backdated policies (if start_date, status or policy changed): credit every
+    # missing year whose anniversary has passed in one batch once the save has committed
+    bonus_terms_changed = previous != (instance.status, instance.start_date, instance.policy_id)
+    if not created and bonus_terms_changed and instance.start_date.year < today.year:
+        policy_holder_id = instance.pk
+        def backfill():
+            try:
+                backfill_bonus_gaps(PolicyHolder.objects.filter(pk=policy_holder_id))
+            except Exception as e:
+                print(f"Error backfilling bonuses for PolicyHolder {policy_holder_id}: {e}")
+        transaction.on_commit(backfill)
 
 # Signal handlers for PolicyHolder model to clean up related records
 @receiver(pre_delete, sender=PolicyHolder)
@@ -250,7 +247,7 @@ def create_auth_token_user(sender, instance=None, created=False, **kwargs):
         return
     if created:
         try:
-            Token.objects.create(user=instance)
+            Token.objects.get_or_create(user=instance)  # models.create_auth_token may have created it
         except Exception as e:
             print(f"Error creating auth token for user {instance.username}: {str(e)}")
 
@@ -258,59 +255,13 @@ def create_auth_token_user(sender, instance=None, created=False, **kwargs):
 
 @receiver(post_save, sender=PremiumPayment)
 def update_agent_report_and_commission(sender, instance, **kwargs):
-    """Update agent report and commission when a premium payment is made/saved."""
-    if AgentReport is None or SalesAgent is None or PremiumPayment is None or PolicyHolder is None:
-        return
-        
-    agent = instance.policy_holder.agent
-    if not agent:
-        return
-
-    # Check if the interval_payment has been calculated (is > 0)
-    interval_payment_decimal = instance.interval_payment if isinstance(instance.interval_payment, Decimal) else Decimal(str(instance.interval_payment))
-    if interval_payment_decimal <= 0:
-        return # Don't process if interval payment isn't calculated yet or is zero
+    """Record the agent's commission when this save applied a premium payment."""
+    amount = getattr(instance, '_payment_event', None)
+    if not amount:
+        return # Saves that record no payment earn no commission
 
-    # *** Key Change: Check if total_paid was actually modified in this save ***
-    # This relies on the model save() logic resetting paid_amount after processing.
-    # A truly robust solution might need pre_save to capture the state or use django-dirtyfields.
-    # Simplified check: Assume if interval_payment > 0 and save happens, commission might apply.
-    # A better check might be to see if total_paid increased, but that requires pre_save state.
-    
-    # Let's proceed assuming a save with interval_payment > 0 implies a payment event for now.
     try:
-        with transaction.atomic():
-            # *** Use current date to determine the report period ***
-            report_date = timezone.now().date() # Use current date
-
-            report, created_report = AgentReport.objects.get_or_create(
-                agent=agent,
-                branch=agent.branch,
-                report_date=report_date.replace(day=1), # Use first day of CURRENT month
-                defaults={
-                    'reporting_period': f"{report_date.year}-{report_date.month}", # Current month/year
-                    'policies_sold': 0, # Note: policies_sold updated by PolicyHolder signal
-                    'total_premium': Decimal('0.00'),
-                    'commission_earned': Decimal('0.00'),
-                    'target_achievement': Decimal('0.00'),
-                    'renewal_rate': Decimal('0.00'),
-                    'customer_retention': Decimal('0.00'),
-                }
-            )
-
-            commission_rate_decimal = agent.commission_rate if isinstance(agent.commission_rate, Decimal) else Decimal(str(agent.commission_rate))
-            commission = (interval_payment_decimal * commission_rate_decimal / 100).quantize(Decimal('1.00')) # Calculate commission
-
-            # Use F expressions for atomic updates - Apply commission based on the interval payment
-            report.total_premium = F('total_premium') + interval_payment_decimal 
-            report.commission_earned = F('commission_earned') + commission
-            report.save()
-            
-            # Update agent totals atomically if possible
-            current_total_premium = agent.total_premium_collected if isinstance(agent.total_premium_collected, Decimal) else Decimal(str(agent.total_premium_collected))
-            agent.total_premium_collected = current_total_premium + interval_payment_decimal
-            agent.save(update_fields=['total_premium_collected'])
-
+        record_premium_payment(instance, amount, timezone.now().date())
     except Exception as e:
         print(f"Error in update_agent_report_and_commission signal: {str(e)}")
 
@@ -339,6 +290,134 @@ def update_policy_holder_payment_status(sender, instance, **kwargs):
     except Exception as e:
         print(f"Error updating payment status: {str(e)}")
 
+''' Policy financial summary signals'''
+
+def refresh_financial_summary(policy_holder_id, component):
+    PolicyFinancialSummary.refresh(policy_holder_id, [component])
+
+def refresh_financial_summary_after_delete(policy_holder_id, component):
+    # The holder itself may be what is being deleted, so wait until the delete
+    # has committed and skip holders that no longer exist
+    def refresh():
+        if PolicyHolder.objects.filter(pk=policy_holder_id).exists():
+            refresh_financial_summary(policy_holder_id, component)
+    transaction.on_commit(refresh)
+
+@receiver(post_save, sender=Bonus)
+def update_summary_on_bonus_save(sender, instance, **kwargs):
+    refresh_financial_summary(instance.policy_holder_id, 'bonus')
+
+@receiver(post_delete, sender=Bonus)
+def update_summary_on_bonus_delete(sender, instance, **kwargs):
+    refresh_financial_summary_after_delete(instance.policy_holder_id, 'bonus')
+
+@receiver(post_save, sender=Loan)
+def update_summary_on_loan_save(sender, instance, **kwargs):
+    refresh_financial_summary(instance.policy_holder_id, 'loans')
+
+@receiver(post_delete, sender=Loan)
+def update_summary_on_loan_delete(sender, instance, **kwargs):
+    refresh_financial_summary_after_delete(instance.policy_holder_id, 'loans')
+
+@receiver(post_save, sender=PremiumPayment)
+def update_summary_on_premium_payment_save(sender, instance, **kwargs):
+    refresh_financial_summary(instance.policy_holder_id, 'premiums')
+
+@receiver(post_delete, sender=PremiumPayment)
+def update_summary_on_premium_payment_delete(sender, instance, **kwargs):
+    refresh_financial_summary_after_delete(instance.policy_holder_id, 'premiums')
+
+''' Rating table signals'''
+
+@receiver([post_save, post_delete], sender=MortalityRate)
+@receiver([post_save, post_delete], sender=DurationFactor)
+def invalidate_rate_tables(sender, **kwargs):
+    """Drop the cached rating tables and quotes so premium calculations reload them."""
+    rate_tables.invalidate()
+    # Invalidate again once committed, in case another worker reloaded the old rows in between
+    transaction.on_commit(rate_tables.invalidate)
+
+@receiver([post_save, post_delete], sender=InsurancePolicy)
+def invalidate_policy_terms(sender, **kwargs):
+    """Reload the policies' pricing terms; quotes of other policies stay memoized."""
+    policy_terms.invalidate()
+    transaction.on_commit(policy_terms.invalidate)
+
+''' Surrender value band signals'''
+
+@receiver([post_save, post_delete], sender=GSVRate)
+@receiver([post_save, post_delete], sender=SSVConfig)
+def invalidate_surrender_bands(sender, **kwargs):
+    """Drop the compiled GSV/SSV bands so surrender values use the new ranges."""
+    surrender_bands.invalidate()
+    transaction.on_commit(surrender_bands.invalidate)
+
+''' Bonus rate signals'''
+
+@receiver([post_save, post_delete], sender=BonusRate)
+def invalidate_bonus_rates(sender, **kwargs):
+    """Drop the cached bonus rate bands so new bonuses use the changed rates."""
+    bonus_rates.invalidate()
+    transaction.on_commit(bonus_rates.invalidate)
+
+''' Premium grid signals'''
+
+# InsurancePolicy fields that feed into the premium grid
+POLICY_PRICING_FIELDS = ['policy_type', 'base_multiplier', 'include_adb', 'include_ptd', 'adb_percentage', 'ptd_percentage']
+
+@receiver([post_save, post_delete], sender=MortalityRate)
+@receiver([post_save, post_delete], sender=DurationFactor)
+def rebuild_premium_grids_on_rate_change(sender, **kwargs):
+    """
+    Rating tables feed every product's grid, so all of them are rebuilt once
+    the transaction commits, however many rates it changed.
+    """
+    schedule_premium_grid_rebuild(list(InsurancePolicy.objects.values_list('pk', flat=True)))
+
+# InsurancePolicy fields that feed into the estimated maturity value
+POLICY_MATURITY_FIELDS = ['guaranteed_interest_rate', 'terminal_bonus_rate']
+
+@receiver(pre_save, sender=InsurancePolicy)
+def track_policy_pricing_changes(sender, instance, **kwargs):
+    """Remember whether this save changes the policy's pricing or maturity terms."""
+    fields = POLICY_PRICING_FIELDS + POLICY_MATURITY_FIELDS
+    previous = InsurancePolicy.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+    instance._pricing_changed = previous is None or any(
+        previous[field] != getattr(instance, field) for field in POLICY_PRICING_FIELDS
+    )
+    instance._maturity_terms_changed = previous is None or any(
+        previous[field] != getattr(instance, field) for field in POLICY_MATURITY_FIELDS
+    )
+
+@receiver(post_save, sender=InsurancePolicy)
+def rebuild_premium_grid_on_policy_change(sender, instance, **kwargs):
+    """Rebuild a product's grid when its multiplier, type or rider percentages change."""
+    if getattr(instance, '_pricing_changed', True):
+        schedule_premium_grid_rebuild([instance.pk])
+
+''' Maturity valuation signals'''
+
+@receiver(post_save, sender=PolicyHolder)
+def refresh_maturity_values_on_holder_change(sender, instance, created, **kwargs):
+    """Sum assured, term or product of the holder may have changed."""
+    if not created:
+        refresh_estimated_maturity_values(PremiumPayment.objects.filter(policy_holder=instance))
+
+@receiver(post_save, sender=InsurancePolicy)
+def refresh_maturity_values_on_policy_change(sender, instance, created, **kwargs):
+    """Revalue the product's payments when its guaranteed or terminal bonus rate changes."""
+    if not created and getattr(instance, '_maturity_terms_changed', True):
+        transaction.on_commit(lambda: refresh_estimated_maturity_values(
+            PremiumPayment.objects.filter(policy_holder__policy=instance)
+        ))
+
+''' Annuity factor signals'''
+
+@receiver(post_save, sender=InsurancePolicy)
+def precompute_annuity_factors(sender, instance, **kwargs):
+    """Warm the future value factors of the product's guaranteed interest rate."""
+    annuity_factors.precompute_policy(instance)
+
 ''' Underwriting signals'''
 
 @receiver(post_save, sender=Underwriting)
@@ -353,4 +432,45 @@ def update_policy_holder_from_underwriting(sender, instance, **kwargs):
     # Only update if the risk category has changed
     if policy_holder.risk_category != instance.risk_category:
         policy_holder.risk_category = instance.risk_category
-        policy_holder.save()
\ No newline at end of file
+        policy_holder.save()
+
+''' Agent performance signals'''
+
+@receiver(pre_save, sender=PolicyHolder)
+def track_policy_status_changes(sender, instance, **kwargs):
+    """Remember the agent, status, start date and policy the holder had before this save."""
+    previous = (
+        PolicyHolder.objects.filter(pk=instance.pk).values_list('agent_id', 'status', 'start_date', 'policy_id').first()
+        if instance.pk else None
+    )
+    # Stacks, as other post_save handlers save the same instance again before ours run
+    instance.__dict__.setdefault('_previous_agent_status', []).append(previous[:2] if previous else None)
+    instance.__dict__.setdefault('_previous_bonus_terms', []).append(previous[1:] if previous else None)
+
+@receiver(post_save, sender=PolicyHolder)
+def update_agent_policy_counters(sender, instance, **kwargs):
+    """Keep the agents' active and lapsed policy counts in step with the policy's status."""
+    pending = getattr(instance, '_previous_agent_status', None)
+    if pending:
+        record_policy_status(pending.pop(), instance, timezone.now().date())
+
+''' Home dashboard signals'''
+
+# Models shown on the home dashboard whose changes rebuild it. PremiumPayment,
+# Bonus, Loan, LoanRepayment and AgentReport are written on every payment and
+# would keep the snapshot from ever being reused; they refresh on its timeout.
+HOME_SNAPSHOT_MODELS = (
+    User, Occupation, MortalityRate, Company, Branch, InsurancePolicy, GSVRate, SSVConfig, AgentApplication,
+    SalesAgent, DurationFactor, Customer, KYC, PolicyHolder, BonusRate, ClaimRequest, ClaimProcessing,
+    PaymentProcessing, Underwriting,
+)
+
+def invalidate_home_snapshot(sender, update_fields=None, **kwargs):
+    """A change to a dashboard section makes the cached home dashboard stale."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return # Logins do not change anything the dashboard shows
+    invalidate_snapshot()
+
+for model in HOME_SNAPSHOT_MODELS:
+    post_save.connect(invalidate_home_snapshot, sender=model)
+    post_delete.connect(invalidate_home_snapshot, sender=model)
@@ -1,3 +1,1233 @@
+import itertools
+import json
+from datetime import date, timedelta
+from decimal import ROUND_DOWN, Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from insurance.commissions import (
+    rebuild_agent_performance, rebuild_agent_reports, record_premium_payment, report_defaults
+)
+from insurance.claims import (
+    MAX_ATTEMPTS, STALE_AFTER, claim_payouts, enqueue_finalization, requeue_stale_jobs, run_worker
+)
+from insurance.constant import PAYMENT_INTERVAL_COUNTS
+from insurance.dashboard import SECTION_LIMIT, SNAPSHOT_VERSION_KEY
+from insurance.jobs import (
+    SURRENDER_VALUE_JOB, accrue_loan_interest, backfill_bonus_gaps, bonus_year_due, declare_bonuses,
+    revalue_surrender_values, update_loan_eligibility
+)
+from insurance.ledger import post_repayments
+from insurance.portfolio import PremiumInputs, compute_premiums, from_fixed, project_maturity_values, rerate_premiums
+from insurance.rating import (
+    RIDER_COMBINATIONS, VERSION_CHECK_INTERVAL, RateTableCache, grid_premium, premium_grids, price_premium, quote_stats,
+    rate_tables, rebuild_premium_grid, surrender_bands
+)
+
+from insurance.models import (
+    KYC, LOAN_TO_GSV_RATIO, AgentApplication, AgentPerformance, AgentReport, BatchCheckpoint, Bonus, BonusRate,
+    Branch, ClaimFinalizationJob, ClaimProcessing, ClaimRequest, CommissionLedgerEntry, Company, Customer,
+    DurationFactor, GSVRate, InsurancePolicy, Loan, LoanRepayment, LoanTransaction, MortalityRate, Occupation,
+    PaymentProcessing, PolicyFinancialSummary, PolicyHolder, PremiumPayment, PremiumRateGrid, SalesAgent, SSVConfig,
+    User
+)
+
+
+class InsuranceTestData:
+    """Builders for the minimum rating tables, branches, agents and policies the API needs."""
+
+    @classmethod
+    def create_rating_tables(cls):
+        MortalityRate.objects.create(age_group_start=18, age_group_end=60, rate=Decimal('2.50'))
+        DurationFactor.objects.create(min_duration=1, max_duration=30, factor=Decimal('1.10'), policy_type='Endownment')
+        return InsurancePolicy.objects.create(
+            name='Endowment', policy_code='E1', policy_type='Endownment', base_multiplier=Decimal('1.20'),
+            min_sum_assured=Decimal('1000'), max_sum_assured=Decimal('5000000'),
+            guaranteed_interest_rate=Decimal('0.0450'), terminal_bonus_rate=Decimal('0.1000'),
+        )
+
+    @classmethod
+    def create_branch(cls, company, code, with_user=True):
+        user = None
+        if with_user:
+            user = User.objects.create_user(f'branch{code}', f'branch{code}@example.com', password='x', user_type='branch')
+        return Branch.objects.create(name=f'Branch {code}', branch_code=code, company=company, user=user)
+
+    @classmethod
+    def create_agent(cls, branch, code):
+        application = AgentApplication.objects.create(
+            branch=branch, first_name='Agent', last_name=str(code), father_name='f', mother_name='m',
+            email=f'agent{code}@example.com', phone_number=f'98{code:08d}', address='a', status='Approved',
+        )
+        return SalesAgent.objects.get(application=application)
+
+    @classmethod
+    def create_policy_holder(cls, branch, agent, policy, code, **fields):
+        customer = Customer.objects.create(
+            first_name='Customer', last_name=str(code), email=f'customer{code}@example.com', address='a'
+        )
+        return PolicyHolder.objects.create(**{
+            'company': branch.company, 'branch': branch, 'customer': customer, 'policy': policy, 'agent': agent,
+            'duration_years': 10, 'sum_assured': Decimal('100000'), 'date_of_birth': date(1990, 3, 4),
+            'nominee_relation': 'x', 'nominee_document_front': 'a.jpg', 'nominee_document_back': 'b.jpg',
+            'nominee_pp_photo': 'c.jpg', 'payment_interval': 'annual', 'status': 'Active',
+            'payment_status': 'In Progress', 'start_date': date.today(), **fields,
+        })
+
+    @classmethod
+    def create_loan(cls, holder, amount='1000', accrued_interest='30.00'):
+        """An active 8% loan on ``holder``, whose first payment is given the GSV to allow it."""
+        PremiumPayment.objects.filter(policy_holder=holder).update(gsv_value=Decimal('5000'))
+        PolicyFinancialSummary.refresh(holder.pk)
+        loan = Loan.objects.create(policy_holder=holder, loan_amount=Decimal(amount), interest_rate=Decimal('8'))
+        Loan.objects.filter(pk=loan.pk).update(accrued_interest=Decimal(accrued_interest))
+        PolicyFinancialSummary.refresh(holder.pk, ['loans'])
+        loan.refresh_from_db()
+        return loan
+
+
+class RateTableCacheTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_rating_tables()
+
+    def setUp(self):
+        rate_tables.invalidate()
+
+    def test_hit_runs_no_queries(self):
+        self.assertEqual(rate_tables.mortality_rate(30), Decimal('2.50'))
+        with self.assertNumQueries(0):
+            self.assertEqual(rate_tables.mortality_rate(45), Decimal('2.50'))
+            self.assertEqual(rate_tables.duration_factor(10), Decimal('1.10'))
+            self.assertIsNone(rate_tables.mortality_rate(70))
+
+    def test_save_reloads_in_this_process(self):
+        rate_tables.mortality_rate(30)
+        rate = MortalityRate.objects.get()
+        rate.rate = Decimal('3.00')
+        rate.save()
+        self.assertEqual(rate_tables.mortality_rate(30), Decimal('3.00'))
+
+    def test_change_in_another_process_is_seen_after_the_check_interval(self):
+        rate_tables.mortality_rate(30)
+        MortalityRate.objects.update(rate=Decimal('3.00'))
+        RateTableCache().invalidate()  # Another worker's cache instance
+
+        self.assertEqual(rate_tables.mortality_rate(30), Decimal('2.50'))
+        rate_tables._checked_at -= VERSION_CHECK_INTERVAL
+        self.assertEqual(rate_tables.mortality_rate(30), Decimal('3.00'))
+
+
+class PremiumGridTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.policy = cls.create_rating_tables()
+        InsurancePolicy.objects.filter(pk=cls.policy.pk).update(
+            adb_percentage=Decimal('0.15'), ptd_percentage=Decimal('0.05')
+        )
+        cls.policy.refresh_from_db()
+        rebuild_premium_grid(cls.policy)
+
+    def setUp(self):
+        rate_tables.invalidate()
+        premium_grids.invalidate()
+
+    def assert_grid_matches_tables(self):
+        sum_assured = Decimal('250000')
+        for age, duration, interval, (adb, ptd) in itertools.product(
+            [18, 37, 60], [1, 12, 29], PAYMENT_INTERVAL_COUNTS, RIDER_COMBINATIONS
+        ):
+            with self.subTest(age=age, duration=duration, interval=interval, adb=adb, ptd=ptd):
+                self.assertIsNotNone(premium_grids.rates(self.policy.pk, age, duration, interval, adb, ptd))
+                self.assertEqual(
+                    grid_premium(self.policy, age, duration, sum_assured, interval, adb, ptd),
+                    price_premium(self.policy, age, duration, sum_assured, interval, adb, ptd),
+                )
+
+    def test_grid_lookup_matches_price_premium(self):
+        self.assert_grid_matches_tables()
+
+    def test_rate_change_rebuilds_the_grid_on_commit(self):
+        rate = MortalityRate.objects.get()
+        rate.rate = Decimal('3.10')
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.save()
+            self.assertFalse(PremiumRateGrid.objects.exists())
+
+        self.assertTrue(PremiumRateGrid.objects.filter(policy=self.policy).exists())
+        self.assert_grid_matches_tables()
+
+
+class QuoteTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        agent = cls.create_agent(branch, 1)
+        cls.holders = [
+            cls.create_policy_holder(
+                branch, agent, policy, code, payment_interval=interval, sum_assured=Decimal('150000') * code,
+                duration_years=5 * code,
+            )
+            for code, interval in enumerate(['annual', 'quarterly', 'Single'], start=1)
+        ]
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', user_type='superadmin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def inputs(self, holder):
+        return {
+            'policy': holder.policy_id, 'age': holder.age, 'duration_years': holder.duration_years,
+            'sum_assured': str(holder.sum_assured), 'payment_interval': holder.payment_interval,
+        }
+
+    def test_quotes_match_calculate_premium(self):
+        response = self.client.post('/api/quotes/', [self.inputs(h) for h in self.holders], format='json')
+        self.assertEqual(response.status_code, 200)
+        for holder, result in zip(self.holders, response.json()):
+            with self.subTest(holder=holder.pk):
+                payment = holder.premium_payments.get()
+                self.assertEqual(
+                    (Decimal(result['annual_premium']), Decimal(result['interval_payment'])),
+                    payment.calculate_premium(),
+                )
+                self.assertEqual(Decimal(result['total_premium']), payment.total_premium)
+
+        hits = quote_stats()['hits']
+        single = self.client.post('/api/quotes/', self.inputs(self.holders[0]), format='json')
+        self.assertEqual(single.json()['annual_premium'], response.json()[0]['annual_premium'])
+        self.assertEqual(quote_stats()['hits'], hits + 1)
+
+    def test_batch_limit_is_enforced(self):
+        with mock.patch('insurance.views.QUOTE_BATCH_LIMIT', 2):
+            response = self.client.post('/api/quotes/', [self.inputs(h) for h in self.holders], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PortfolioEngineTests(InsuranceTestData, TestCase):
+    """The vectorized engines give the same figures as the per-object methods."""
+
+    @classmethod
+    def setUpTestData(cls):
+        endowment = cls.create_rating_tables()
+        MortalityRate.objects.create(age_group_start=41, age_group_end=60, rate=Decimal('4.75'))
+        DurationFactor.objects.create(min_duration=11, max_duration=30, factor=Decimal('1.35'), policy_type='Endownment')
+        InsurancePolicy.objects.filter(pk=endowment.pk).update(
+            include_adb=True, adb_percentage=Decimal('0.15'), include_ptd=True, ptd_percentage=Decimal('0.05')
+        )
+        GSVRate.objects.create(policy=endowment, min_year=0, max_year=30, rate=Decimal('30'))
+        SSVConfig.objects.create(
+            policy=endowment, min_year=0, max_year=30, ssv_factor=Decimal('40'), eligibility_years=1
+        )
+        term = InsurancePolicy.objects.create(
+            name='Term', policy_code='T1', policy_type='Term', min_sum_assured=Decimal('1000'),
+            max_sum_assured=Decimal('5000000'), guaranteed_interest_rate=Decimal('0.0325'),
+        )
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        agent = cls.create_agent(branch, 1)
+
+        endowment.refresh_from_db()
+        term.refresh_from_db()
+        samples = itertools.product(
+            [endowment, term],
+            [(date(1995, 1, 9), 7), (date(1972, 6, 30), 19)],
+            ['annual', 'quarterly', 'semi_annual', 'Single'],
+        )
+        for code, (policy, (date_of_birth, duration), interval) in enumerate(samples):
+            cls.create_policy_holder(
+                branch, agent, policy, code, date_of_birth=date_of_birth, duration_years=duration,
+                payment_interval=interval, sum_assured=Decimal('123456.78') * (code + 1),
+                start_date=date(2019, 4, 1),
+            )
+
+    def setUp(self):
+        rate_tables.invalidate()
+
+    def test_rerating_matches_calculate_premium(self):
+        payments = PremiumPayment.objects.select_related('policy_holder__policy').order_by('pk')
+        annual, interval = compute_premiums(PremiumInputs(payments))
+        self.assertEqual(len(annual), 16)
+        for row, payment in enumerate(payments):
+            with self.subTest(payment=payment.pk):
+                expected = payment.calculate_premium()
+                self.assertNotEqual(expected[0], Decimal('0.00'))
+                self.assertEqual((from_fixed(annual[row]), from_fixed(interval[row])), expected)
+
+        # Paid premiums make the surrender values depend on the re-rated annual premium
+        for payment in payments:
+            PremiumPayment.objects.filter(pk=payment.pk).update(total_paid=payment.annual_premium * 3)
+        mortality = MortalityRate.objects.get(age_group_start=18)
+        mortality.rate = Decimal('2.10')
+        mortality.save()
+
+        report = rerate_premiums()
+        self.assertTrue(report.changes)
+        for payment in PremiumPayment.objects.select_related('policy_holder__policy').order_by('pk'):
+            with self.subTest(payment=payment.pk):
+                self.assertEqual((payment.annual_premium, payment.interval_payment), payment.calculate_premium())
+                self.assertEqual(payment.gsv_value, GSVRate.calculate_gsv(payment))
+                self.assertEqual(payment.ssv_value, SSVConfig.calculate_ssv(payment))
+                summary = PolicyFinancialSummary.objects.get(policy_holder=payment.policy_holder)
+                self.assertEqual(summary.gsv_value, payment.gsv_value)
+        self.assertTrue(PremiumPayment.objects.filter(gsv_value__gt=0, ssv_value__gt=0).exists())
+
+    def test_maturity_projection_matches_calculate_estimated_maturity_value(self):
+        holders = PolicyHolder.objects.order_by('pk')
+        projection = project_maturity_values(holders)
+        self.assertEqual(len(projection), 16)
+        for row, holder in enumerate(holders):
+            with self.subTest(holder=holder.pk):
+                payment = holder.premium_payments.order_by('pk').first()
+                self.assertEqual(projection.policy_holder_id[row], holder.pk)
+                self.assertEqual(
+                    projection.estimated_maturity_value[row], payment.calculate_estimated_maturity_value()
+                )
+
+
+class SurrenderRevaluationTests(InsuranceTestData, TestCase):
+    """The incremental revaluation only touches payments whose holder crossed a band since the last run."""
+
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        GSVRate.objects.create(policy=policy, min_year=1, max_year=2, rate=Decimal('20'))
+        GSVRate.objects.create(policy=policy, min_year=3, max_year=9, rate=Decimal('40'))
+        SSVConfig.objects.create(policy=policy, min_year=3, max_year=9, ssv_factor=Decimal('40'), eligibility_years=1)
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        agent = cls.create_agent(branch, 1)
+        today = date.today()
+        # The first holder reached three years four days ago, the second is mid-band
+        cls.crossed, cls.inside = [
+            cls.create_policy_holder(branch, agent, policy, code) for code in (1, 2)
+        ]
+        for holder, start_date in [(cls.crossed, today - timedelta(days=365 * 3 + 4)),
+                                   (cls.inside, today - timedelta(days=365 * 5))]:
+            PolicyHolder.objects.filter(pk=holder.pk).update(start_date=start_date)
+            payment = holder.premium_payments.get()
+            PremiumPayment.objects.filter(pk=payment.pk).update(
+                total_paid=payment.annual_premium * 3, gsv_value=Decimal('1.00'), ssv_value=Decimal('1.00')
+            )
+            PolicyFinancialSummary.refresh(holder.pk)
+        BatchCheckpoint.objects.create(job=SURRENDER_VALUE_JOB, last_completed_on=today - timedelta(days=10))
+
+    def setUp(self):
+        surrender_bands.invalidate()
+
+    def assert_revalued(self, holder):
+        payment = holder.premium_payments.select_related('policy_holder').get()
+        self.assertNotEqual(payment.gsv_value, Decimal('1.00'))
+        self.assertEqual(payment.gsv_value, GSVRate.calculate_gsv(payment))
+        self.assertEqual(payment.ssv_value, SSVConfig.calculate_ssv(payment))
+        summary = PolicyFinancialSummary.objects.get(policy_holder=holder)
+        self.assertEqual(summary.gsv_value, payment.gsv_value)
+
+    def test_only_band_crossings_are_revalued(self):
+        today = date.today()
+        report = revalue_surrender_values(today=today)
+        self.assertEqual((report.examined, report.updated), (1, 1))
+        self.assert_revalued(self.crossed)
+        untouched = self.inside.premium_payments.get()
+        self.assertEqual((untouched.gsv_value, untouched.ssv_value), (Decimal('1.00'), Decimal('1.00')))
+        self.assertEqual(BatchCheckpoint.objects.get(job=SURRENDER_VALUE_JOB).last_completed_on, today)
+
+        # Nothing crossed a band since the run that just finished
+        self.assertEqual(revalue_surrender_values(today=today).examined, 0)
+
+        report = revalue_surrender_values(full=True, today=today)
+        self.assertEqual((report.examined, report.updated), (2, 1))
+        self.assert_revalued(self.inside)
+
+
+class FinancialSummaryTests(InsuranceTestData, TestCase):
+    """Bonus, Loan and LoanRepayment writes keep the holder's summary equal to the source tables."""
+
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        BonusRate.objects.create(year=2025, policy=policy, min_year=1, max_year=30, bonus_per_thousand=Decimal('40'))
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        cls.holder = cls.create_policy_holder(branch, cls.create_agent(branch, 1), policy, 1)
+        PremiumPayment.objects.filter(policy_holder=cls.holder).update(gsv_value=Decimal('5000'))
+        PolicyFinancialSummary.refresh(cls.holder.pk)
+
+    def assert_summary(self, **expected):
+        summary = PolicyFinancialSummary.objects.get(policy_holder=self.holder)
+        self.assertEqual({field: getattr(summary, field) for field in expected}, expected)
+        self.assertEqual(
+            {field: getattr(summary, field) for field in ('total_bonus', 'loan_principal', 'loan_interest')},
+            PolicyFinancialSummary.compute(self.holder.pk, ['bonus', 'loans']),
+        )
+
+    def test_bonus_writes_update_total_bonus(self):
+        first = Bonus.objects.create(customer=self.holder.customer, policy_holder=self.holder, start_date=date(2024, 1, 1))
+        second = Bonus.objects.create(customer=self.holder.customer, policy_holder=self.holder, start_date=date(2025, 1, 1))
+        self.assertGreater(first.accrued_amount, 0)
+        self.assert_summary(total_bonus=first.accrued_amount + second.accrued_amount)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assert_summary(total_bonus=second.accrued_amount)
+
+    def test_loan_writes_update_loan_totals(self):
+        self.assert_summary(loan_principal=Decimal('0'), max_loan=Decimal('4500.00'), loan_headroom=Decimal('4500.00'))
+        loan = Loan.objects.create(policy_holder=self.holder, loan_amount=Decimal('1000'), interest_rate=Decimal('8'))
+        self.assert_summary(loan_principal=Decimal('1000'), loan_headroom=Decimal('3500.00'))
+
+        LoanRepayment.objects.create(loan=loan, amount=Decimal('400'), repayment_type='Principal')
+        self.assert_summary(loan_principal=Decimal('600'), loan_headroom=Decimal('3900.00'))
+
+        LoanRepayment.objects.create(loan=loan, amount=Decimal('600'), repayment_type='Principal')
+        loan.refresh_from_db()
+        self.assertEqual(loan.loan_status, 'Paid')
+        self.assert_summary(loan_principal=Decimal('0'), loan_headroom=Decimal('4500.00'))
+
+
+class RepaymentPostingTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        holder = cls.create_policy_holder(branch, cls.create_agent(branch, 1), policy, 1)
+        cls.loan = cls.create_loan(holder)
+
+    def line(self, amount, reference, repayment_type='Both'):
+        return {'loan': self.loan.pk, 'amount': Decimal(amount), 'repayment_type': repayment_type, 'reference': reference}
+
+    def test_lines_post_in_order_interest_first(self):
+        result = post_repayments([
+            self.line('50', 'r1'),
+            self.line('200', 'r2', 'Principal'),
+            self.line('2000', 'r3'),
+            self.line('10', 'r4'),
+        ])
+
+        self.assertEqual([r.remaining_loan_balance for r in result.posted], [Decimal('980'), Decimal('780'), Decimal('0')])
+        self.assertEqual(result.rejected, [{'index': 3, 'loan': self.loan.pk, 'error': 'Loan is already paid.'}])
+        entries = LoanTransaction.objects.filter(loan=self.loan, transaction_type='Repayment').order_by('pk')
+        self.assertEqual(
+            [(e.reference, e.principal_amount, e.interest_amount) for e in entries],
+            [('r1', Decimal('-20'), Decimal('-30')), ('r2', Decimal('-200'), Decimal('0')), ('r3', Decimal('-780'), Decimal('0'))],
+        )
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.loan_status, 'Paid')
+        summary = PolicyFinancialSummary.objects.get(policy_holder=self.loan.policy_holder)
+        self.assertEqual((summary.loan_principal, summary.loan_interest), (Decimal('0'), Decimal('0')))
+
+    def test_posting_a_file_again_applies_it_once(self):
+        lines = [self.line('100', 'a'), self.line('100', 'b'), self.line('100', 'b')]
+        first = post_repayments(lines, batch_size=2)
+        self.assertEqual(len(first.posted), 2)
+        self.assertEqual(first.rejected, [{'index': 2, 'loan': self.loan.pk, 'error': 'Already posted.'}])
+
+        second = post_repayments(lines, batch_size=2)
+        self.assertEqual(second.posted, [])
+        self.assertEqual([line['index'] for line in second.rejected], [0, 1, 2])
+        self.loan.refresh_from_db()
+        self.assertEqual((self.loan.remaining_balance, self.loan.accrued_interest), (Decimal('830'), Decimal('0')))
+        self.assertEqual(LoanRepayment.objects.filter(loan=self.loan).count(), 2)
+        summary = PolicyFinancialSummary.objects.get(policy_holder=self.loan.policy_holder)
+        self.assertEqual(summary.loan_principal, Decimal('830'))
+
+
+class LoanEligibilityTests(InsuranceTestData, TestCase):
+    """The eligibility endpoint serves LOAN_TO_GSV_RATIO of the GSV less the outstanding loans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branches = [cls.create_branch(company, code) for code in (1, 2)]
+        cls.borrower = cls.create_policy_holder(branches[0], cls.create_agent(branches[0], 1), policy, 1)
+        cls.saver = cls.create_policy_holder(branches[1], cls.create_agent(branches[1], 2), policy, 2)
+        cls.loan = cls.create_loan(cls.borrower)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', user_type='superadmin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def eligibility(self, **params):
+        response = self.client.get('/api/loan-eligibility/', params)
+        self.assertEqual(response.status_code, 200)
+        return {row['policy_holder']: row for row in response.json()}
+
+    def expected(self, gsv_value, outstanding):
+        max_loan = (gsv_value * LOAN_TO_GSV_RATIO).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+        return (max_loan, outstanding, max(max_loan - outstanding, Decimal('0')))
+
+    def test_eligibility_is_ratio_of_gsv_less_outstanding_loans(self):
+        # A GSV change written outside PremiumPayment.save, as the revaluation job does
+        PremiumPayment.objects.filter(policy_holder=self.saver).update(gsv_value=Decimal('2345.67'))
+        with transaction.atomic():
+            update_loan_eligibility({self.saver.pk})
+
+        rows = self.eligibility()
+        outstanding = self.loan.remaining_balance + self.loan.accrued_interest
+        for holder, gsv_value, owed in [(self.borrower, Decimal('5000'), outstanding),
+                                        (self.saver, Decimal('2345.67'), Decimal('0'))]:
+            with self.subTest(holder=holder.pk):
+                row = rows[holder.pk]
+                self.assertEqual(Decimal(row['gsv_value']), gsv_value)
+                self.assertEqual(
+                    (Decimal(row['max_loan']), Decimal(row['outstanding_loan']), Decimal(row['loan_headroom'])),
+                    self.expected(gsv_value, owed),
+                )
+
+        self.assertEqual(list(self.eligibility(branch=self.saver.branch_id)), [self.saver.pk])
+        self.assertEqual(list(self.eligibility(min_headroom='4000')), [])
+        self.assertEqual(list(self.eligibility(min_headroom='2000')), [self.borrower.pk, self.saver.pk])
+
+
+class LoanInterestAccrualTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        holder = cls.create_policy_holder(branch, cls.create_agent(branch, 1), policy, 1)
+        cls.loan = cls.create_loan(holder)
+        cls.today = date.today()
+        Loan.objects.filter(pk=cls.loan.pk).update(last_interest_date=cls.today - timedelta(days=30))
+
+    def test_interest_is_accrued_once_per_day(self):
+        summary = PolicyFinancialSummary.objects.get(policy_holder=self.loan.policy_holder)
+        self.assertEqual(summary.loan_interest, Decimal('30.00'))
+
+        report = accrue_loan_interest(today=self.today)
+        self.assertEqual((report.examined, report.updated), (1, 1))
+
+        # 1000 at 8% for 30 days
+        self.loan.refresh_from_db()
+        self.assertEqual((self.loan.accrued_interest, self.loan.last_interest_date), (Decimal('36.58'), self.today))
+        entry = LoanTransaction.objects.get(loan=self.loan, transaction_type='Interest')
+        self.assertEqual((entry.interest_amount, entry.transaction_date), (Decimal('6.58'), self.today))
+        summary.refresh_from_db()
+        self.assertEqual(summary.loan_interest, Decimal('36.58'))
+
+        self.assertEqual(accrue_loan_interest(today=self.today).examined, 0)
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.accrued_interest, Decimal('36.58'))
+        self.assertEqual(LoanTransaction.objects.filter(loan=self.loan, transaction_type='Interest').count(), 1)
+        summary.refresh_from_db()
+        self.assertEqual(summary.loan_interest, Decimal('36.58'))
+
+
+class LoanStatementTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        holder = cls.create_policy_holder(branch, cls.create_agent(branch, 1), policy, 1)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', user_type='superadmin')
+        cls.loan = cls.create_loan(holder, accrued_interest='0.00')
+        Loan.objects.filter(pk=cls.loan.pk).update(last_interest_date=date.today() - timedelta(days=45))
+        accrue_loan_interest()
+        post_repayments([{'loan': cls.loan.pk, 'amount': Decimal('250'), 'repayment_type': 'Both', 'reference': 'r1'}])
+        accrue_loan_interest(today=date.today() + timedelta(days=10))
+        cls.loan.refresh_from_db()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def lines(self, query=''):
+        response = self.client.get(f'/api/loans/{self.loan.pk}/statement/{query}')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_statement_running_balance_matches_the_loan(self):
+        entries = self.lines()
+        self.assertEqual(len(entries), 4)
+        last = entries[-1]
+        self.assertEqual(
+            Decimal(last['principal_balance']) + Decimal(last['interest_balance']),
+            self.loan.remaining_balance + self.loan.accrued_interest,
+        )
+
+    def test_plan_repays_the_balance(self):
+        schedule = [line for line in self.lines('?months=12') if line['type'] == 'schedule']
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual((schedule[-1]['principal_balance'], schedule[-1]['interest_balance']), ('0.00', '0.00'))
+        self.assertEqual(
+            sum(Decimal(row['principal_paid']) for row in schedule), self.loan.remaining_balance
+        )
+
+    def test_plans_that_cannot_repay_within_the_cap_are_rejected(self):
+        url = f'/api/loans/{self.loan.pk}/statement/'
+        monthly_interest = (self.loan.remaining_balance * Decimal('8') / 1200).quantize(Decimal('0.01'))
+        self.assertIn('never be repaid', self.client.get(url, {'instalment': monthly_interest}).json()['error'])
+        response = self.client.get(url, {'instalment': monthly_interest + Decimal('0.05')})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('within 600 months', response.json()['error'])
+        self.assertEqual(self.client.get(url, {'instalment': '20'}).status_code, 200)
+
+
+class CommissionLedgerTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        cls.agent = cls.create_agent(branch, 1)
+        cls.holder = cls.create_policy_holder(branch, cls.agent, policy, 1)
+
+    def pay(self, amount):
+        payment = PremiumPayment.objects.get(policy_holder=self.holder)
+        payment.paid_amount = Decimal(amount)
+        payment.save()
+        return payment
+
+    def rollups(self):
+        today = timezone.now().date()
+        agent = SalesAgent.objects.get(pk=self.agent.pk)
+        report = AgentReport.objects.get(agent=self.agent, report_date=today.replace(day=1))
+        return {
+            'entries': CommissionLedgerEntry.objects.filter(agent=self.agent).count(),
+            'report': report.total_premium,
+            'agent': (agent.total_premium_collected, agent.total_commission_earned),
+            'performance': sorted(
+                AgentPerformance.objects.filter(agent=self.agent).values_list('period', 'premium_collected')
+            ),
+        }
+
+    def test_policy_sales_are_counted_in_the_monthly_report(self):
+        month = timezone.now().date().replace(day=1)
+        report = AgentReport.objects.get(agent=self.agent, report_date=month)
+        self.assertEqual(report.policies_sold, 1)
+
+        self.create_policy_holder(self.agent.branch, self.agent, self.holder.policy, 2)
+        self.assertEqual(AgentReport.objects.get(pk=report.pk).policies_sold, 2)
+
+    def test_recording_an_event_twice_applies_it_once(self):
+        payment = self.pay('100')
+        recorded = self.rollups()
+        self.assertEqual(recorded['entries'], 1)
+
+        self.assertIsNone(record_premium_payment(payment, Decimal('100'), timezone.now().date()))
+        # A retry working from a fresh copy of the row
+        stored = PremiumPayment.objects.get(pk=payment.pk)
+        self.assertIsNone(record_premium_payment(stored, Decimal('100'), timezone.now().date()))
+        # Saving again without a new payment
+        stored.save()
+        self.assertEqual(self.rollups(), recorded)
+
+    def test_paying_again_after_a_correction_is_recorded(self):
+        payment = self.pay('100')
+        PremiumPayment.objects.filter(pk=payment.pk).update(total_paid=payment.total_paid - Decimal('100'))
+        self.pay('100')
+
+        self.assertEqual(
+            list(CommissionLedgerEntry.objects.filter(premium_payment=payment).values_list('premium_amount', flat=True)),
+            [Decimal('100'), Decimal('100')],
+        )
+        self.assertEqual(self.rollups()['report'], Decimal('200'))
+
+    def test_rebuild_keeps_reports_without_entries_and_resyncs_agent_totals(self):
+        self.pay('100')
+        month = timezone.now().date().replace(day=1)
+        earlier = AgentReport.objects.create(
+            agent=self.agent, branch=self.agent.branch, report_date=date(2020, 1, 1),
+            **{**report_defaults(date(2020, 1, 1)), 'total_premium': Decimal('500'), 'commission_earned': Decimal('50')},
+        )
+        AgentReport.objects.filter(report_date=month).update(total_premium=Decimal('999'))
+        SalesAgent.objects.filter(pk=self.agent.pk).update(total_premium_collected=Decimal('5000'))
+
+        self.assertEqual(rebuild_agent_reports(date(2020, 1, 1)).updated, 0)
+        self.assertEqual(rebuild_agent_reports(month).updated, 1)
+        rebuild_agent_performance(month)
+
+        earlier.refresh_from_db()
+        self.assertEqual((earlier.total_premium, earlier.commission_earned), (Decimal('500'), Decimal('50')))
+        agent = SalesAgent.objects.get(pk=self.agent.pk)
+        self.assertEqual(agent.total_premium_collected, Decimal('600'))
+
+
+class AgentLeaderboardTests(InsuranceTestData, TestCase):
+    """Leaderboard ranks and cursor pages follow the AgentPerformance rows rebuilt from the ledger."""
+
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branches = [cls.create_branch(company, code) for code in (1, 2)]
+        cls.agents = []
+        for code, amount in enumerate(['300', '100', '300', '200', '50'], start=1):
+            agent = cls.create_agent(branches[code % 2], code)
+            holder = cls.create_policy_holder(agent.branch, agent, policy, code)
+            payment = PremiumPayment.objects.get(policy_holder=holder)
+            payment.paid_amount = Decimal(amount)
+            payment.save()
+            cls.agents.append(agent)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', user_type='superadmin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def board(self, **params):
+        """Every row of the leaderboard, following the cursor one page at a time."""
+        rows, pages = [], 0
+        response = self.client.get('/api/agent-leaderboard/', {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages += 1
+            rows += response.json()['results']
+            if not response.json()['next']:
+                return rows, pages
+            response = self.client.get(response.json()['next'])
+
+    def test_ranks_and_pages_follow_the_rebuilt_performance(self):
+        month = timezone.now().date().replace(day=1)
+        AgentPerformance.objects.filter(agent=self.agents[1], period='month').update(premium_collected=Decimal('999'))
+        rebuild_agent_performance(month)
+
+        performance = AgentPerformance.objects.filter(period='month', period_start=month).order_by(
+            '-premium_collected', '-agent_id'
+        )
+        rows, pages = self.board()
+        self.assertEqual(pages, 3)
+        self.assertEqual(
+            [(row['agent'], Decimal(row['premium_collected'])) for row in rows],
+            [(p.agent_id, p.premium_collected) for p in performance],
+        )
+        self.assertEqual(
+            [row['premium_collected'] for row in rows], ['300.00', '300.00', '200.00', '100.00', '50.00']
+        )
+        self.assertEqual([row['rank'] for row in rows], [1, 1, 3, 4, 5])
+
+        branch = self.agents[0].branch_id
+        rows, _ = self.board(branch=branch, period='day')
+        self.assertEqual({row['branch'] for row in rows}, {branch})
+        self.assertEqual(
+            [(row['premium_collected'], row['rank']) for row in rows], [('300.00', 1), ('300.00', 1), ('50.00', 3)]
+        )
+
+    def test_unknown_metric_is_rejected(self):
+        response = self.client.get('/api/agent-leaderboard/', {'metric': 'lapses'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BonusDeclarationTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        BonusRate.objects.create(year=2025, policy=policy, min_year=1, max_year=30, bonus_per_thousand=Decimal('40'))
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        agent = cls.create_agent(branch, 1)
+        cls.holders = {}
+        for code, start_date in enumerate([date(2010, 2, 1), date(2012, 2, 29), date(2010, 6, 1)], start=1):
+            holder = cls.create_policy_holder(branch, agent, policy, code)
+            # Backdated without signals, so no bonus is credited before the job runs
+            PolicyHolder.objects.filter(pk=holder.pk).update(start_date=start_date)
+            cls.holders[start_date] = holder.pk
+        Bonus.objects.all().delete()
+
+    def credited(self):
+        return dict(Bonus.objects.values_list('policy_holder_id', 'start_date'))
+
+    def test_only_anniversaries_passed_by_as_of_are_credited(self):
+        report = declare_bonuses(2025, as_of=date(2025, 3, 1))
+
+        self.assertEqual(self.credited(), {
+            self.holders[date(2010, 2, 1)]: date(2025, 2, 1),
+            self.holders[date(2012, 2, 29)]: date(2025, 2, 28),
+        })
+        self.assertEqual(report.total_amount, Decimal('8000.00'))
+        self.assertFalse(Bonus.objects.filter(start_date__gt=date(2025, 3, 1)).exists())
+
+        declare_bonuses(2025, as_of=date(2025, 6, 1))
+        self.assertEqual(self.credited()[self.holders[date(2010, 6, 1)]], date(2025, 6, 1))
+        self.assertEqual(Bonus.objects.count(), 3)
+
+    def test_backfill_inserts_only_the_missing_years_once(self):
+        holder_id = self.holders[date(2010, 6, 1)]
+        holder = PolicyHolder.objects.get(pk=holder_id)
+        Bonus.objects.create(
+            customer=holder.customer, policy_holder=holder, bonus_type='SI', start_date=date(2015, 6, 1)
+        )
+        PolicyHolder.objects.filter(pk=self.holders[date(2010, 2, 1)]).update(status='Cancelled')
+        holders = PolicyHolder.objects.filter(pk__in=[holder_id, self.holders[date(2010, 2, 1)]])
+
+        report = backfill_bonus_gaps(holders, today=date(2025, 3, 1))
+
+        years = sorted(Bonus.objects.filter(policy_holder_id=holder_id).values_list('start_date__year', flat=True))
+        self.assertEqual(years, list(range(2011, 2025)))
+        self.assertEqual(report.updated, 13)
+        self.assertFalse(Bonus.objects.filter(policy_holder_id=self.holders[date(2010, 2, 1)]).exists())
+        summary = PolicyFinancialSummary.objects.get(policy_holder_id=holder_id)
+        self.assertEqual(summary.total_bonus, Decimal('4000.00') * 14)
+
+        self.assertEqual(backfill_bonus_gaps(holders, today=date(2025, 3, 1)).updated, 0)
+        self.assertEqual(Bonus.objects.filter(policy_holder_id=holder_id).count(), 14)
+
+    def test_backdating_a_policy_backfills_its_bonuses_on_commit(self):
+        holder = PolicyHolder.objects.get(pk=self.holders[date(2010, 6, 1)])
+        holder.start_date = date(2019, 5, 20)
+        holder.payment_status = 'In Progress'
+        with self.captureOnCommitCallbacks(execute=True):
+            holder.save()
+
+        today = date.today()
+        self.assertEqual(
+            sorted(Bonus.objects.filter(policy_holder=holder).values_list('start_date__year', flat=True)),
+            [year for year in range(2020, today.year + 1) if bonus_year_due(holder.start_date, year, today)],
+        )
+
+    def test_leap_day_policies_are_due_on_28_february(self):
+        declare_bonuses(2025, as_of=date(2025, 2, 28))
+        self.assertEqual(self.credited(), {
+            self.holders[date(2010, 2, 1)]: date(2025, 2, 1),
+            self.holders[date(2012, 2, 29)]: date(2025, 2, 28),
+        })
+
+
+class ClaimFinalizationTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        policy = cls.create_rating_tables()
+        BonusRate.objects.create(year=2025, policy=policy, min_year=1, max_year=30, bonus_per_thousand=Decimal('40'))
+        company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        branch = cls.create_branch(company, 1)
+        agent = cls.create_agent(branch, 1)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', user_type='superadmin')
+        holders = [cls.create_policy_holder(branch, agent, policy, code) for code in range(1, 4)]
+
+        # The first holder has a bonus of 4000 and an active loan of 1000 with 30 interest
+        Bonus.objects.create(
+            customer=holders[0].customer, policy_holder=holders[0], bonus_type='SI', start_date=date(2025, 1, 1)
+        )
+        cls.create_loan(holders[0])
+
+        cls.claims = [ClaimRequest.objects.create(policy_holder=h, branch=branch, reason='Death') for h in holders]
+
+    def processing(self, claim):
+        return ClaimProcessing.objects.filter(claim_request=claim)
+
+    def jobs(self):
+        return list(ClaimFinalizationJob.objects.order_by('pk').values_list('status', 'attempts'))
+
+    def test_batch_payouts_match_calculate_payout(self):
+        # A holder whose summary has not been built yet is priced from the source tables
+        PolicyFinancialSummary.objects.filter(policy_holder=self.claims[1].policy_holder).delete()
+        payouts = claim_payouts(ClaimRequest.objects.all())
+
+        self.assertEqual(payouts[self.claims[0].pk].amount, Decimal('102970.00'))
+        for claim in self.claims:
+            with self.subTest(claim=claim.pk):
+                self.assertEqual(payouts[claim.pk].amount, PaymentProcessing(claim_request=claim).calculate_payout())
+
+    def test_payout_preview_runs_a_constant_number_of_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        ClaimRequest.objects.exclude(pk=self.claims[0].pk).update(status='Approved')
+        with CaptureQueriesContext(connection) as one:
+            response = client.get('/api/claim-requests/payout-preview/?status=Pending')
+        self.assertEqual([row['payout'] for row in response.json()], ['102970.00'])
+
+        with CaptureQueriesContext(connection) as every:
+            response = client.get('/api/claim-requests/payout-preview/')
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(len(every), len(one))
+        with self.assertNumQueries(1):
+            claim_payouts(ClaimRequest.objects.all())
+
+    def test_finalize_endpoint_queues_a_claim_once(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        processing = self.claims[0].processing
+        url = f'/api/claim-processing/{processing.pk}/finalize/'
+
+        self.assertEqual(client.post(url).status_code, 400)
+        self.processing(self.claims[0]).update(processing_status='Approved')
+        response = client.post(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()['status'], response.json()['decision']), ('Queued', 'Approved'))
+        self.assertEqual(client.post(url).status_code, 409)
+        self.assertEqual(ClaimFinalizationJob.objects.count(), 1)
+
+    def test_worker_finalizes_queued_claims_in_a_batch(self):
+        enqueue_finalization(ClaimProcessing.objects.filter(claim_request__in=self.claims[:2]), 'Approved')
+        enqueue_finalization(self.processing(self.claims[2]), 'Rejected')
+
+        self.assertEqual(run_worker(once=True), 3)
+        self.assertEqual(self.jobs(), [('Done', 1)] * 3)
+        self.assertEqual(
+            [ClaimRequest.objects.get(pk=claim.pk).status for claim in self.claims], ['Approved', 'Approved', 'Rejected']
+        )
+        payments = dict(PaymentProcessing.objects.values_list('claim_request_id', 'amount_paid'))
+        self.assertEqual(payments, {self.claims[0].pk: Decimal('102970.00'), self.claims[1].pk: Decimal('100000.00')})
+        self.assertEqual(set(PaymentProcessing.objects.values_list('processing_status', flat=True)), {'Completed'})
+
+    def test_a_failing_claim_is_retried_alone_until_out_of_attempts(self):
+        bad = self.claims[1].pk
+
+        def flaky_payouts(claim_requests):
+            if bad in claim_requests.values_list('pk', flat=True):
+                raise ValueError('Bad claim.')
+            return claim_payouts(claim_requests)
+
+        enqueue_finalization(ClaimProcessing.objects.filter(claim_request__in=self.claims), 'Approved')
+        with mock.patch('insurance.claims.claim_payouts', flaky_payouts):
+            run_worker(once=True)
+
+        self.assertEqual(self.jobs(), [('Done', 1), ('Failed', MAX_ATTEMPTS), ('Done', 1)])
+        self.assertEqual(ClaimFinalizationJob.objects.get(status='Failed').error, 'Bad claim.')
+        self.assertEqual(ClaimRequest.objects.get(pk=bad).status, 'Pending')
+        self.assertEqual(
+            set(PaymentProcessing.objects.values_list('claim_request_id', flat=True)),
+            {self.claims[0].pk, self.claims[2].pk},
+        )
+
+    def test_jobs_of_a_dead_worker_are_requeued_or_failed(self):
+        enqueue_finalization(ClaimProcessing.objects.filter(claim_request__in=self.claims[:2]), 'Rejected')
+        first, second = ClaimFinalizationJob.objects.order_by('pk')
+        started_at = timezone.now() - STALE_AFTER * 2
+        ClaimFinalizationJob.objects.filter(pk=first.pk).update(status='Running', started_at=started_at, attempts=1)
+        ClaimFinalizationJob.objects.filter(pk=second.pk).update(
+            status='Running', started_at=started_at, attempts=MAX_ATTEMPTS
+        )
+
+        self.assertEqual(requeue_stale_jobs(), (1, 1))
+        self.assertEqual(self.jobs(), [('Queued', 1), ('Failed', MAX_ATTEMPTS)])
+        run_worker(once=True)
+        self.assertEqual(self.jobs(), [('Done', 2), ('Failed', MAX_ATTEMPTS)])
+        self.assertEqual(
+            [ClaimRequest.objects.get(pk=claim.pk).status for claim in self.claims[:2]], ['Rejected', 'Pending']
+        )
+
+
+class BranchListQueryCountTests(InsuranceTestData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.policy = cls.create_rating_tables()
+        cls.company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def add_branch(self, code, holders=2):
+        branch = self.create_branch(self.company, code)
+        agent = self.create_agent(branch, code)
+        for i in range(holders):
+            self.create_policy_holder(branch, agent, self.policy, code * 100 + i)
+        PremiumPayment.objects.filter(policy_holder__branch=branch).update(total_paid=Decimal('250.00'))
+        return branch
+
+    def test_list_query_count_does_not_grow_with_branches(self):
+        self.add_branch(1)
+        # Branch row with company and user, plus the user's groups and permissions
+        with self.assertNumQueries(3):
+            self.client.get('/api/branches/')
+
+        for code in range(2, 6):
+            self.add_branch(code)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/branches/')
+        self.assertEqual(len(response.json()), 5)
+
+    def test_list_statistics_match_source_tables(self):
+        branch = self.add_branch(1, holders=3)
+        self.create_branch(self.company, 2, with_user=False)
+
+        rows = {row['id']: row for row in self.client.get('/api/branches/').json()}
+        self.assertEqual(rows[branch.pk]['total_agents'], 1)
+        self.assertEqual(rows[branch.pk]['total_policy_holders'], 3)
+        self.assertEqual(rows[branch.pk]['total_policies'], 3)
+        self.assertEqual(Decimal(str(rows[branch.pk]['total_premium'])), Decimal('750.00'))
+        empty = next(row for pk, row in rows.items() if pk != branch.pk)
+        self.assertEqual((empty['total_agents'], empty['total_policy_holders']), (0, 0))
+        self.assertEqual(Decimal(str(empty['total_premium'])), Decimal('0'))
+
+    def test_created_branch_reports_statistics(self):
+        response = self.client.post('/api/branches/', {'name': 'New', 'branch_code': 9, 'company': self.company.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_agents'], 0)
+
+
+# Endpoint, the model whose first row its detail view shows (None: list only),
+# and the queries a response takes: the rows with their joined relations plus
+# one per prefetched relation
+ENDPOINTS = {
+    'users': (User, 3),
+    'occupations': (Occupation, 1),
+    'mortality-rates': (MortalityRate, 1),
+    'companies': (Company, 1),
+    'branches': (Branch, 3),
+    'insurance-policies': (InsurancePolicy, 3),
+    'gsv-rates': (GSVRate, 1),
+    'ssv-configs': (SSVConfig, 1),
+    'agent-applications': (AgentApplication, 1),
+    'sales-agents': (SalesAgent, 1),
+    'duration-factors': (DurationFactor, 1),
+    'customers': (Customer, 3),
+    'kyc': (KYC, 1),
+    'policy-holders': (PolicyHolder, 1),
+    'bonus-rates': (BonusRate, 1),
+    'bonuses': (Bonus, 1),
+    'claim-requests': (ClaimRequest, 1),
+    'claim-processing': (None, 1),
+    'claim-finalization-jobs': (ClaimFinalizationJob, 1),
+    'payment-processing': (PaymentProcessing, 1),
+    'underwriting': (None, 1),
+    'premium-payments': (PremiumPayment, 1),
+    'agent-reports': (SalesAgent, 1),  # Retrieve takes the agent's ID
+    'agent-leaderboard': (None, 2),  # Page and ranks
+    'loans': (Loan, 1),
+    'loan-repayments': (LoanRepayment, 1),
+    'loan-eligibility': (PolicyFinancialSummary, 1),
+}
+
+
+class EagerLoadingQueryCountTests(InsuranceTestData, TestCase):
+    """Every list endpoint takes the same number of queries however many rows it returns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.policy = cls.create_rating_tables()
+        cls.company = Company.objects.create(
+            name='Company', company_code=1, address='x', email='company@example.com', phone_number='1'
+        )
+        cls.staff = User.objects.create_user(
+            'staff', 'staff@example.com', password='x', is_staff=True, is_superuser=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def seed(self, code):
+        """One of every record the API lists, attached to a new branch."""
+        Occupation.objects.create(name=f'Occupation {code}')
+        policy = InsurancePolicy.objects.create(
+            name=f'Policy {code}', policy_code=f'P{code}', policy_type='Endownment',
+            min_sum_assured=Decimal('1000'), max_sum_assured=Decimal('5000000'),
+            guaranteed_interest_rate=Decimal('0.0450'), terminal_bonus_rate=Decimal('0.1000'),
+        )
+        GSVRate.objects.create(policy=policy, min_year=0, max_year=20, rate=Decimal('50'))
+        SSVConfig.objects.create(policy=policy, min_year=0, max_year=20, ssv_factor=Decimal('60'), eligibility_years=0)
+        BonusRate.objects.create(policy=policy, min_year=1, max_year=20, bonus_per_thousand=Decimal('45'))
+
+        branch = self.create_branch(self.company, code)
+        agent = self.create_agent(branch, code)
+        holder = self.create_policy_holder(branch, agent, self.policy, code)
+        KYC.objects.create(
+            customer=holder.customer, document_front='a.jpg', document_back='b.jpg', pp_photo='c.jpg',
+            district='d', municipality='m', ward='1',
+        )
+        Bonus.objects.create(
+            customer=holder.customer, policy_holder=holder, accrued_amount=Decimal('100'), start_date=date.today()
+        )
+        PremiumPayment.objects.filter(policy_holder=holder).update(gsv_value=Decimal('5000'))
+        PolicyFinancialSummary.refresh(holder.pk)
+        loan = Loan.objects.create(policy_holder=holder, loan_amount=Decimal('1000'), interest_rate=Decimal('8'))
+        LoanRepayment.objects.create(loan=loan, amount=Decimal('100'), repayment_type='Both')
+
+        claim = ClaimRequest.objects.create(policy_holder=holder, branch=branch, reason='Death')
+        PaymentProcessing.objects.create(claim_request=claim, branch=branch, company=self.company)
+        ClaimFinalizationJob.objects.create(
+            claim_processing=claim.processing, decision='Approved', status='Done', requested_by=self.staff
+        )
+
+    def assert_query_counts(self):
+        for endpoint, (model, expected) in ENDPOINTS.items():
+            with self.subTest(endpoint=endpoint):
+                with self.assertNumQueries(expected):
+                    response = self.client.get(f'/api/{endpoint}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json())
+                if model is None:
+                    continue
+                pk = model.objects.order_by('pk').first().pk
+                with self.assertNumQueries(expected):
+                    response = self.client.get(f'/api/{endpoint}/{pk}/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_single_branch(self):
+        self.seed(1)
+        self.assert_query_counts()
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        for code in range(1, 5):
+            self.seed(code)
+        self.assert_query_counts()
+
+
+class KYCRepresentationTests(InsuranceTestData, TestCase):
+    FIELDS = {
+        'id', 'customer', 'customer_name', 'document_type', 'document_number', 'document_front', 'document_back',
+        'pan_number', 'pan_front', 'pan_back', 'pp_photo', 'province', 'district', 'municipality', 'ward',
+        'nearest_hospital', 'natural_hazard_exposure', 'status',
+    }
+    CUSTOMER_FIELDS = {'id', 'first_name', 'middle_name', 'last_name', 'email', 'phone_number', 'address', 'gender'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', password='x', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def add_kyc(self, code):
+        customer = Customer.objects.create(
+            first_name='Customer', middle_name='M', last_name=str(code), email=f'customer{code}@example.com', address='a'
+        )
+        return KYC.objects.create(
+            customer=customer, document_front='a.jpg', document_back='b.jpg', pp_photo='c.jpg',
+            district='d', municipality='m', ward='1',
+        )
+
+    def test_customer_is_an_id_with_its_name(self):
+        kyc = self.add_kyc(1)
+        row = self.client.get(f'/api/kyc/{kyc.pk}/').json()
+        self.assertEqual(set(row), self.FIELDS)
+        self.assertEqual(row['customer'], kyc.customer_id)
+        self.assertEqual(row['customer_name'], 'Customer M 1')
+
+    def test_expand_customer_embeds_contact_details_only(self):
+        kyc = self.add_kyc(1)
+        row = self.client.get(f'/api/kyc/{kyc.pk}/?expand=customer').json()
+        self.assertEqual(set(row), self.FIELDS)
+        self.assertEqual(set(row['customer']), self.CUSTOMER_FIELDS)
+        self.assertEqual(row['customer']['email'], 'customer1@example.com')
+
+    def test_list_is_one_query_with_or_without_expansion(self):
+        for code in range(1, 4):
+            self.add_kyc(code)
+        for url in ('/api/kyc/', '/api/kyc/?expand=customer'):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                self.assertEqual(len(self.client.get(url).json()), 3)
+
+        for code in range(4, 10):
+            self.add_kyc(code)
+        for url in ('/api/kyc/', '/api/kyc/?expand=customer'):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                self.assertEqual(len(self.client.get(url).json()), 9)
+
+    def test_response_size_is_bounded(self):
+        for code in range(1, 11):
+            self.add_kyc(code)
+        response = self.client.get('/api/kyc/?expand=customer')
+        # Flat fields and a short customer record, not the reachable object graph
+        self.assertLess(len(response.content) / 10, 1024)
+
+    def test_update_keeps_customer_id(self):
+        kyc = self.add_kyc(1)
+        response = self.client.patch(f'/api/kyc/{kyc.pk}/', {'status': 'Approved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'Approved')
+        self.assertEqual(response.json()['customer'], kyc.customer_id)
+
+
+class HomeDashboardTests(TestCase):
+    ROWS = SECTION_LIMIT + 5
+
+    @classmethod
+    def setUpTestData(cls):
+        Occupation.objects.bulk_create([Occupation(name=f'Occupation {i}') for i in range(cls.ROWS)])
+        cls.user = User.objects.create_user('staff', 'staff@example.com', password='secret', user_type='superadmin')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dashboard_requires_authentication(self):
+        client = APIClient()
+        for url in ('/api/home/', '/api/home/users/', '/api/home/users/stream/'):
+            self.assertEqual(client.get(url).status_code, 401)
+
+    def test_users_are_shown_without_credentials(self):
+        row = self.client.get('/api/home/?sections=users').json()['users']['results'][0]
+        self.assertEqual(row['username'], 'staff')
+        self.assertNotIn('password', row)
+        streamed = json.loads(b''.join(self.client.get('/api/home/users/stream/').streaming_content))
+        self.assertNotIn('password', streamed)
+
+    def test_logins_keep_the_snapshot(self):
+        version = cache.get(SNAPSHOT_VERSION_KEY, 0)
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(cache.get(SNAPSHOT_VERSION_KEY, 0), version)
+
+    def test_snapshot_sections_are_bounded(self):
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        occupations = response.json()['occupations']
+        self.assertEqual(occupations['count'], self.ROWS)
+        self.assertEqual(len(occupations['results']), SECTION_LIMIT)
+        self.assertEqual(occupations['results'][0]['id'], Occupation.objects.order_by('-pk').first().pk)
+        self.assertTrue(occupations['url'].endswith('/api/home/occupations/'))
+
+    def test_snapshot_is_cached_until_data_changes(self):
+        self.client.get('/api/home/')
+        # The snapshot version and the snapshot itself, read from the shared cache
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/home/?sections=occupations')
+        self.assertEqual(list(response.json()), ['occupations'])
+
+        Occupation.objects.create(name='New')
+        response = self.client.get('/api/home/?sections=occupations')
+        self.assertEqual(response.json()['occupations']['count'], self.ROWS + 1)
+
+    def test_section_pages_with_cursor(self):
+        url, seen = '/api/home/occupations/?page_size=10', []
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 10)
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, list(Occupation.objects.order_by('-pk').values_list('pk', flat=True)))
+
+    def test_stream_yields_every_row_as_ndjson(self):
+        response = self.client.get('/api/home/occupations/stream/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), self.ROWS)
 
-# Create your tests here.
+    def test_unknown_section(self):
+        self.assertEqual(self.client.get('/api/home/nothing/').status_code, 404)
+        self.assertEqual(self.client.get('/api/home/nothing/stream/').status_code, 404)
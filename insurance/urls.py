@@ -22,17 +22,21 @@ router.register(r'bonus-rates', views.BonusRateViewSet)
 router.register(r'bonuses', views.BonusViewSet)
 router.register(r'claim-requests', views.ClaimRequestViewSet)
 router.register(r'claim-processing', views.ClaimProcessingViewSet)
+router.register(r'claim-finalization-jobs', views.ClaimFinalizationJobViewSet)
 router.register(r'payment-processing', views.PaymentProcessingViewSet)
 router.register(r'underwriting', views.UnderwritingViewSet)
 router.register(r'premium-payments', views.PremiumPaymentViewSet)
 router.register(r'agent-reports', views.AgentReportViewSet)
+router.register(r'agent-leaderboard', views.AgentLeaderboardViewSet, basename='agent-leaderboard')
 router.register(r'loans', views.LoanViewSet)
 router.register(r'loan-repayments', views.LoanRepaymentViewSet)
+router.register(r'loan-eligibility', views.LoanEligibilityViewSet)
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     path('', include(router.urls)), # Include the router-generated URLs
    
+    path('quotes/', views.QuoteView.as_view(), name='quotes'),
     path('login/', views.CustomLoginView.as_view(), name='login'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
@@ -1,17 +1,28 @@
-from rest_framework import status, viewsets, permissions as drf_permissions
+import json
+
+from rest_framework import filters, generics, mixins, status, viewsets, permissions as drf_permissions
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from django.db.models import Sum
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.db.models import Count, Q
+import django_filters
+from django_filters.rest_framework import DjangoFilterBackend
 
 from insurance.models import (
     Occupation, MortalityRate, Company, Branch, InsurancePolicy, GSVRate, SSVConfig,
     AgentApplication, SalesAgent, DurationFactor, Customer, KYC, PolicyHolder,
     BonusRate, Bonus, ClaimRequest, ClaimProcessing, PaymentProcessing, Underwriting,
-    PremiumPayment, AgentReport, Loan, LoanRepayment, User
+    PremiumPayment, AgentReport, Loan, LoanRepayment, User, PolicyFinancialSummary,
+    ClaimFinalizationJob, AgentPerformance
 )
 from insurance.serializers import (
     OccupationSerializer, MortalityRateSerializer, CompanySerializer, BranchSerializer,
@@ -19,8 +30,51 @@ from insurance.serializers import (
     SalesAgentSerializer, DurationFactorSerializer, CustomerSerializer, KYCSerializer,
     PolicyHolderSerializer, BonusRateSerializer, BonusSerializer, ClaimRequestSerializer,
     ClaimProcessingSerializer, PaymentProcessingSerializer, UnderwritingSerializer,
-    PremiumPaymentSerializer, AgentReportSerializer, LoanSerializer, LoanRepaymentSerializer, UserSerializer
+    PremiumPaymentSerializer, AgentReportSerializer, LoanSerializer, LoanRepaymentSerializer, UserSerializer,
+    UserSummarySerializer, QuoteSerializer, LoanStatementEntrySerializer, RepaymentPlanSerializer, RepaymentLineSerializer,
+    LoanEligibilitySerializer, ClaimFinalizationJobSerializer, PayoutPreviewSerializer,
+    LeaderboardQuerySerializer, AgentLeaderboardSerializer
 )
+from insurance.claims import claim_payouts, enqueue_finalization, queue_status
+from insurance.dashboard import SECTION_LIMIT, cached_snapshot
+from insurance.ledger import amortization_schedule, level_instalment, loan_statement, post_repayments
+from insurance.rating import quote
+
+# Maximum number of rows accepted in one batch quote request
+QUOTE_BATCH_LIMIT = 5000
+
+# Maximum number of lines accepted in one repayment file, and lines per transaction
+REPAYMENT_FILE_LIMIT = 20000
+REPAYMENT_BATCH_SIZE = 500
+
+# Rows read per query when streaming a home dashboard section
+HOME_STREAM_CHUNK_SIZE = 500
+
+class EagerLoadingMixin:
+    """
+    Applies a viewset's eager-loading plan to its queryset.
+
+    ``select_related_fields`` and ``prefetch_related_fields`` name every
+    relation the serializer reads, so list and detail responses take a fixed
+    number of queries however many rows they return. ``only_fields``
+    optionally limits the columns loaded.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    only_fields = ()
+
+    @classmethod
+    def eager_load(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        if cls.only_fields:
+            queryset = queryset.only(*cls.only_fields)
+        return queryset
+
+    def get_queryset(self):
+        return self.eager_load(super().get_queryset())
 
 class BaseViewSet(viewsets.ModelViewSet):
     permission_classes = [drf_permissions.IsAuthenticated]
@@ -34,9 +88,10 @@ class BaseViewSet(viewsets.ModelViewSet):
 
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    prefetch_related_fields = ('groups', 'user_permissions')
     permission_classes = [IsAuthenticated] 
 
     def get_queryset(self):
@@ -44,74 +99,81 @@ class UserViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return User.objects.none()
         if user.is_superuser or user.is_staff:
-            return User.objects.all()
+            return super().get_queryset()
        
-        return User.objects.filter(pk=user.pk)
+        return super().get_queryset().filter(pk=user.pk)
 
 
 
-class OccupationViewSet(viewsets.ModelViewSet):
+class OccupationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Occupation.objects.all()
     serializer_class = OccupationSerializer
     permission_classes = [IsAuthenticated] 
 
-class MortalityRateViewSet(viewsets.ModelViewSet):
+class MortalityRateViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = MortalityRate.objects.all()
     serializer_class = MortalityRateSerializer
     permission_classes = [IsAuthenticated] 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     permission_classes = [IsAuthenticated] 
 
-class BranchViewSet(viewsets.ModelViewSet):
-    queryset = Branch.objects.all()
+class BranchViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = Branch.objects.with_stats()
     serializer_class = BranchSerializer
+    prefetch_related_fields = ('user__groups', 'user__user_permissions')
     permission_classes = [IsAuthenticated] 
 
-class InsurancePolicyViewSet(viewsets.ModelViewSet):
+class InsurancePolicyViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = InsurancePolicy.objects.all()
     serializer_class = InsurancePolicySerializer
+    prefetch_related_fields = ('gsv_rates', 'ssv_configs')
     permission_classes = [IsAuthenticated] 
 
-class GSVRateViewSet(viewsets.ModelViewSet):
+class GSVRateViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = GSVRate.objects.all()
     serializer_class = GSVRateSerializer
     permission_classes = [IsAuthenticated]
 
-class SSVConfigViewSet(viewsets.ModelViewSet):
+class SSVConfigViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = SSVConfig.objects.all()
     serializer_class = SSVConfigSerializer
     permission_classes = [IsAuthenticated]
 
-class DurationFactorViewSet(viewsets.ModelViewSet):
+class DurationFactorViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = DurationFactor.objects.all()
     serializer_class = DurationFactorSerializer
     permission_classes = [IsAuthenticated]
 
-class BonusRateViewSet(viewsets.ModelViewSet):
+class BonusRateViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = BonusRate.objects.all()
     serializer_class = BonusRateSerializer
+    select_related_fields = ('policy',)
     permission_classes = [IsAuthenticated]
 
 # --- Agent Related Models ---
 
-class AgentApplicationViewSet(viewsets.ModelViewSet):
+class AgentApplicationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AgentApplication.objects.all()
     serializer_class = AgentApplicationSerializer
+    select_related_fields = ('branch',)
     permission_classes = [IsAuthenticated] 
     
-class SalesAgentViewSet(viewsets.ModelViewSet):
+class SalesAgentViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = SalesAgent.objects.all()
     serializer_class = SalesAgentSerializer
+    select_related_fields = ('branch', 'application')
     permission_classes = [IsAuthenticated] 
     
 
 # --- Customer and Policy Related Models ---
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    select_related_fields = ('user',)
+    prefetch_related_fields = ('user__groups', 'user__user_permissions')
     permission_classes = [IsAuthenticated]
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -129,26 +191,41 @@ class CustomerViewSet(viewsets.ModelViewSet):
     # Note: User activation/deactivation might be better handled via the UserViewSet if needed
 
 
-class KYCViewSet(viewsets.ModelViewSet):
+class KYCViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = KYC.objects.all()
     serializer_class = KYCSerializer
+    select_related_fields = ('customer',)
     permission_classes = [IsAuthenticated] 
     
-class PolicyHolderViewSet(viewsets.ModelViewSet):
+class PolicyHolderViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = PolicyHolder.objects.all()
     serializer_class = PolicyHolderSerializer
+    select_related_fields = ('company', 'branch', 'customer', 'agent__application', 'policy', 'occupation')
     permission_classes = [IsAuthenticated]
 
-class BonusViewSet(viewsets.ModelViewSet):
+class BonusViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Bonus.objects.all()
     serializer_class = BonusSerializer
+    select_related_fields = ('policy_holder',)
     permission_classes = [IsAuthenticated]
 
 
-class ClaimRequestViewSet(viewsets.ModelViewSet):
+class ClaimRequestViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ClaimRequest.objects.all()
     serializer_class = ClaimRequestSerializer
+    select_related_fields = ('policy_holder__customer', 'branch')
     permission_classes = [IsAuthenticated] # Owner/Admin/Agent can create/view claims
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'branch', 'policy_holder']
+
+    @action(detail=False, methods=['get'], url_path='payout-preview')
+    def payout_preview(self, request):
+        """Payouts the filtered claims would receive if approved now, priced in one query."""
+        payouts = claim_payouts(self.filter_queryset(self.get_queryset()))
+        return Response(PayoutPreviewSerializer(
+            [{'claim_request': pk, **payout._asdict()} for pk, payout in sorted(payouts.items())], many=True
+        ).data)
+
     def perform_create(self, serializer):
          # Automatically set branch based on policy holder if possible, or require it
         policy_holder = serializer.validated_data.get('policy_holder')
@@ -162,9 +239,10 @@ class ClaimRequestViewSet(viewsets.ModelViewSet):
              serializer.save()
 
 
-class ClaimProcessingViewSet(viewsets.ModelViewSet):
+class ClaimProcessingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ClaimProcessing.objects.all()
     serializer_class = ClaimProcessingSerializer
+    select_related_fields = ('branch', 'company')
     permission_classes = [IsAuthenticated] # Only Admin/Branch Admin process claims
 
     def perform_create(self, serializer):
@@ -180,17 +258,43 @@ class ClaimProcessingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def finalize(self, request, pk=None):
+        """Queue the claim for finalization with its current Approved/Rejected status."""
         processing = self.get_object()
-        try:
-            processing.finalize_claim()
-            return Response({'status': f'Claim finalized with status {processing.processing_status}'})
-        except Exception as e:
-             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if processing.processing_status not in ('Approved', 'Rejected'):
+            return Response(
+                {'error': 'Set processing_status to Approved or Rejected before finalizing.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        batch, queued = enqueue_finalization(
+            ClaimProcessing.objects.filter(pk=processing.pk), processing.processing_status, request.user
+        )
+        if not queued:
+            return Response({'error': 'Claim is already queued for finalization.'}, status=status.HTTP_409_CONFLICT)
+        job = processing.finalization_jobs.get(batch=batch)
+        return Response(ClaimFinalizationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ClaimFinalizationJobViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Claim finalization jobs run by the claim worker. Filter by ``status``,
+    ``batch`` or ``claim_processing``; ``progress`` counts jobs by status.
+    """
+    queryset = ClaimFinalizationJob.objects.order_by('-pk')
+    serializer_class = ClaimFinalizationJobSerializer
+    select_related_fields = ('claim_processing',)
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'batch', 'claim_processing', 'decision']
 
+    @action(detail=False, methods=['get'])
+    def progress(self, request):
+        return Response(queue_status(self.filter_queryset(self.get_queryset())))
 
-class PaymentProcessingViewSet(viewsets.ModelViewSet):
+
+class PaymentProcessingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = PaymentProcessing.objects.all()
     serializer_class = PaymentProcessingSerializer
+    select_related_fields = ('branch', 'company')
     permission_classes = [IsAuthenticated] 
         
     def perform_create(self, serializer):
@@ -204,57 +308,105 @@ class PaymentProcessingViewSet(viewsets.ModelViewSet):
              serializer.save()
 
 
-class UnderwritingViewSet(viewsets.ModelViewSet):
+class UnderwritingViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Underwriting.objects.all()
     serializer_class = UnderwritingSerializer
+    select_related_fields = ('policy_holder__customer',)
     permission_classes = [IsAuthenticated] # Admin/Branch Admin manage underwriting
-class PremiumPaymentViewSet(viewsets.ModelViewSet):
+class PremiumPaymentViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = PremiumPayment.objects.all()
     serializer_class = PremiumPaymentSerializer
+    select_related_fields = ('policy_holder__customer',)
     permission_classes = [IsAuthenticated] # Customer can view, Admin/Agent can manage
-
-class AgentReportViewSet(viewsets.ModelViewSet):
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = {
+        'payment_status': ['exact'],
+        'estimated_maturity_value': ['gte', 'lte'],
+    }
+    ordering_fields = ['estimated_maturity_value', 'annual_premium', 'next_payment_date']
+
+class AgentReportViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AgentReport.objects.all()
     serializer_class = AgentReportSerializer
+    select_related_fields = ('agent__branch', 'agent__application', 'branch')
     permission_classes = [IsAuthenticated] # Only Admin/Branch Admin manage agent reports
     def retrieve(self, request, pk=None):
+        """An agent's lifetime totals, read from the counters maintained on the agent."""
         try:
-            agent = SalesAgent.objects.get(pk=pk)
+            agent = SalesAgent.objects.select_related('application', 'branch').get(pk=pk)
         except SalesAgent.DoesNotExist:
             return Response({'error': 'Agent not found'}, status=404)
 
-        policies_sold = PolicyHolder.objects.filter(agent_id=agent).count()
-        total_premium = PremiumPayment.objects.filter(
-            policy_holder__agent_id=agent
-        ).aggregate(total=Sum('paid_amount'))['total'] or 0
-
         data = {
             'agent': SalesAgentSerializer(agent).data,
-            'policies_sold': policies_sold,
-            'total_premium': total_premium,
+            'policies_sold': agent.total_policies_sold,
+            'total_premium': agent.total_premium_collected,
+            'commission_earned': agent.total_commission_earned,
+            'active_policies': agent.active_policies,
+            'lapsed_policies': agent.lapsed_policies,
         }
         return Response(data)
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LeaderboardPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return (f'-{view.metric}', '-agent_id')
+
+class AgentLeaderboardViewSet(EagerLoadingMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Agents ranked by ``metric`` over one day or month, read from the
+    precomputed AgentPerformance rows. Filter by ``branch`` or ``company``;
+    ``date`` selects the period (today by default). Agents tied on the metric
+    share a rank.
+    """
+    queryset = AgentPerformance.objects.all()
+    serializer_class = AgentLeaderboardSerializer
+    select_related_fields = ('agent__application',)
+    permission_classes = [IsAuthenticated]
+    pagination_class = LeaderboardPagination
+
+    def get_queryset(self):
+        params = LeaderboardQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        self.metric = params['metric']
+
+        day = params.get('date') or timezone.now().date()
+        queryset = super().get_queryset().filter(
+            period=params['period'],
+            period_start=day.replace(day=1) if params['period'] == 'month' else day,
+        )
+        if 'branch' in params:
+            queryset = queryset.filter(branch_id=params['branch'])
+        if 'company' in params:
+            queryset = queryset.filter(branch__company_id=params['company'])
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+
+        # Ranks of the page's distinct values, counted in one aggregate over the whole board
+        values = sorted({getattr(row, self.metric) for row in page})
+        ahead = queryset.order_by().aggregate(**{
+            f'ahead_{i}': Count('pk', filter=Q(**{f'{self.metric}__gt': value}))
+            for i, value in enumerate(values)
+        }) if values else {}
+        ranks = {value: ahead[f'ahead_{i}'] + 1 for i, value in enumerate(values)}
+        for row in page:
+            row.rank = ranks[getattr(row, self.metric)]
+
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class LoanViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
+    select_related_fields = ('policy_holder__customer',)
     permission_classes = [IsAuthenticated] # Customer/Admin/Agent access loans
 
-   
-
-    def get_serializer_context(self):
-        # Pass policy_holder to serializer context for validation if creating/updating
-        context = super().get_serializer_context()
-        if self.action in ['create', 'update', 'partial_update'] and 'request' in context:
-            policy_holder_id = context['request'].data.get('policy_holder')
-            if policy_holder_id:
-                try:
-                    policy_holder = PolicyHolder.objects.get(pk=policy_holder_id)
-                    context['policy_holder'] = policy_holder
-                except PolicyHolder.DoesNotExist:
-                    pass # Let serializer handle invalid ID
-        return context
-
     @action(detail=True, methods=['post'])
     def accrue_interest(self, request, pk=None):
         loan = self.get_object()
@@ -265,12 +417,142 @@ class LoanViewSet(viewsets.ModelViewSet):
         except Exception as e:
              return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        Stream the loan ledger as NDJSON, one entry per line with running balances.
 
-class LoanRepaymentViewSet(viewsets.ModelViewSet):
+        With ``instalment`` or ``months`` query parameters, the lines are
+        followed by the forward amortization schedule of that plan.
+        """
+        loan = self.get_object()
+        plan = first = None
+        if request.query_params.get('instalment') or request.query_params.get('months'):
+            plan = RepaymentPlanSerializer(data=request.query_params)
+            plan.is_valid(raise_exception=True)
+            plan = plan.validated_data
+
+            instalment = plan.get('instalment') or level_instalment(
+                loan.remaining_balance + loan.accrued_interest, loan.interest_rate, plan['months']
+            )
+            schedule = amortization_schedule(
+                loan.remaining_balance, loan.accrued_interest, loan.interest_rate,
+                instalment, plan.get('start'),
+            )
+            try:
+                first = next(schedule, None)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def lines():
+            for entry in loan_statement(loan).iterator(chunk_size=500):
+                yield json.dumps({'type': 'entry', **LoanStatementEntrySerializer(entry).data}, cls=DjangoJSONEncoder) + '\n'
+            if plan is not None and first is not None:
+                yield json.dumps({'type': 'schedule', **first}, cls=DjangoJSONEncoder) + '\n'
+                for row in schedule:
+                    yield json.dumps({'type': 'schedule', **row}, cls=DjangoJSONEncoder) + '\n'
+
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+class LoanEligibilityFilter(django_filters.FilterSet):
+    branch = django_filters.NumberFilter(field_name='policy_holder__branch')
+    min_headroom = django_filters.NumberFilter(field_name='loan_headroom', lookup_expr='gte')
+
+    class Meta:
+        model = PolicyFinancialSummary
+        fields = ['branch', 'min_headroom']
+
+
+class LoanEligibilityViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Available loan amount per policy holder, read from the precomputed
+    financial summaries. Filter by ``branch`` or ``min_headroom``.
+    """
+    queryset = PolicyFinancialSummary.objects.order_by('policy_holder_id')
+    serializer_class = LoanEligibilitySerializer
+    select_related_fields = ('policy_holder',)
+    only_fields = ('policy_holder__policy_number', 'policy_holder__branch', 'gsv_value', 'max_loan',
+                   'loan_principal', 'loan_interest', 'loan_headroom', 'updated_at')
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = LoanEligibilityFilter
+    ordering_fields = ['loan_headroom', 'max_loan']
+
+
+class LoanRepaymentViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = LoanRepayment.objects.all()
     serializer_class = LoanRepaymentSerializer
+    select_related_fields = ('loan__policy_holder',)
     permission_classes = [IsAuthenticated] 
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Post a day's repayment file: a list of up to REPAYMENT_FILE_LIMIT lines.
+
+        Lines are posted in order, REPAYMENT_BATCH_SIZE per transaction; lines
+        for unknown or already paid loans are returned as rejected.
+        """
+        serializer = RepaymentLineSerializer(data=request.data, many=True, max_length=REPAYMENT_FILE_LIMIT)
+        serializer.is_valid(raise_exception=True)
+        result = post_repayments(serializer.validated_data, batch_size=REPAYMENT_BATCH_SIZE)
+        return Response(
+            {
+                'posted': len(result.posted),
+                'batches': result.batches,
+                'repayments': [
+                    {'id': r.pk, 'loan': r.loan_id, 'remaining_loan_balance': r.remaining_loan_balance}
+                    for r in result.posted
+                ],
+                'rejected': result.rejected,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+# --- Quotes ---
+
+class QuoteView(APIView):
+    """
+    Price premiums on plain inputs without creating a PolicyHolder.
+
+    Accepts a single quote object or a list of up to QUOTE_BATCH_LIMIT of them.
+    Pricing only reads the cached rating tables and memoized quotes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        many = isinstance(request.data, list)
+        if many:
+            serializer = QuoteSerializer(data=request.data, many=True, max_length=QUOTE_BATCH_LIMIT)
+        else:
+            serializer = QuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        rows = serializer.validated_data if many else [serializer.validated_data]
+        try:
+            results = [self.price(row) for row in rows]
+        except DjangoValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results if many else results[0])
+
+    def price(self, row):
+        annual_premium, interval_payment = quote(
+            row['policy'], row['age'], row['duration_years'], row['sum_assured'],
+            row['payment_interval'], row['include_adb'], row['include_ptd'],
+        )
+        if row['payment_interval'] == "Single":
+            total_premium = interval_payment
+        else:
+            total_premium = annual_premium * row['duration_years']
+        return {
+            **row,
+            'sum_assured': str(row['sum_assured']),
+            'annual_premium': str(annual_premium),
+            'interval_payment': str(interval_payment),
+            'total_premium': str(total_premium),
+        }
+
 # --- Authentication Views ---
 
 class CustomLoginView(ObtainAuthToken):
@@ -313,39 +595,122 @@ class LogoutView(APIView):
         return Response({"detail": "Logged out successfully."}, status=status.HTTP_200_OK)
 
 
+# Home dashboard sections, in display order, served with the serializer and
+# eager-loading plan of the listed viewset unless HOME_SERIALIZERS overrides it
+HOME_SECTIONS = {
+    'users': UserViewSet,
+    'occupations': OccupationViewSet,
+    'mortality_rates': MortalityRateViewSet,
+    'companies': CompanyViewSet,
+    'branches': BranchViewSet,
+    'insurance_policies': InsurancePolicyViewSet,
+    'gsv_rates': GSVRateViewSet,
+    'ssv_configs': SSVConfigViewSet,
+    'agent_applications': AgentApplicationViewSet,
+    'sales_agents': SalesAgentViewSet,
+    'duration_factors': DurationFactorViewSet,
+    'customers': CustomerViewSet,
+    'kyc': KYCViewSet,
+    'policy_holders': PolicyHolderViewSet,
+    'bonus_rates': BonusRateViewSet,
+    'bonuses': BonusViewSet,
+    'claim_requests': ClaimRequestViewSet,
+    'claim_processing': ClaimProcessingViewSet,
+    'payment_processing': PaymentProcessingViewSet,
+    'underwriting': UnderwritingViewSet,
+    'premium_payments': PremiumPaymentViewSet,
+    'agent_reports': AgentReportViewSet,
+    'loans': LoanViewSet,
+    'loan_repayments': LoanRepaymentViewSet,
+}
+
+# Sections whose viewset serializer exposes more than the dashboard may show
+HOME_SERIALIZERS = {
+    'users': UserSummarySerializer,
+}
+
+def home_section_queryset(section):
+    """Rows of a dashboard section, newest first, and the serializer to show them with."""
+    viewset = HOME_SECTIONS.get(section)
+    if viewset is None:
+        raise Http404(f"Unknown section '{section}'.")
+    if section in HOME_SERIALIZERS:
+        return viewset.queryset.order_by('-pk'), HOME_SERIALIZERS[section]
+    return viewset.eager_load(viewset.queryset.all()).order_by('-pk'), viewset.serializer_class
+
+
 class HomeDataView(APIView):
- 
-    permission_classes = [AllowAny]
+    """
+    Dashboard feed: the row count and newest SECTION_LIMIT rows of each
+    section, served from a cached snapshot. ``sections`` selects a
+    comma-separated subset; each section links to its paginated feed and its
+    NDJSON stream for the remaining rows.
+
+    File and image URLs are absolute, so a snapshot is cached per scheme and
+    host it was requested on.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def build_snapshot(request):
+        context = {'request': request}
+        snapshot = {}
+        for section in HOME_SECTIONS:
+            queryset, serializer_class = home_section_queryset(section)
+            snapshot[section] = {
+                'count': queryset.count(),
+                'results': serializer_class(queryset[:SECTION_LIMIT], many=True, context=context).data,
+            }
+        return snapshot
 
     def get(self, request):
-        serializer_context = {'request': request} # For serializers needing request context
-        
-        # Fetch and serialize all data for each model
-        all_data = {
-            "users": UserSerializer(User.objects.all(), many=True, context=serializer_context).data,
-            "occupations": OccupationSerializer(Occupation.objects.all(), many=True, context=serializer_context).data,
-            "mortality_rates": MortalityRateSerializer(MortalityRate.objects.all(), many=True, context=serializer_context).data,
-            "companies": CompanySerializer(Company.objects.all(), many=True, context=serializer_context).data,
-            "branches": BranchSerializer(Branch.objects.all(), many=True, context=serializer_context).data,
-            "insurance_policies": InsurancePolicySerializer(InsurancePolicy.objects.all(), many=True, context=serializer_context).data,
-            "gsv_rates": GSVRateSerializer(GSVRate.objects.all(), many=True, context=serializer_context).data,
-            "ssv_configs": SSVConfigSerializer(SSVConfig.objects.all(), many=True, context=serializer_context).data,
-            "agent_applications": AgentApplicationSerializer(AgentApplication.objects.all(), many=True, context=serializer_context).data,
-            "sales_agents": SalesAgentSerializer(SalesAgent.objects.all(), many=True, context=serializer_context).data,
-            "duration_factors": DurationFactorSerializer(DurationFactor.objects.all(), many=True, context=serializer_context).data,
-            "customers": CustomerSerializer(Customer.objects.all(), many=True, context=serializer_context).data,
-            "kyc": KYCSerializer(KYC.objects.all(), many=True, context=serializer_context).data,
-            "policy_holders": PolicyHolderSerializer(PolicyHolder.objects.all(), many=True, context=serializer_context).data,
-            "bonus_rates": BonusRateSerializer(BonusRate.objects.all(), many=True, context=serializer_context).data,
-            "bonuses": BonusSerializer(Bonus.objects.all(), many=True, context=serializer_context).data,
-            "claim_requests": ClaimRequestSerializer(ClaimRequest.objects.all(), many=True, context=serializer_context).data,
-            "claim_processing": ClaimProcessingSerializer(ClaimProcessing.objects.all(), many=True, context=serializer_context).data,
-            "payment_processing": PaymentProcessingSerializer(PaymentProcessing.objects.all(), many=True, context=serializer_context).data,
-            "underwriting": UnderwritingSerializer(Underwriting.objects.all(), many=True, context=serializer_context).data,
-            "premium_payments": PremiumPaymentSerializer(PremiumPayment.objects.all(), many=True, context=serializer_context).data,
-            "agent_reports": AgentReportSerializer(AgentReport.objects.all(), many=True, context=serializer_context).data,
-            "loans": LoanSerializer(Loan.objects.all(), many=True, context=serializer_context).data,
-            "loan_repayments": LoanRepaymentSerializer(LoanRepayment.objects.all(), many=True, context=serializer_context).data,
-        }
+        snapshot = cached_snapshot(
+            lambda: self.build_snapshot(request), variant=f"{request.scheme}://{request.get_host()}"
+        )
+        sections = request.query_params.get('sections')
+        names = [name for name in sections.split(',') if name in snapshot] if sections else list(snapshot)
+        return Response({
+            name: {
+                **snapshot[name],
+                'url': request.build_absolute_uri(reverse('home-section', args=[name])),
+                'stream': request.build_absolute_uri(reverse('home-section-stream', args=[name])),
+            }
+            for name in names
+        })
+
+
+class HomeSectionPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-pk'
+
+
+class HomeSectionView(generics.ListAPIView):
+    """One dashboard section, newest first, with cursor pagination."""
+    permission_classes = [IsAuthenticated]
+    pagination_class = HomeSectionPagination
+
+    def get_queryset(self):
+        return home_section_queryset(self.kwargs['section'])[0]
+
+    def get_serializer_class(self):
+        return home_section_queryset(self.kwargs['section'])[1]
+
+
+class HomeSectionStreamView(APIView):
+    """
+    Every row of one dashboard section as NDJSON, newest first, read in
+    chunks so memory stays flat however large the table is.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, section):
+        queryset, serializer_class = home_section_queryset(section)
+        context = {'request': request}
+
+        def lines():
+            for row in queryset.iterator(chunk_size=HOME_STREAM_CHUNK_SIZE):
+                yield json.dumps(serializer_class(row, context=context).data, cls=DjangoJSONEncoder) + '\n'
 
-        return Response(all_data)
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
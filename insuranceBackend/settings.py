@@ -157,6 +157,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by every worker process: the rating caches and the home dashboard
+# publish their invalidations here. Create the table with
+# `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'insurance_cache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
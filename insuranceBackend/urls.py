@@ -19,12 +19,14 @@ from django.urls import path, include
 from django.conf import settings
 from insuranceBackend.settings import MEDIA_ROOT, MEDIA_URL
 from django.conf.urls.static import static
-from insurance.views import HomeDataView
+from insurance.views import HomeDataView, HomeSectionStreamView, HomeSectionView
 
 urlpatterns = [
     path('api/', include('insurance.urls')), 
     # path('', admin.site.urls),
      path('api/home/', HomeDataView.as_view(), name='home'),
+     path('api/home/<str:section>/', HomeSectionView.as_view(), name='home-section'),
+     path('api/home/<str:section>/stream/', HomeSectionStreamView.as_view(), name='home-section-stream'),
     path('api-auth/', include('rest_framework.urls')),
 ] 
 